@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals
 
+import sys
+
 from .client import BaiJiaYunClient
 
 
 __version__ = '1.0.1'
 __all__ = ['BaiJiaYunClient']
+
+if sys.version_info >= (3, 5):
+    from .client.aio import AsyncBaiJiaYunClient  # noqa: F401
+
+    __all__.append('AsyncBaiJiaYunClient')
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+from .receiver import (  # noqa: F401
+    ACCEPTED, BUSY, DUPLICATE, INVALID, CallbackReceiver, HandlerQueue, ReplayCache
+)
+from .pipeline import CallbackPipeline, default_event_key  # noqa: F401
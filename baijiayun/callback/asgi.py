@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+
+class ASGICallbackApp(object):
+    """
+    CallbackReceiver 的 ASGI 应用，通过 receiver.asgi_app() 创建
+    """
+
+    def __init__(self, receiver):
+        self.receiver = receiver
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    self.receiver.close()
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        content_type = None
+        for name, value in scope.get('headers', ()):
+            if name.lower() == b'content-type':
+                content_type = value.decode('latin-1')
+        body = b''
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if len(body) > self.receiver.max_body_size:
+                break
+
+        status, body = self.receiver.handle(scope.get('query_string', b''), content_type, body)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+        })
+        await send({'type': 'http.response.body', 'body': body})
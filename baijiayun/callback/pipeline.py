@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import errno
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent import futures
+
+from ..core.utils import to_binary
+
+logger = logging.getLogger(__name__)
+
+PENDING = 0
+RUNNING = 1
+DONE = 2
+FAILED = 3
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    event_id INTEGER NOT NULL,
+    handler TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_at REAL NOT NULL,
+    error TEXT,
+    owner TEXT,
+    lease_until REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (event_id, handler)
+);
+CREATE INDEX IF NOT EXISTS deliveries_status ON deliveries (status, next_at);
+'''
+
+
+# columns added after the first release
+_MIGRATIONS = (
+    ('owner', 'ALTER TABLE deliveries ADD COLUMN owner TEXT'),
+    ('lease_until', 'ALTER TABLE deliveries ADD COLUMN lease_until REAL NOT NULL DEFAULT 0'),
+)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        # EPERM: the process exists but belongs to another user
+        return e.errno == errno.EPERM
+    return True
+
+
+def _owner_pid(owner):
+    try:
+        return int(owner.split(':', 1)[0])
+    except (AttributeError, ValueError):
+        return None
+
+
+def default_event_key(event):
+    """
+    回调标识：去掉 sign、timestamp 后的数据摘要，厂商重试同一回调时相同
+    """
+    items = sorted((k, v) for k, v in event.items() if k not in ('sign', 'timestamp'))
+    return hashlib.sha1(to_binary(json.dumps(items))).hexdigest()
+
+
+class CallbackPipeline(object):
+    """
+    回调持久化队列：验签后的回调先写入本地 SQLite，按回调标识去重，再由线程池分发给所有已注册的处理函数，
+    处理失败按指数退避重试，进程重启后继续处理未完成的回调。作为 CallbackReceiver 的 sink 使用::
+
+        pipeline = CallbackPipeline('/var/lib/app/callbacks.db')
+        pipeline.register(on_transcode)
+        pipeline.register(notify_teacher)
+        receiver = CallbackReceiver(client, sink=pipeline)
+
+    :param path: SQLite 数据库文件路径
+    :param workers: 处理线程数
+    :param max_pending: 未处理完的分发数达到该值时 put 返回 False（回调接口返回 503，由厂商稍后重试）
+    :param max_attempts: 每个处理函数的最大尝试次数
+    :param retry_delay: 首次重试等待时间（秒），之后每次翻倍
+    :param poll_interval: 没有待处理回调时的轮询间隔（秒）
+    :param event_key: 回调标识函数，默认为 default_event_key
+    :param lease: 处理中分发的租约（秒），处理进程定期续约，进程退出或租约过期后由其他进程重新处理
+    """
+
+    def __init__(self, path, workers=4, max_pending=10000, max_attempts=5, retry_delay=1.0, poll_interval=0.5,
+                 event_key=default_event_key, lease=60):
+        self.path = path
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.event_key = event_key
+        self.lease = lease
+        self.handlers = {}
+        self._pid = None
+        self._owner = None
+        self._stopped = None
+        self._heartbeat = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._dispatcher = None
+        self._executor = None
+        self._slots = None
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = set(row[1] for row in conn.execute('PRAGMA table_info(deliveries)'))
+            for column, sql in _MIGRATIONS:
+                if column not in columns:
+                    conn.execute(sql)
+
+    def register(self, handler, name=None):
+        """
+        注册处理函数，注册后收到的回调会分发给它
+
+        :param handler: 处理函数，参数为回调数据，抛出异常时重试
+        :param name: 处理函数名，用于记录分发状态，默认为 模块.函数名，修改后视为新的处理函数
+        """
+        name = name or '%s.%s' % (handler.__module__, getattr(handler, '__name__', repr(handler)))
+        self.handlers[name] = handler
+        return handler
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @property
+    def _conn(self):
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            self._local.conn = self._connect()
+            self._local.pid = pid
+        return self._local.conn
+
+    def _check_workers(self):
+        # the dispatcher is started lazily and again after fork
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._owner = '%d:%s' % (os.getpid(), uuid.uuid4().hex)
+            self._reclaim_dead()
+            self._stopping = False
+            self._wakeup = threading.Event()
+            self._executor = futures.ThreadPoolExecutor(max_workers=self.workers)
+            self._slots = threading.BoundedSemaphore(self.workers * 2)
+            self._dispatcher = threading.Thread(target=self._dispatch_loop)
+            self._dispatcher.daemon = True
+            self._dispatcher.start()
+            self._stopped = threading.Event()
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop)
+            self._heartbeat.daemon = True
+            self._heartbeat.start()
+            self._pid = os.getpid()
+
+    def _reclaim_dead(self):
+        # deliveries left running by a crashed process on this host are retried at once,
+        # other processes' deliveries only after their lease expires
+        conn = self._conn
+        owners = [row[0] for row in conn.execute('SELECT DISTINCT owner FROM deliveries WHERE status = ?', (RUNNING, ))]
+        for owner in owners:
+            pid = _owner_pid(owner)
+            if pid is None or not _pid_alive(pid):
+                conn.execute('UPDATE deliveries SET status = ?, owner = NULL WHERE status = ? AND owner IS ?',
+                             (PENDING, RUNNING, owner))
+
+    def _heartbeat_loop(self):
+        # renews the lease of running deliveries, slow handlers are not taken by other processes
+        stopped = self._stopped
+        while not stopped.wait(self.lease / 3.0):
+            try:
+                self._conn.execute(
+                    'UPDATE deliveries SET lease_until = ? WHERE status = ? AND owner = ?',
+                    (time.time() + self.lease, RUNNING, self._owner)
+                )
+            except sqlite3.Error:
+                logger.exception('回调租约续期失败')
+
+    def pending(self):
+        """
+        未处理完的分发数
+        """
+        row = self._conn.execute(
+            'SELECT COUNT(*) FROM deliveries WHERE status IN (?, ?)', (PENDING, RUNNING)
+        ).fetchone()
+        return row[0]
+
+    def put(self, event):
+        """
+        写入回调，重复的回调直接返回 True，积压达到 max_pending 时返回 False
+        """
+        self._check_workers()
+        if self.pending() >= self.max_pending:
+            return False
+        key = self.event_key(event)
+        now = time.time()
+        conn = self._conn
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO events (event_key, payload, created_at) VALUES (?, ?, ?)',
+                (key, json.dumps(event), now)
+            )
+            if cursor.rowcount == 0:
+                return True
+            conn.executemany(
+                'INSERT INTO deliveries (event_id, handler, status, next_at) VALUES (?, ?, ?, ?)',
+                [(cursor.lastrowid, name, PENDING, now) for name in self.handlers]
+            )
+        self._wakeup.set()
+        return True
+
+    def _claim(self, limit):
+        conn = self._conn
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            rows = conn.execute(
+                'SELECT d.event_id, d.handler, d.attempts, e.payload FROM deliveries d '
+                'JOIN events e ON e.id = d.event_id WHERE (d.status = ? AND d.next_at <= ?) '
+                'OR (d.status = ? AND d.lease_until < ?) ORDER BY d.next_at LIMIT ?',
+                (PENDING, now, RUNNING, now, limit)
+            ).fetchall()
+            conn.executemany(
+                'UPDATE deliveries SET status = ?, owner = ?, lease_until = ? WHERE event_id = ? AND handler = ?',
+                [(RUNNING, self._owner, now + self.lease, event_id, name) for event_id, name, _, _ in rows]
+            )
+        return rows
+
+    def _dispatch_loop(self):
+        wakeup = self._wakeup
+        while not self._stopping:
+            try:
+                rows = self._claim(self.workers)
+            except sqlite3.Error:
+                logger.exception('读取回调队列失败')
+                rows = []
+            if not rows:
+                wakeup.wait(self.poll_interval)
+                wakeup.clear()
+                continue
+            for event_id, name, attempts, payload in rows:
+                # blocks when all workers are busy
+                self._slots.acquire()
+                self._executor.submit(self._deliver, event_id, name, attempts, payload)
+
+    def _deliver(self, event_id, name, attempts, payload):
+        try:
+            handler = self.handlers.get(name)
+            error = None
+            if handler is None:
+                error = 'handler %s is not registered' % name
+            else:
+                try:
+                    handler(json.loads(payload))
+                except Exception as e:
+                    logger.exception('回调处理失败：%s %s', name, payload)
+                    error = repr(e)
+            self._finish(event_id, name, attempts + 1, error)
+        except Exception:
+            logger.exception('更新回调状态失败：%s %s', name, payload)
+        finally:
+            self._slots.release()
+
+    def _finish(self, event_id, name, attempts, error):
+        if error is None:
+            status, next_at = DONE, time.time()
+        elif attempts >= self.max_attempts:
+            status, next_at = FAILED, time.time()
+        else:
+            status, next_at = PENDING, time.time() + self.retry_delay * 2 ** (attempts - 1)
+        # a delivery whose lease expired may have been taken over by another process
+        self._conn.execute(
+            'UPDATE deliveries SET status = ?, attempts = ?, next_at = ?, error = ?, owner = NULL '
+            'WHERE event_id = ? AND handler = ? AND owner = ?',
+            (status, attempts, next_at, error, event_id, name, self._owner)
+        )
+        if status == PENDING:
+            self._wakeup.set()
+
+    def failed(self, limit=100):
+        """
+        超过最大尝试次数的分发，返回 [(回调数据, 处理函数名, 错误信息)]
+        """
+        rows = self._conn.execute(
+            'SELECT e.payload, d.handler, d.error FROM deliveries d JOIN events e ON e.id = d.event_id '
+            'WHERE d.status = ? ORDER BY d.event_id LIMIT ?', (FAILED, limit)
+        ).fetchall()
+        return [(json.loads(payload), name, error) for payload, name, error in rows]
+
+    def purge(self, older_than=7 * 24 * 3600):
+        """
+        删除 older_than 秒前已全部处理完的回调，删除后同一回调再次收到会重新处理
+        """
+        conn = self._conn
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'DELETE FROM events WHERE created_at < ? AND NOT EXISTS '
+                '(SELECT 1 FROM deliveries d WHERE d.event_id = events.id AND d.status IN (?, ?))',
+                (time.time() - older_than, PENDING, RUNNING)
+            )
+            conn.execute('DELETE FROM deliveries WHERE event_id NOT IN (SELECT id FROM events)')
+
+    def join(self, timeout=None):
+        """
+        等待积压的回调处理完，超时返回 False
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while self.pending():
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self):
+        """
+        停止分发，正在处理的回调处理完后返回，未处理的回调下次启动后继续处理
+        """
+        if self._pid != os.getpid():
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+        self._stopped.set()
+        self._heartbeat.join()
+        self._pid = None
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import collections
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+
+import six
+from six.moves import queue
+from six.moves.urllib.parse import parse_qsl
+
+from ..core.utils import to_binary, to_text
+
+logger = logging.getLogger(__name__)
+
+ACCEPTED = 'accepted'
+DUPLICATE = 'duplicate'
+INVALID = 'invalid'
+BUSY = 'busy'
+
+# http status and body of each receive result, duplicates are acknowledged so that the vendor stops retrying
+RESPONSES = {
+    ACCEPTED: (200, {'code': 0}),
+    DUPLICATE: (200, {'code': 0}),
+    INVALID: (403, {'code': 1, 'msg': 'sign error'}),
+    BUSY: (503, {'code': 2, 'msg': 'busy'}),
+}
+
+HTTP_STATUS = {
+    200: '200 OK',
+    400: '400 Bad Request',
+    403: '403 Forbidden',
+    413: '413 Payload Too Large',
+    503: '503 Service Unavailable',
+}
+
+
+class ReplayCache(object):
+    """
+    回调防重放，记录 window 秒内出现过的签名，超过 maxsize 时淘汰最早的记录
+
+    :param maxsize: 最多记录的签名数
+    :param window: 记录保留时间（秒），应不小于时间戳允许误差的两倍
+    """
+
+    def __init__(self, maxsize=100000, window=600):
+        self.maxsize = maxsize
+        self.window = window
+        self._seen = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def __contains__(self, nonce):
+        with self._lock:
+            return nonce in self._seen
+
+    def add(self, nonce):
+        """
+        记录签名，已存在（重放）返回 False
+        """
+        now = time.time()
+        with self._lock:
+            seen = self._seen
+            # every entry lives for the same window, so insertion order is expiry order
+            while seen:
+                oldest = next(iter(seen))
+                if seen[oldest] > now:
+                    break
+                del seen[oldest]
+            if nonce in seen:
+                return False
+            seen[nonce] = now + self.window
+            if len(seen) > self.maxsize:
+                seen.popitem(last=False)
+            return True
+
+    def discard(self, nonce):
+        with self._lock:
+            self._seen.pop(nonce, None)
+
+
+class HandlerQueue(object):
+    """
+    在后台线程中调用 handler 处理回调，队列满时 put 返回 False 而不是阻塞请求
+
+    :param handler: 处理函数，参数为验签后的回调数据（不含 sign）
+    :param maxsize: 队列长度
+    :param workers: 处理线程数
+    """
+
+    def __init__(self, handler, maxsize=10000, workers=1):
+        self.handler = handler
+        self.maxsize = maxsize
+        self.workers = workers
+        self._pid = None
+        self._lock = threading.Lock()
+        self._queue = None
+        self._threads = []
+
+    def _check_workers(self):
+        # threads are started lazily and again after fork
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(self.maxsize)
+            self._threads = []
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self._work, args=(self._queue, ))
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+            self._pid = os.getpid()
+
+    def put(self, event):
+        self._check_workers()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            return False
+        return True
+
+    def _work(self, events):
+        while True:
+            event = events.get()
+            try:
+                if event is None:
+                    return
+                self.handler(event)
+            except Exception:
+                logger.exception('回调处理失败：%s', event)
+            finally:
+                events.task_done()
+
+    def join(self):
+        """
+        等待已提交的回调处理完
+        """
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        """
+        处理完已提交的回调后停止处理线程
+        """
+        if self._pid != os.getpid():
+            return
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._pid = None
+
+
+class CallbackReceiver(object):
+    """
+    回调接收（转码回调、上下课回调等），验签、防重放后交给 sink 异步处理，不阻塞 HTTP 响应。
+    实例本身是 WSGI 应用，ASGI 应用见 asgi_app()::
+
+        receiver = CallbackReceiver(client, handler=on_callback)
+        # 挂载到回调地址，如 werkzeug DispatcherMiddleware(app, {'/baijiayun/callback': receiver})
+
+    :param client: BaiJiaYunClient，用于获取 partner_key（进程内缓存）
+    :param handler: 处理函数，参数为验签后的回调数据（不含 sign），在后台线程中调用
+    :param sink: 接收验签后回调的对象，需实现 put(event) 并在无法接收时返回 False，传入后忽略 handler
+    :param check_timestamp_second: 时间戳与服务器时间误差范围（秒）
+    :param replay_cache: 防重放缓存 ReplayCache，默认保留 2 * check_timestamp_second 秒（不验证时间戳时为 600 秒）
+    :param queue_size: 默认 sink 的队列长度
+    :param workers: 默认 sink 的处理线程数
+    :param max_body_size: 请求体最大字节数
+    """
+
+    def __init__(self, client, handler=None, sink=None, check_timestamp_second=300, replay_cache=None,
+                 queue_size=10000, workers=1, max_body_size=1024 * 1024):
+        if sink is None:
+            if handler is None:
+                raise ValueError('handler or sink is required')
+            sink = HandlerQueue(handler, maxsize=queue_size, workers=workers)
+        self.client = client
+        self.sink = sink
+        self.check_timestamp_second = check_timestamp_second
+        if replay_cache is None:
+            replay_cache = ReplayCache(window=(check_timestamp_second or 300) * 2)
+        self.replay_cache = replay_cache
+        self.max_body_size = max_body_size
+
+    @staticmethod
+    def _normalize(data):
+        data = dict(data)
+        timestamp = data.get('timestamp')
+        if timestamp is not None and not isinstance(timestamp, six.integer_types):
+            try:
+                data['timestamp'] = int(timestamp)
+            except (TypeError, ValueError):
+                pass
+        return data
+
+    def verify(self, data, partner_key=None):
+        """
+        验证签名及时间戳，成功返回 (不含 sign 的数据, sign)，失败返回 (None, None)
+
+        :param partner_key: 不传时从客户端获取
+        """
+        data, sign = self.client._split_sign(self._normalize(data), self.check_timestamp_second)
+        if data is None:
+            return None, None
+        if partner_key is None:
+            partner_key = self.client.get_partner_key()
+        expected = self.client._sign_with_key(data, partner_key)
+        if not hmac.compare_digest(to_binary(expected), to_binary(sign)):
+            return None, None
+        return data, sign
+
+    def receive(self, data, partner_key=None):
+        """
+        验签、防重放后提交给 sink，返回 ACCEPTED、DUPLICATE、INVALID 或 BUSY
+        """
+        data, sign = self.verify(data, partner_key)
+        if data is None:
+            return INVALID
+        if not self.replay_cache.add(sign):
+            return DUPLICATE
+        if not self.sink.put(data):
+            # let the vendor retry later
+            self.replay_cache.discard(sign)
+            logger.warning('回调队列已满：%s', data)
+            return BUSY
+        return ACCEPTED
+
+    def receive_many(self, payloads):
+        """
+        批量接收，所有回调使用同一个 partner_key，按顺序返回每个回调的结果
+        """
+        partner_key = self.client.get_partner_key()
+        return [self.receive(data, partner_key) for data in payloads]
+
+    def parse(self, query_string, content_type, body):
+        """
+        解析 url 参数及表单或 JSON 请求体
+        """
+        data = dict(parse_qsl(to_text(query_string)))
+        if body:
+            if 'json' in (content_type or ''):
+                payload = json.loads(to_text(body))
+                if not isinstance(payload, dict):
+                    raise ValueError('callback body must be a JSON object')
+                data.update(payload)
+            else:
+                data.update(parse_qsl(to_text(body)))
+        return data
+
+    def handle(self, query_string, content_type, body):
+        """
+        处理一个 HTTP 回调请求，返回 (http 状态码, 响应体)
+        """
+        if body is not None and len(body) > self.max_body_size:
+            return 413, b''
+        try:
+            data = self.parse(query_string, content_type, body)
+        except ValueError:
+            return 400, b''
+        status, result = RESPONSES[self.receive(data)]
+        return status, json.dumps(result).encode('utf-8')
+
+    def __call__(self, environ, start_response):
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length > self.max_body_size:
+            status, body = 413, b''
+        else:
+            body = environ['wsgi.input'].read(length) if length else b''
+            status, body = self.handle(environ.get('QUERY_STRING', ''), environ.get('CONTENT_TYPE'), body)
+        start_response(str(HTTP_STATUS[status]), [
+            (str('Content-Type'), str('application/json')),
+            (str('Content-Length'), str(len(body))),
+        ])
+        return [body]
+
+    def asgi_app(self):
+        """
+        返回 ASGI 应用，验签在事件循环中同步执行，partner_key 需已缓存或可快速获取
+        """
+        from .asgi import ASGICallbackApp
+        return ASGICallbackApp(self)
+
+    def close(self):
+        close = getattr(self.sink, 'close', None)
+        if close is not None:
+            close()
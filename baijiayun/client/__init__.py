@@ -2,72 +2,157 @@
 from __future__ import absolute_import, unicode_literals
 
 import logging
+import os
+import threading
 import time
 
-from . import api
 from .base import BaseClient
-from ..core.utils import Md5Signer, to_text
-from ..storage.cache import BaiJiaYunClientCache
-from ..storage.memorystorage import MemoryStorage
+from .mixin import BaiJiaYunMixin, default_storage  # noqa: F401
 
 logger = logging.getLogger(__name__)
-default_storage = MemoryStorage()
-
-
-class BaiJiaYunClient(BaseClient):
-    doc = api.Doc()
-    evaluation = api.Evaluation()
-    hudong = api.HuDong()
-    live = api.Live()
-    liveaccount = api.LiveAccount()
-    livesetting = api.LiveSetting()
-    notice = api.Notice()
-    playback = api.PlayBack()
-    quiz = api.Quiz()
-    room = api.Room()
-    roomdata = api.RoomData()
-    smallcourse = api.SmallCourse()
-    subaccount = api.SubAccount()
-    video = api.Video()
-    videoaccount = api.VideoAccount()
-    videodata = api.VideoData()
-
-    def __init__(self, partner_id, secret_key, private_domain=None, cache_prefix=None, storage=None, timeout=None):
-        super(BaiJiaYunClient, self).__init__(timeout)
-        self.partner_id = partner_id
-        self.secret_key = secret_key
-        self.private_domain = private_domain
-        self.cache = BaiJiaYunClientCache(storage or default_storage, cache_prefix or self.partner_id)
-        if private_domain is not None:
-            self.API_BASE_URL = 'https://%s.at.baijiayun.com/' % private_domain
+
+
+class BaiJiaYunClient(BaiJiaYunMixin, BaseClient):
+    """
+    百家云客户端
+
+    :param partner_id: 账号 partner_id
+    :param secret_key: 账号 secret_key
+    :param private_domain: 专属域名，不传使用 api.baijiayun.com
+    :param cache_prefix: 缓存 key 前缀，默认为 partner_id
+    :param storage: partner_key 等缓存使用的存储，默认为进程内 MemoryStorage
+    :param timeout: 请求超时时间（秒）
+    :param transport: 共用的 HttpTransport，传入后忽略下面的连接池参数，多个客户端可共用同一个 transport
+    :param pool_connections: 每个域名缓存的连接池数量
+    :param pool_maxsize: 每个域名连接池保持的最大连接数
+    :param pool_block: 连接数达到 pool_maxsize 时是否等待空闲连接，为 True 时 pool_maxsize 即单域名最大连接数
+    :param keep_alive: 是否保持长连接
+    :param max_connections: 所有域名合计的最大并发请求（连接）数，None 为不限制
+    :param retry_policy: 只读接口（get*、list*、export*、info）重试策略 RetryPolicy，None 为不重试
+    :param circuit_breaker: 按接口熔断 CircuitBreaker，None 为不熔断
+    :param rate_limiter: 按 partner_id 限流 RateLimiter，可通过 storage 在多进程间共享，None 为不限流
+    :param concurrency_limiter: 自适应并发限制 AIMDLimiter，当前上限见 concurrency_limiter.limit，None 为不限制
+    :param lanes: 优先级通道 Lane 列表，每个通道使用独立的连接池和并发额度
+    :param lane_routes: {接口 uri 或接口分组: 通道名}，如 {'/openapi/video/getPlayerToken': 'interactive',
+        'room_data': 'bulk'}，也可用 with client.lane(name) 指定，未匹配的请求使用默认连接池及 concurrency_limiter
+    :param single_flight: 是否合并参数相同且正在进行中的只读接口请求（如同时大量调用 room.info(room_id)），
+        只发出一次请求，合并的调用共用同一个结果对象，合并次数见 client.single_flight.shared
+    :param hedge_policy: 只读接口对冲请求 HedgePolicy，超过历史耗时分位数未返回时再发一个相同请求，None 为不对冲
+    :param decoder: 响应解码器，默认为 JsonDecoder()（返回 ObjectDict），大数据量导出可使用 dict_decoder()
+        返回普通 dict（安装了 orjson 时使用 orjson），需要属性访问时用 to_object_dict 转换，
+        client.get/client.post 也可传入 decoder 只对单次请求生效
+    """
+
+    def __init__(self, partner_id, secret_key, private_domain=None, cache_prefix=None, storage=None, timeout=None,
+                 transport=None, pool_connections=10, pool_maxsize=10, pool_block=False, keep_alive=True,
+                 max_connections=None, retry_policy=None, circuit_breaker=None,
+                 rate_limiter=None, concurrency_limiter=None, lanes=None, lane_routes=None,
+                 single_flight=False, hedge_policy=None, decoder=None):
+        super(BaiJiaYunClient, self).__init__(
+            timeout,
+            transport=transport,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            keep_alive=keep_alive,
+            max_connections=max_connections,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            rate_limiter=rate_limiter,
+            concurrency_limiter=concurrency_limiter,
+            lanes=lanes,
+            lane_routes=lane_routes,
+            single_flight=single_flight,
+            hedge_policy=hedge_policy,
+            decoder=decoder
+        )
+        self._init_partner(partner_id, secret_key, private_domain, cache_prefix, storage)
+        self._partner_key_pid = None
 
     @property
     def partner_key(self):
         return self.get_partner_key()
 
+    def _partner_key_locks(self):
+        # (refresh lock, background refresh lock), recreated after fork since a thread may hold them
+        pid = os.getpid()
+        if self._partner_key_pid != pid:
+            self._partner_key_pid = pid
+            self._partner_key_lock = threading.Lock()
+            self._partner_key_refresh_lock = threading.Lock()
+        return self._partner_key_lock, self._partner_key_refresh_lock
+
     def get_partner_key(self, regenerate=0, force=False):
-        partner_key = self.cache.partner_key.get()
-        if partner_key is None or force:
-            partner_key = self._request(
-                'POST',
-                '/openapi/partner/createkey',
-                data={
-                    'partner_id': self.partner_id,
-                    'secret_key': self.secret_key,
-                    'regenerate': regenerate,
-                    'timestamp': int(time.time())
-                },
-                result_processor=lambda x: x['partner_key']
-            )
-            self.cache.partner_key.set(value=partner_key, ttl=7200)
+        """
+        获取 partner_key，依次读取进程内缓存、storage，都未命中时请求生成。
+        同一时间只有一个线程、一个进程（通过 storage 加锁）请求生成，即将过期时在后台线程提前刷新
+
+        :param regenerate: 是否重新生成 partner_key
+        :param force: 不使用缓存，重新请求
+        """
+        if not force:
+            partner_key = self._cached_partner_key()
+            if partner_key is not None:
+                if self._partner_key_expiring():
+                    self._refresh_partner_key_ahead()
+                return partner_key
+        return self._refresh_partner_key(regenerate, force)
+
+    def _refresh_partner_key(self, regenerate=0, force=False, ahead=False):
+        lock, _ = self._partner_key_locks()
+        with lock:
+            if not force:
+                # another thread or process may have refreshed the key while we were waiting
+                partner_key = self._fresh_partner_key(ahead)
+                if partner_key is not None:
+                    return partner_key
+            locked = self._acquire_partner_key_lock()
+            if not locked and not force:
+                partner_key = self._cached_partner_key() if ahead else self._wait_partner_key()
+                if partner_key is not None:
+                    return partner_key
+            try:
+                partner_key = self._request(
+                    'POST', '/openapi/partner/createkey', **self._create_partner_key_kwargs(regenerate)
+                )
+                self._store_partner_key(partner_key)
+            finally:
+                if locked:
+                    self._release_partner_key_lock(locked)
         return partner_key
 
+    def _wait_partner_key(self):
+        # another process holds the storage lock, wait for the key it creates
+        deadline = time.time() + self.PARTNER_KEY_LOCK_TTL
+        while time.time() < deadline:
+            time.sleep(self.PARTNER_KEY_LOCK_POLL_INTERVAL)
+            partner_key = self._fresh_partner_key()
+            if partner_key is not None:
+                return partner_key
+        return None
+
+    def _refresh_partner_key_ahead(self):
+        _, refresh_lock = self._partner_key_locks()
+        if not refresh_lock.acquire(False):
+            return
+        thread = threading.Thread(target=self._refresh_partner_key_worker, args=(refresh_lock, ))
+        thread.daemon = True
+        try:
+            thread.start()
+        except Exception:
+            refresh_lock.release()
+            raise
+
+    def _refresh_partner_key_worker(self, refresh_lock):
+        try:
+            self._refresh_partner_key(ahead=True)
+        except Exception:
+            logger.warning('提前刷新 partner_key 失败', exc_info=True)
+        finally:
+            refresh_lock.release()
+
     def get_sign(self, data):
-        signer = Md5Signer(delimiter=b'&', key="partner_key=" + self.partner_key)
-        for k, v in data.items():
-            v = to_text(v)
-            signer.add_data("%s=%s" % (k, v))
-        return signer.signature
+        return self._sign_with_key(data, self.partner_key)
 
     def add_sign(self, data, timestamp_key="timestamp", sign_key="sign"):
         if timestamp_key and timestamp_key not in data:
@@ -76,12 +161,7 @@ class BaiJiaYunClient(BaseClient):
         return data
 
     def _handle_pre_request(self, method, uri, kwargs):
-        if method == 'POST':
-            data = kwargs.setdefault('data', dict())
-            data.update(kwargs.pop('params', dict()))
-        else:
-            data = kwargs.setdefault('params', dict())
-        self.add_sign(data)
+        self.add_sign(self._sign_target(method, kwargs))
         return method, uri, kwargs
 
     def _handle_request_except(self, e, func, *args, **kwargs):
@@ -98,16 +178,23 @@ class BaiJiaYunClient(BaseClient):
         :param user_avatar: 用户头像url ，必须传http/https开头的绝对路径
         :param group_id: 分组号
         """
-        data = {
-            'room_id': room_id,
-            'user_number': user_number,
-            'user_name': user_name,
-            'user_role': user_role,
-            'user_avatar': user_avatar
-        }
-        if group_id is not None:
-            data['group_id'] = group_id
-        return self.get_sign(data)
+        return self.get_sign(self._web_sign_data(room_id, user_number, user_name, user_role, user_avatar, group_id))
+
+    def get_web_sign_many(self, records, query=False, processes=None, chunksize=1000):
+        """
+        批量计算直播进教室签名，所有签名使用同一个 partner_key，按输入顺序返回生成器::
+
+            records = [(room_id, user_number, user_name, 0) for user_number, user_name in students]
+            for query_string in client.get_web_sign_many(records, query=True):
+                url = 'https://www.baijiayun.com/web/room/enter?' + query_string
+
+        :param records: (room_id, user_number, user_name, user_role, user_avatar, group_id) 的可迭代对象，
+            user_avatar、group_id 可省略
+        :param query: 为 True 时返回包含 sign 的进教室 url 参数，否则返回签名
+        :param processes: 使用多进程计算的进程数，人数很多（数万）时使用，None 为在当前线程计算
+        :param chunksize: 多进程计算时每个任务的记录数
+        """
+        return self._web_signs(self.partner_key, records, query, processes, chunksize)
 
     def check_sign(self, data, check_timestamp_second=300):
         """
@@ -116,12 +203,7 @@ class BaiJiaYunClient(BaseClient):
         :param data: 请求全部数据
         :param check_timestamp_second: 时间戳与服务器时间误差范围，传0不验证时间戳
         """
-        assert isinstance(data, dict)
-        if 'sign' not in data:
+        data, sign = self._split_sign(data, check_timestamp_second)
+        if data is None:
             return False
-        if check_timestamp_second > 0:
-            if 'timestamp' not in data or abs(data['timestamp'] - time.time()) > check_timestamp_second:
-                return False
-        data = data.copy()
-        sign = data.pop('sign', None)
         return sign == self.get_sign(data)
@@ -0,0 +1,689 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import asyncio
+import collections
+import contextvars
+import logging
+import time
+
+from .base import _COLUMNS_DECODER, BaseClient
+from .mixin import BaiJiaYunMixin
+from .transport import PoolStats
+from ..core.columns import Columns
+from ..core.exceptions import ClientException
+from ..core.singleflight import AsyncSingleFlight, SharedResult, request_key
+from ..core.stream import RowParser
+from ..core.utils import ObjectDict, to_text
+
+logger = logging.getLogger(__name__)
+
+# {id(client): lane} set by AsyncBaseClient.lane(), each task works on its own copy
+_CURRENT_LANES = contextvars.ContextVar('baijiayun_lanes', default=None)
+
+
+def _import_aiohttp():
+    try:
+        import aiohttp
+    except ImportError:  # pragma: no cover
+        raise RuntimeError('AsyncBaiJiaYunClient 需要安装 aiohttp: pip install baijiayun[async]')
+    return aiohttp
+
+
+class AioHttpTransport(object):
+    """
+    aiohttp 连接池封装，统计方式与 HttpTransport 一致
+
+    :param limit: 连接池最大连接数，0 为不限制
+    :param limit_per_host: 单个域名最大连接数，0 为不限制
+    :param session: 共用的 aiohttp.ClientSession，传入后 close 时不会关闭，也不会统计连接池
+    """
+
+    def __init__(self, limit=100, limit_per_host=0, session=None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self._session = session
+        self._own_session = session is None
+        self._stats = {}
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            aiohttp = _import_aiohttp()
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(connector=connector, trace_configs=[self._trace_config()])
+            self._own_session = True
+        return self._session
+
+    def _pool_stats(self, url):
+        base_url = '{0}://{1}/'.format(url.scheme, url.raw_authority)
+        stats = self._stats.get(base_url)
+        if stats is None:
+            stats = self._stats[base_url] = PoolStats()
+        return stats
+
+    def _trace_config(self):
+        aiohttp = _import_aiohttp()
+
+        async def on_request_start(session, ctx, params):
+            ctx.stats = self._pool_stats(params.url)
+            ctx.wait_time = 0.0
+
+        async def on_connection_queued_start(session, ctx, params):
+            ctx.queued_at = time.time()
+
+        async def on_connection_queued_end(session, ctx, params):
+            ctx.wait_time = time.time() - ctx.queued_at
+
+        async def on_connection_create_end(session, ctx, params):
+            ctx.stats.record_new_connection()
+            ctx.stats.record_checkout(ctx.wait_time)
+
+        async def on_connection_reuseconn(session, ctx, params):
+            ctx.stats.record_checkout(ctx.wait_time)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def request(self, method, url, **kwargs):
+        return self.session.request(method=method, url=url, **kwargs)
+
+    def stats(self):
+        """
+        各域名连接池统计
+
+        :return: {base_url: {requests, connections, reuse_ratio, wait_time, avg_wait_time, max_wait_time}}
+        """
+        return dict((base_url, stats.as_dict()) for base_url, stats in list(self._stats.items()))
+
+    async def close(self):
+        if self._own_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class AsyncRowStream(object):
+    """
+    RowStream 的 asyncio 版本，读取完毕、出错或调用 aclose() 后释放连接::
+
+        rows = await client.roomdata.export_live_report(room_id, stream=True)
+        async with rows:
+            async for row in rows:
+                ...
+    """
+
+    def __init__(self, client, res, parser, url, chunk_size):
+        self.parser = parser
+        self._client = client
+        self._res = res
+        self._url = url
+        self._chunk_size = chunk_size
+        self._rows = collections.deque()
+
+    @property
+    def meta(self):
+        return self.parser.meta
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._rows:
+            if self._res is None:
+                raise StopAsyncIteration
+            await self._read()
+        return self._rows.popleft()
+
+    async def _read(self):
+        aiohttp = _import_aiohttp()
+        res = self._res
+        try:
+            try:
+                chunk = await res.content.read(self._chunk_size)
+                if chunk and not self.parser.done:
+                    self._rows.extend(self.parser.feed(chunk))
+                    return
+                self._rows.extend(self.parser.close())
+            except (aiohttp.ClientError, asyncio.TimeoutError) as reqe:
+                logger.error("\n【请求地址】: %s\n【异常信息】：%r", self._url, reqe)
+                raise ClientException(code=None, msg=to_text(reqe) or None, client=self._client, response=res)
+            except ValueError as e:
+                logger.error("\n【请求地址】: %s\n【异常信息】：响应不是合法的 JSON %s", self._url, e)
+                raise ClientException(code=None, msg=to_text(e), client=self._client, response=res)
+            self._client._check_stream_code(self.parser, res.request_info, res, self._url)
+        except BaseException:
+            self._rows.clear()
+            self._close(reuse=False)
+            raise
+        self._close(reuse=True)
+
+    def _close(self, reuse):
+        res, self._res = self._res, None
+        if res is not None:
+            if reuse:
+                res.release()
+            else:
+                res.close()
+
+    async def aclose(self):
+        self._rows.clear()
+        self._close(reuse=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+
+class AsyncBatch(object):
+    """
+    AsyncBaseClient 的批量并发调用，通过 client.batch() 创建
+
+    submit 的调用立即创建 Task，同时执行的调用不超过 max_workers，退出 async with 时等待全部完成，
+    单个调用的 ClientException 记录在 errors 中，不影响其他调用
+    """
+
+    def __init__(self, client, max_workers=10):
+        self.client = client
+        self.max_workers = max_workers
+        self.tasks = []
+        self.errors = []
+        self._semaphore = None
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.max_workers)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            for task in self.tasks:
+                task.cancel()
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def submit(self, awaitable):
+        """
+        提交接口调用（如 client.room.info(room_id) 返回的 coroutine），返回 Task
+        """
+        task = asyncio.ensure_future(self._run(len(self.tasks), awaitable))
+        self.tasks.append(task)
+        return task
+
+    async def _run(self, index, awaitable):
+        async with self._semaphore:
+            try:
+                return await awaitable
+            except ClientException as e:
+                self.errors.append((index, e))
+                raise
+
+    def results(self):
+        """
+        按提交顺序返回结果，失败的调用位置为对应的异常
+        """
+        return [self._result(task) for task in self.tasks]
+
+    async def as_completed(self):
+        """
+        按完成顺序返回 (提交序号, 结果或异常) 的异步迭代器
+        """
+        index = dict((task, i) for i, task in enumerate(self.tasks))
+        pending = set(self.tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=index.get):
+                yield index[task], self._result(task)
+
+    @staticmethod
+    def _result(task):
+        if task.cancelled():
+            return asyncio.CancelledError()
+        exc = task.exception()
+        if exc is not None:
+            return exc
+        return task.result()
+
+
+class AsyncBaseClient(BaseClient):
+    """
+    asyncio 客户端基类
+
+    网络异常（aiohttp.ClientError、超时）与 HTTP 错误状态码统一抛出 code 为 None 的 ClientException
+    """
+    LIMITER_POLL_INTERVAL = 0.005
+
+    def __init__(self, timeout=None, limit=100, limit_per_host=0, session=None, retry_policy=None,
+                 circuit_breaker=None, rate_limiter=None, concurrency_limiter=None, lanes=None, lane_routes=None,
+                 single_flight=False, hedge_policy=None, decoder=None):
+        """
+        :param timeout: 请求超时时间（秒），可传 (connect, read) 元组
+        :param limit: 连接池最大连接数，0 为不限制
+        :param limit_per_host: 单个域名最大连接数，0 为不限制
+        :param session: 共用的 aiohttp.ClientSession，传入后 close 时不会关闭
+        :param retry_policy: 只读接口重试策略 RetryPolicy，None 为不重试
+        :param circuit_breaker: 按接口熔断 CircuitBreaker，None 为不熔断
+        :param rate_limiter: 按 partner_id 限流 RateLimiter，None 为不限流
+        :param concurrency_limiter: 自适应并发限制 AIMDLimiter，None 为不限制
+        :param lanes: 优先级通道 Lane 列表，每个通道使用独立的连接池和并发额度
+        :param lane_routes: {接口 uri 或接口分组: 通道名}
+        :param single_flight: 是否合并参数相同且正在进行中的只读接口请求
+        :param hedge_policy: 只读接口对冲请求 HedgePolicy，None 为不对冲
+        :param decoder: 响应解码器，见 baijiayun.core.decoders，默认为 JsonDecoder()
+        """
+        super(AsyncBaseClient, self).__init__(
+            timeout,
+            transport=AioHttpTransport(limit=limit, limit_per_host=limit_per_host, session=session),
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            rate_limiter=rate_limiter,
+            concurrency_limiter=concurrency_limiter,
+            lanes=lanes,
+            lane_routes=lane_routes,
+            single_flight=single_flight,
+            hedge_policy=hedge_policy,
+            decoder=decoder
+        )
+        self._own_transport = True
+
+    def _new_single_flight(self):
+        return AsyncSingleFlight()
+
+    def _new_lane_transport(self, lane):
+        return AioHttpTransport(limit=lane.pool_maxsize)
+
+    def _current_lane(self):
+        # coroutines share the thread, the lane is kept per task in a context variable
+        lanes = _CURRENT_LANES.get()
+        return lanes.get(id(self)) if lanes else None
+
+    def _set_current_lane(self, lane):
+        lanes = dict(_CURRENT_LANES.get() or {})
+        lanes[id(self)] = lane
+        return _CURRENT_LANES.set(lanes)
+
+    def _reset_current_lane(self, token):
+        _CURRENT_LANES.reset(token)
+
+    @property
+    def session(self):
+        return self.transport.session
+
+    def batch(self, max_workers=10):
+        """
+        并发批量调用，最多 max_workers 个调用同时执行::
+
+            async with client.batch(max_workers=20) as batch:
+                for room_id in room_ids:
+                    batch.submit(client.room.info(room_id))
+            infos = batch.results()
+
+        :param max_workers: 最大并发调用数
+        """
+        return AsyncBatch(self, max_workers=max_workers)
+
+    async def close(self):
+        for transport in self._owned_transports():
+            await transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _client_timeout(self, timeout):
+        aiohttp = _import_aiohttp()
+        if timeout is None:
+            return aiohttp.ClientTimeout(total=None)
+        if isinstance(timeout, (tuple, list)):
+            return aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        return aiohttp.ClientTimeout(total=timeout)
+
+    def _form_data(self, data, files):
+        aiohttp = _import_aiohttp()
+        form = aiohttp.FormData()
+        for k, v in (data or {}).items():
+            form.add_field(k, to_text(v))
+        for k, v in files.items():
+            if isinstance(v, (tuple, list)):
+                content_type = v[2] if len(v) > 2 else None
+                form.add_field(k, v[1], filename=v[0], content_type=content_type)
+            else:
+                form.add_field(k, v, filename=getattr(v, 'name', k))
+        return form
+
+    async def _request(self, method, url_or_endpoint, **kwargs):
+        aiohttp = _import_aiohttp()
+        files = kwargs.pop('files', None)
+        if files:
+            kwargs['data'] = self._form_data(kwargs.pop('data', None), files)
+        url, kwargs = self._prepare_request(method, url_or_endpoint, kwargs)
+        result_processor = kwargs.pop('result_processor', None)
+        decoder = kwargs.pop('decoder', None)
+        transport = kwargs.pop('transport', None) or self.transport
+        kwargs['timeout'] = self._client_timeout(kwargs['timeout'])
+        try:
+            async with transport.request(method, url, **kwargs) as res:
+                await res.read()
+                try:
+                    res.raise_for_status()
+                except aiohttp.ClientResponseError as reqe:
+                    logger.error("\n【请求地址】: %s\n【请求参数】：%s \n%s\n【异常信息】：%s",
+                                 url, kwargs.get('params', ''), kwargs.get('data', ''), reqe)
+                    raise ClientException(
+                        code=None, msg=None, client=self, request=reqe.request_info, response=res
+                    )
+                result = await self._handle_result(res, method, url, result_processor, decoder=decoder, **kwargs)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as reqe:
+            logger.error("\n【请求地址】: %s\n【请求参数】：%s \n%s\n【异常信息】：%r",
+                         url, kwargs.get('params', ''), kwargs.get('data', ''), reqe)
+            raise ClientException(code=None, msg=to_text(reqe) or None, client=self)
+
+        logger.debug("\n【请求地址】: %s\n【请求参数】：%s \n%s\n【响应数据】：%s",
+                     url, kwargs.get('params', ''), kwargs.get('data', ''), result)
+        return result
+
+    async def _decode_result(self, res, decoder=None):
+        try:
+            result = self._decode_content(await res.read(), decoder)
+        except (TypeError, ValueError):
+            # Return origin response object if we can not decode it as JSON
+            logger.debug('Can not decode response as JSON', exc_info=True)
+            return res
+        return result
+
+    async def _handle_result(self, res, method=None, url=None, result_processor=None, decoder=None, **kwargs):
+        if not isinstance(res, dict):
+            result = await self._decode_result(res, decoder)
+        else:
+            result = res
+        return self._process_result(result, res, getattr(res, 'request_info', None), url, result_processor, **kwargs)
+
+    async def _handle_pre_request(self, method, uri, kwargs):
+        return method, uri, kwargs
+
+    async def _handle_request_except(self, e, func, *args, **kwargs):
+        raise e
+
+    async def _acquire_rate_limit(self, uri):
+        if self.rate_limiter is not None:
+            partner_id = getattr(self, 'partner_id', None)
+            delay = self.rate_limiter.try_acquire(partner_id, uri)
+            while delay > 0:
+                await asyncio.sleep(delay)
+                delay = self.rate_limiter.try_acquire(partner_id, uri)
+
+    async def _attempt(self, method, uri, kwargs):
+        await self._acquire_rate_limit(uri)
+        lane = kwargs.pop('lane', None)
+        limiter = self.concurrency_limiter
+        if lane is not None:
+            limiter = lane.limiter
+            kwargs['transport'] = lane.transport
+        if limiter is None:
+            return await self._guarded_request(method, uri, kwargs)
+        started_at = limiter.try_acquire()
+        while started_at is None:
+            await asyncio.sleep(self.LIMITER_POLL_INTERVAL)
+            started_at = limiter.try_acquire()
+        exc = None
+        try:
+            return await self._guarded_request(method, uri, kwargs)
+        except ClientException as e:
+            exc = e
+            raise
+        finally:
+            limiter.release(started_at, exc)
+
+    async def _hedged_attempt(self, method, uri, kwargs):
+        hedge = self.hedge_policy
+        if hedge is None or not hedge.applies(uri):
+            return await self._attempt(method, uri, kwargs)
+        started_at = time.time()
+        delay = hedge.delay(uri)
+        if delay is None:
+            result = await self._attempt(method, uri, kwargs)
+            hedge.record(uri, time.time() - started_at)
+            return result
+        hedge_kwargs = self._copy_request_kwargs(kwargs)
+        first = asyncio.ensure_future(self._attempt(method, uri, kwargs))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and hedge.try_hedge():
+                logger.info('请求 %s 超过 %.3f 秒未返回，发送对冲请求', uri, delay)
+                second = asyncio.ensure_future(self._attempt(method, uri, hedge_kwargs))
+                tasks.append(second)
+                pending = tasks
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            if task is second:
+                                hedge.on_hedge_win()
+                            hedge.record(uri, time.time() - started_at)
+                            return task.result()
+            result = await first
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        hedge.record(uri, time.time() - started_at)
+        return result
+
+    async def _guarded_request(self, method, uri, kwargs):
+        method, uri_with_access_token, kwargs = await self._handle_pre_request(method, uri, kwargs)
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return await self._request(method, uri_with_access_token, **kwargs)
+        breaker.before_call(uri)
+        try:
+            result = await self._request(method, uri_with_access_token, **kwargs)
+        except ClientException as e:
+            breaker.on_failure(uri, e)
+            raise
+        except BaseException:
+            # cancelled (hedging, asyncio timeouts) or interrupted, no outcome to report
+            breaker.on_abort(uri)
+            raise
+        breaker.on_success(uri)
+        return result
+
+    async def request(self, method, uri, **kwargs):
+        self._select_lane(uri, kwargs)
+        key = request_key(method, uri, kwargs) if self.single_flight is not None else None
+        if key is None:
+            return await self._do_request(method, uri, **kwargs)
+        result_processor = kwargs.pop('result_processor', None)
+        kwargs['result_processor'] = SharedResult
+        result = await self.single_flight.do(key, self._do_request, method, uri, **kwargs)
+        return self._process_shared_result(result, uri, result_processor)
+
+    async def _do_request(self, method, uri, **kwargs):
+        retry_policy = self.retry_policy
+        attempt = 0
+        while True:
+            attempt += 1
+            attempt_kwargs = self._copy_request_kwargs(kwargs)
+            try:
+                result = await self._hedged_attempt(method, uri, attempt_kwargs)
+            except ClientException as e:
+                if retry_policy is not None and retry_policy.should_retry(uri, e, attempt):
+                    delay = retry_policy.backoff(attempt)
+                    logger.warning('请求 %s 失败（%r），%.3f 秒后第 %d 次重试', uri, e, delay, attempt)
+                    await asyncio.sleep(delay)
+                    continue
+                return await self._handle_request_except(e, self.request, method, uri, **attempt_kwargs)
+            if retry_policy is not None:
+                retry_policy.on_success()
+            return result
+
+    async def stream_rows(self, method, uri, path=('data', 'list'), chunk_size=65536, record=None,
+                          fields=None, **kwargs):
+        """
+        流式请求返回大量记录的接口，参数同 BaseClient.stream_rows，返回 AsyncRowStream
+        """
+        aiohttp = _import_aiohttp()
+        self._select_lane(uri, kwargs)
+        lane = kwargs.pop('lane', None)
+        if lane is not None:
+            kwargs['transport'] = lane.transport
+        await self._acquire_rate_limit(uri)
+        method, uri, kwargs = await self._handle_pre_request(method, uri, kwargs)
+        url, kwargs = self._prepare_request(method, uri, kwargs)
+        decoder = kwargs.pop('decoder', None) or self.decoder
+        transport = kwargs.pop('transport', None) or self.transport
+        kwargs['timeout'] = self._client_timeout(kwargs['timeout'])
+        try:
+            res = await transport.request(method, url, **kwargs)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as reqe:
+            logger.error("\n【请求地址】: %s\n【请求参数】：%s \n%s\n【异常信息】：%r",
+                         url, kwargs.get('params', ''), kwargs.get('data', ''), reqe)
+            raise ClientException(code=None, msg=to_text(reqe) or None, client=self)
+        try:
+            res.raise_for_status()
+        except aiohttp.ClientResponseError as reqe:
+            res.release()
+            logger.error("\n【请求地址】: %s\n【请求参数】：%s \n%s\n【异常信息】：%s",
+                         url, kwargs.get('params', ''), kwargs.get('data', ''), reqe)
+            raise ClientException(code=None, msg=None, client=self, request=reqe.request_info, response=res)
+        parser = RowParser(path, None if record else getattr(decoder, 'object_class', ObjectDict), record, fields)
+        return AsyncRowStream(self, res, parser, url, chunk_size)
+
+    async def stream_columns(self, method, uri, path=('data', 'list'), types=None, **kwargs):
+        """
+        流式请求并在解析时按列保存记录，参数同 BaseClient.stream_columns，返回 Columns
+        """
+        kwargs.setdefault('decoder', _COLUMNS_DECODER)
+        columns = Columns(types)
+        async with await self.stream_rows(method, uri, path, **kwargs) as rows:
+            async for row in rows:
+                columns.append(row)
+        return columns
+
+
+class AsyncBaiJiaYunClient(BaiJiaYunMixin, AsyncBaseClient):
+    """
+    BaiJiaYunClient 的 asyncio 版本，接口与 BaiJiaYunClient 一致，所有接口方法返回 coroutine::
+
+        async with AsyncBaiJiaYunClient('<partner_id>', '<secret_key>') as client:
+            rooms = await client.room.list()
+
+    partner_key 缓存仍通过同步的 storage 读写，应使用 MemoryStorage 等本地存储，
+    避免远程存储阻塞事件循环。
+    """
+
+    def __init__(self, partner_id, secret_key, private_domain=None, cache_prefix=None, storage=None, timeout=None,
+                 limit=100, limit_per_host=0, session=None, retry_policy=None, circuit_breaker=None,
+                 rate_limiter=None, concurrency_limiter=None, lanes=None, lane_routes=None,
+                 single_flight=False, hedge_policy=None, decoder=None):
+        super(AsyncBaiJiaYunClient, self).__init__(
+            timeout,
+            limit=limit,
+            limit_per_host=limit_per_host,
+            session=session,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            rate_limiter=rate_limiter,
+            concurrency_limiter=concurrency_limiter,
+            lanes=lanes,
+            lane_routes=lane_routes,
+            single_flight=single_flight,
+            hedge_policy=hedge_policy,
+            decoder=decoder
+        )
+        self._init_partner(partner_id, secret_key, private_domain, cache_prefix, storage)
+        self._partner_key_lock = None
+        self._partner_key_refresh_task = None
+
+    async def get_partner_key(self, regenerate=0, force=False):
+        if not force:
+            partner_key = self._cached_partner_key()
+            if partner_key is not None:
+                if self._partner_key_expiring() and self._partner_key_refresh_task is None:
+                    self._partner_key_refresh_task = asyncio.ensure_future(self._refresh_partner_key_ahead())
+                return partner_key
+        return await self._refresh_partner_key(regenerate, force)
+
+    async def _refresh_partner_key(self, regenerate=0, force=False, ahead=False):
+        if self._partner_key_lock is None:
+            self._partner_key_lock = asyncio.Lock()
+        async with self._partner_key_lock:
+            if not force:
+                # another coroutine or process may have refreshed the key while we were waiting
+                partner_key = self._fresh_partner_key(ahead)
+                if partner_key is not None:
+                    return partner_key
+            locked = self._acquire_partner_key_lock()
+            if not locked and not force:
+                partner_key = self._cached_partner_key() if ahead else await self._wait_partner_key()
+                if partner_key is not None:
+                    return partner_key
+            try:
+                partner_key = await self._request(
+                    'POST', '/openapi/partner/createkey', **self._create_partner_key_kwargs(regenerate)
+                )
+                self._store_partner_key(partner_key)
+            finally:
+                if locked:
+                    self._release_partner_key_lock(locked)
+        return partner_key
+
+    async def _wait_partner_key(self):
+        deadline = time.time() + self.PARTNER_KEY_LOCK_TTL
+        while time.time() < deadline:
+            await asyncio.sleep(self.PARTNER_KEY_LOCK_POLL_INTERVAL)
+            partner_key = self._fresh_partner_key()
+            if partner_key is not None:
+                return partner_key
+        return None
+
+    async def _refresh_partner_key_ahead(self):
+        try:
+            await self._refresh_partner_key(ahead=True)
+        except Exception:
+            logger.warning('提前刷新 partner_key 失败', exc_info=True)
+        finally:
+            self._partner_key_refresh_task = None
+
+    async def get_sign(self, data):
+        return self._sign_with_key(data, await self.get_partner_key())
+
+    async def add_sign(self, data, timestamp_key="timestamp", sign_key="sign"):
+        if timestamp_key and timestamp_key not in data:
+            data[timestamp_key] = int(time.time())
+        data[sign_key] = await self.get_sign(data)
+        return data
+
+    async def _handle_pre_request(self, method, uri, kwargs):
+        await self.add_sign(self._sign_target(method, kwargs))
+        return method, uri, kwargs
+
+    async def get_web_sign(self, room_id, user_number, user_name, user_role, user_avatar='', group_id=None):
+        """
+        直播进教室签名的计算，参数同 BaiJiaYunClient.get_web_sign
+        """
+        return await self.get_sign(
+            self._web_sign_data(room_id, user_number, user_name, user_role, user_avatar, group_id)
+        )
+
+    async def get_web_sign_many(self, records, query=False, processes=None, chunksize=1000):
+        """
+        批量计算直播进教室签名，参数同 BaiJiaYunClient.get_web_sign_many，返回生成器
+        """
+        return self._web_signs(await self.get_partner_key(), records, query, processes, chunksize)
+
+    async def check_sign(self, data, check_timestamp_second=300):
+        """
+        回调接口签名验证，参数同 BaiJiaYunClient.check_sign
+        """
+        data, sign = self._split_sign(data, check_timestamp_second)
+        if data is None:
+            return False
+        return sign == await self.get_sign(data)
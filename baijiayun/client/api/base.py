@@ -1,6 +1,21 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals
 
+from ...core.decoders import ProjectionDecoder, dict_decoder
+from ...core.records import to_records
+from ...core.utils import ObjectDict
+
+# rows converted to records are decoded as plain dicts first
+_RECORD_DECODER = dict_decoder()
+
+
+def _record_processor(result_processor, record):
+    def process(result):
+        if result_processor is not None:
+            result = result_processor(result)
+        return to_records(result, record)
+    return process
+
 
 class BaseAPI(object):
 
@@ -21,5 +36,27 @@ class BaseAPI(object):
     def _get(self, uri, params=None, **kwargs):
         return self._client.get(uri, params=params, **kwargs)
 
-    def _post(self, uri, data=None, params=None, **kwargs):
+    def _post(self, uri, data=None, params=None, stream=False, record=None, columnar=False, rows_path=('data', 'list'),
+              fields=None, **kwargs):
+        if stream or columnar:
+            # rows are read from rows_path, result_processor does not apply
+            kwargs.pop('result_processor', None)
+            if data is not None:
+                kwargs['data'] = data
+            if params is not None:
+                kwargs['params'] = params
+            if fields is not None:
+                kwargs['fields'] = fields
+            if columnar:
+                types = columnar if isinstance(columnar, dict) else None
+                return self._client.stream_columns('POST', uri, rows_path, types=types, **kwargs)
+            return self._client.stream_rows('POST', uri, rows_path, record=record, **kwargs)
+        if fields is not None:
+            # other fields of the rows are dropped while decoding
+            object_class = None if record is not None else getattr(self._client.decoder, 'object_class', ObjectDict)
+            kwargs.setdefault('decoder', ProjectionDecoder(fields, rows_path, object_class))
+        elif record is not None:
+            kwargs.setdefault('decoder', _RECORD_DECODER)
+        if record is not None:
+            kwargs['result_processor'] = _record_processor(kwargs.get('result_processor'), record)
         return self._client.post(uri, data=data, params=params, **kwargs)
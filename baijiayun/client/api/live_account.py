@@ -133,6 +133,8 @@ class LiveAccount(BaseAPI):
             self,
             date,
             product_type=0,
+            record=None,
+            columnar=False,
     ):
         """
         查询直播账号指定日期中各教室使用的人次
@@ -140,6 +142,8 @@ class LiveAccount(BaseAPI):
 
         :param date: 查询日期，格式如：2018-02-01
         :param product_type: 1:教育直播 4：企业直播
+        :param record: 记录类型，如 baijiayun.core.records.RoomCost，传入时结果中的记录转换为该类型，None 为 ObjectDict
+        :param columnar: 为 True 时流式解析并返回列式结果 Columns，也可传 {字段: int/float} 指定数值列类型
         """
         if isinstance(date, datetime.date):
             date = date.strftime('%Y-%m-%d')
@@ -150,5 +154,8 @@ class LiveAccount(BaseAPI):
                 'product_type': product_type,
                 'date': date,
             }),
-            result_processor=lambda x: x['room_cost']
+            result_processor=lambda x: x['room_cost'],
+            record=record,
+            columnar=columnar,
+            rows_path=('data', 'room_cost'),
         )
@@ -40,6 +40,8 @@ class PlayBack(BaseAPI):
             page_size,
             crop_video=0,
             room_id=123456,
+            record=None,
+            fields=None,
     ):
         """
         获取回放列表
@@ -50,6 +52,8 @@ class PlayBack(BaseAPI):
         :param page_size: 每一页返回的条数，不得超过1000
         :param crop_video: 是否返回 裁剪视频的回放，0：否 1：是
         :param room_id: 教室号
+        :param record: 记录类型，如 baijiayun.core.records.Playback，传入时结果中的记录转换为该类型，None 为 ObjectDict
+        :param fields: 记录只保留的字段，如 ('video_id', 'play_url')，其他字段解析时丢弃，None 为全部字段
         """
         return self._post(
             '/openapi/playback/getList',
@@ -61,6 +65,8 @@ class PlayBack(BaseAPI):
                 'crop_video': crop_video,
                 'room_id': room_id,
             }),
+            record=record,
+            fields=fields,
         )
 
     def get_player_token(
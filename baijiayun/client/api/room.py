@@ -256,11 +256,13 @@ class Room(BaseAPI):
     def info(
             self,
             room_id,
+            record=None,
     ):
         """
         获取教室信息
 
         :param room_id: 教室id
+        :param record: 记录类型，如 baijiayun.core.records.Room，传入时结果中的记录转换为该类型，None 为 ObjectDict
         """
         return self._post(
             '/openapi/room/info',
@@ -268,6 +270,7 @@ class Room(BaseAPI):
                 'partner_id': self.partner_id,
                 'room_id': room_id,
             }),
+            record=record,
         )
 
     def getcode(
@@ -344,6 +347,8 @@ class Room(BaseAPI):
             page=1,
             limit=100,
             product_type=0,
+            record=None,
+            fields=None,
     ):
         """
         获取教室列表
@@ -352,6 +357,8 @@ class Room(BaseAPI):
         :param page: 页数，参加码数量过多时，可以分多页来获取，每页取limit条。默认值为1
         :param limit: 每页获取的条数，默认值100，最大值不能超过1000
         :param product_type: 1:教育直播 2:小班课 4：企业直播（单一产品线账号不需要传此参数）
+        :param record: 记录类型，如 baijiayun.core.records.Room，传入时结果中的记录转换为该类型，None 为 ObjectDict
+        :param fields: 记录只保留的字段，如 ('room_id', 'title')，其他字段解析时丢弃，None 为全部字段
         """
         return self._post(
             '/openapi/room/list',
@@ -361,7 +368,9 @@ class Room(BaseAPI):
                 'limit': limit,
                 'product_type': product_type,
             }),
-            result_processor=lambda x: x['list']
+            result_processor=lambda x: x['list'],
+            record=record,
+            fields=fields,
         )
 
     def get_audition_code(
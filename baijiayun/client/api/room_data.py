@@ -40,6 +40,7 @@ class RoomData(BaseAPI):
             self,
             room_id,
             date,
+            stream=False,
     ):
         """
         导出教室聊天记录
@@ -47,6 +48,7 @@ class RoomData(BaseAPI):
 
         :param room_id: 教室号
         :param date: 导出日期
+        :param stream: 为 True 时流式读取响应，返回逐条解析记录的迭代器 RowStream，内存占用与记录数无关
         """
         if isinstance(date, datetime.date):
             date = date.strftime('%Y-%m-%d')
@@ -57,7 +59,8 @@ class RoomData(BaseAPI):
                 'room_id': room_id,
                 'date': date,
             }),
-            result_processor=lambda x: x['list']
+            result_processor=lambda x: x['list'],
+            stream=stream,
         )
 
     def export_live_report(
@@ -67,6 +70,8 @@ class RoomData(BaseAPI):
             page=1,
             page_size=0,
             date=None,
+            stream=False,
+            record=None,
     ):
         """
         导出直播教室学员观看记录
@@ -77,6 +82,8 @@ class RoomData(BaseAPI):
         :param page: 分页参数
         :param page_size: 每页返回条数，如果不传则返回所有的
         :param date: 查询日期，格式如：2018-03-02
+        :param stream: 为 True 时流式读取响应，返回逐条解析记录的迭代器 RowStream，内存占用与记录数无关
+        :param record: 记录类型，如 baijiayun.core.records.LiveReportRow，传入时结果中的记录转换为该类型，None 为 ObjectDict
         """
         if isinstance(date, datetime.date):
             date = date.strftime('%Y-%m-%d')
@@ -90,18 +97,22 @@ class RoomData(BaseAPI):
                 'page_size': page_size,
                 'date': date,
             }),
+            stream=stream,
+            record=record,
         )
 
     def get_all_room_user_stat(
             self,
             product_type,
             date,
+            columnar=False,
     ):
         """
         获取指定日期所有的直播间人次和最高并发量
 
         :param product_type: 1:教育直播 2：小班课 4：企业直播
         :param date: 格式如：2017-11-23
+        :param columnar: 为 True 时流式解析并返回列式结果 Columns，也可传 {字段: int/float} 指定数值列类型
         """
         if isinstance(date, datetime.date):
             date = date.strftime('%Y-%m-%d')
@@ -112,7 +123,9 @@ class RoomData(BaseAPI):
                 'product_type': product_type,
                 'date': date,
             }),
-            result_processor=lambda x: x['room_user_stat']
+            result_processor=lambda x: x['room_user_stat'],
+            columnar=columnar,
+            rows_path=('data', 'room_user_stat'),
         )
 
     def get_room_peak_user(
@@ -46,12 +46,14 @@ class SmallCourse(BaseAPI):
             self,
             product_type,
             date,
+            record=None,
     ):
         """
         获取小班课指定日期各教室消费记录
 
         :param product_type: 产品线类型（老账号填0 新账号填2）
         :param date: 日期
+        :param record: 记录类型，如 baijiayun.core.records.RoomCost，传入时结果中的记录转换为该类型，None 为 ObjectDict
         """
         if isinstance(date, datetime.date):
             date = date.strftime('%Y-%m-%d')
@@ -62,7 +64,8 @@ class SmallCourse(BaseAPI):
                 'product_type': product_type,
                 'date': date,
             }),
-            result_processor=lambda x: x['room_cost']
+            result_processor=lambda x: x['room_cost'],
+            record=record,
         )
 
     def get_user_cost(
@@ -87,12 +87,14 @@ class Video(BaseAPI):
     def get_info(
             self,
             video_id,
+            record=None,
     ):
         """
         获取指定ID视频信息
         获取指定ID的视频信息（不包括已删除的视频）
 
         :param video_id: 视频id
+        :param record: 记录类型，如 baijiayun.core.records.Video，传入时结果中的记录转换为该类型，None 为 ObjectDict
         """
         return self._post(
             '/openapi/video/getInfo',
@@ -100,6 +102,7 @@ class Video(BaseAPI):
                 'partner_id': self.partner_id,
                 'video_id': video_id,
             }),
+            record=record,
         )
 
     def get_image(
@@ -438,6 +441,8 @@ class Video(BaseAPI):
             page_size=20,
             page=1,
             create_time=None,
+            record=None,
+            fields=None,
     ):
         """
         获取点播视频列表
@@ -446,6 +451,8 @@ class Video(BaseAPI):
         :param page_size: 每页条数，不得超过1000，默认值20
         :param page: 页码，默认1
         :param create_time: 默认不加上时间筛选
+        :param record: 记录类型，如 baijiayun.core.records.Video，传入时结果中的记录转换为该类型，None 为 ObjectDict
+        :param fields: 记录只保留的字段，如 ('video_id', 'name')，其他字段解析时丢弃，None 为全部字段
         """
         if isinstance(create_time, datetime.datetime):
             create_time = create_time.strftime('%Y-%m-%d %H:%M:%S')
@@ -457,4 +464,6 @@ class Video(BaseAPI):
                 'page': page,
                 'create_time': create_time,
             }),
+            record=record,
+            fields=fields,
         )
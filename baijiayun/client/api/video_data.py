@@ -49,6 +49,8 @@ class VideoData(BaseAPI):
             end_time,
             page=1,
             page_size=100,
+            stream=False,
+            record=None,
     ):
         """
         获取指定视频观看记录
@@ -59,6 +61,8 @@ class VideoData(BaseAPI):
         :param end_time: 查询结束时间，格式如：2017-09-08 23:59:59。查询时间不能跨天
         :param page: 页码，从1开始，默认值是1
         :param page_size: 每页获取的记录条数，默认100，最大值不能超过1000
+        :param stream: 为 True 时流式读取响应，返回逐条解析记录的迭代器 RowStream，内存占用与记录数无关
+        :param record: 记录类型，如 baijiayun.core.records.PlayRecord，传入时结果中的记录转换为该类型，None 为 ObjectDict
         """
         if isinstance(start_time, datetime.datetime):
             start_time = start_time.strftime('%Y-%m-%d %H:%M:%S')
@@ -74,6 +78,8 @@ class VideoData(BaseAPI):
                 'page': page,
                 'page_size': page_size,
             }),
+            stream=stream,
+            record=record,
         )
 
     def export_video_report_batch(
@@ -83,6 +89,9 @@ class VideoData(BaseAPI):
             product_type=0,
             page=1,
             page_size=100,
+            stream=False,
+            record=None,
+            columnar=False,
     ):
         """
         获取账号所有视频观看记录
@@ -93,6 +102,9 @@ class VideoData(BaseAPI):
         :param product_type: 1:教育直播，2，小班课，3：双师，4，企业直播,5,点播账号
         :param page: 页码，从1开始，默认值是1
         :param page_size: 每页获取的记录条数，默认100，最大值不能超过1000
+        :param stream: 为 True 时流式读取响应，返回逐条解析记录的迭代器 RowStream，内存占用与记录数无关
+        :param record: 记录类型，如 baijiayun.core.records.PlayRecord，传入时结果中的记录转换为该类型，None 为 ObjectDict
+        :param columnar: 为 True 时流式解析并返回列式结果 Columns，也可传 {字段: int/float} 指定数值列类型
         """
         if isinstance(start_time, datetime.datetime):
             start_time = start_time.strftime('%Y-%m-%d %H:%M:%S')
@@ -108,6 +120,9 @@ class VideoData(BaseAPI):
                 'page': page,
                 'page_size': page_size,
             }),
+            stream=stream,
+            record=record,
+            columnar=columnar,
         )
 
     def get_video_play_count_rank(
@@ -205,6 +220,8 @@ class VideoData(BaseAPI):
             session_id=None,
             page=1,
             page_size=100,
+            stream=False,
+            record=None,
     ):
         """
         获取指定回放视频观看记录
@@ -216,6 +233,8 @@ class VideoData(BaseAPI):
         :param session_id: 序列号（针对长期房间才会用到）
         :param page: 页码，从1开始，默认值是1
         :param page_size: 每页获取的记录条数，默认100，最大值不能超过1000
+        :param stream: 为 True 时流式读取响应，返回逐条解析记录的迭代器 RowStream，内存占用与记录数无关
+        :param record: 记录类型，如 baijiayun.core.records.PlayRecord，传入时结果中的记录转换为该类型，None 为 ObjectDict
         """
         if isinstance(start_time, datetime.datetime):
             start_time = start_time.strftime('%Y-%m-%d %H:%M:%S')
@@ -232,4 +251,6 @@ class VideoData(BaseAPI):
                 'page': page,
                 'page_size': page_size,
             }),
+            stream=stream,
+            record=record,
         )
@@ -1,18 +1,33 @@
 # encoding: utf-8
 from __future__ import absolute_import, unicode_literals
 
+import contextlib
 import inspect
 import logging
+import os
+import threading
+import time
 import requests
+from concurrent import futures
 from six.moves.urllib.parse import urljoin, urlencode
 
 from .api.base import BaseAPI
+from .batch import Batch
+from .lanes import LaneRouter
+from .transport import HttpTransport
+from ..core.columns import Columns
+from ..core.decoders import JsonDecoder
 from ..core.exceptions import ClientException, ProcessException
-from ..core.utils import json_loads
+from ..core.singleflight import SharedResult, SingleFlight, request_key
+from ..core.stream import RowParser, RowStream
+from ..core.utils import ObjectDict, to_text
 
 
 logger = logging.getLogger(__name__)
 
+# rows only live until they are appended to the columns
+_COLUMNS_DECODER = JsonDecoder(object_class=None)
+
 
 def _is_api_endpoint(obj):
     return isinstance(obj, BaseAPI)
@@ -20,8 +35,6 @@ def _is_api_endpoint(obj):
 
 class BaseClient(object):
 
-    _http = requests.Session()
-
     API_BASE_URL = 'https://api.baijiayun.com/'
 
     def __new__(cls, *args, **kwargs):
@@ -33,10 +46,149 @@ class BaseClient(object):
             setattr(self, name, api)
         return self
 
-    def __init__(self, timeout=None):
+    def __init__(self, timeout=None, transport=None, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 keep_alive=True, max_connections=None, retry_policy=None, circuit_breaker=None, rate_limiter=None,
+                 concurrency_limiter=None, lanes=None, lane_routes=None, single_flight=False,
+                 hedge_policy=None, decoder=None):
+        """
+        :param timeout: 请求超时时间（秒）
+        :param transport: 共用的 HttpTransport，传入后忽略下面的连接池参数，多个客户端可共用同一个 transport
+        :param pool_connections: 每个域名缓存的连接池数量
+        :param pool_maxsize: 每个域名连接池保持的最大连接数
+        :param pool_block: 连接数达到 pool_maxsize 时是否等待空闲连接，为 True 时 pool_maxsize 即单域名最大连接数
+        :param keep_alive: 是否保持长连接
+        :param max_connections: 所有域名合计的最大并发请求（连接）数，None 为不限制
+        :param retry_policy: 只读接口重试策略 RetryPolicy，None 为不重试
+        :param circuit_breaker: 按接口熔断 CircuitBreaker，None 为不熔断
+        :param rate_limiter: 按 partner_id 限流 RateLimiter，None 为不限流
+        :param concurrency_limiter: 自适应并发限制 AIMDLimiter，当前上限见 concurrency_limiter.limit，None 为不限制
+        :param lanes: 优先级通道 Lane 列表，每个通道使用独立的连接池和并发额度
+        :param lane_routes: {接口 uri 或接口分组: 通道名}，未匹配的请求使用默认连接池及 concurrency_limiter
+        :param single_flight: 是否合并参数相同且正在进行中的只读接口请求，合并的调用共用同一个结果对象
+        :param hedge_policy: 只读接口对冲请求 HedgePolicy，None 为不对冲
+        :param decoder: 响应解码器，见 baijiayun.core.decoders，默认为 JsonDecoder()
+        """
         self.timeout = timeout
+        self.decoder = decoder or JsonDecoder()
+        self.concurrency_limiter = concurrency_limiter
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.hedge_policy = hedge_policy
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+        self._own_transport = transport is None
+        if transport is None:
+            transport = HttpTransport(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+                keep_alive=keep_alive,
+                max_connections=max_connections
+            )
+        self.transport = transport
+        self._local = threading.local()
+        self.single_flight = self._new_single_flight() if single_flight else None
+        self.lane_router = None
+        if lanes:
+            self.lane_router = LaneRouter(lanes, lane_routes)
+            for lane in lanes:
+                if lane.transport is None:
+                    lane.transport = self._new_lane_transport(lane)
 
-    def _request(self, method, url_or_endpoint, **kwargs):
+    def _new_lane_transport(self, lane):
+        return HttpTransport(pool_maxsize=lane.pool_maxsize, pool_block=True)
+
+    def _new_single_flight(self):
+        return SingleFlight()
+
+    @contextlib.contextmanager
+    def lane(self, name):
+        """
+        with 语句内当前线程（AsyncBaiJiaYunClient 为当前 task）的请求使用指定通道::
+
+            with client.lane('interactive'):
+                token = client.video.get_player_token(video_id)
+
+        :param name: 通道名
+        """
+        lane = self.lane_router.get(name) if self.lane_router is not None else None
+        if lane is None:
+            raise ValueError('unknown lane: %s' % name)
+        token = self._set_current_lane(lane)
+        try:
+            yield lane
+        finally:
+            self._reset_current_lane(token)
+
+    def _current_lane(self):
+        return getattr(self._local, 'lane', None)
+
+    def _set_current_lane(self, lane):
+        # returns the token passed to _reset_current_lane
+        previous = self._current_lane()
+        self._local.lane = lane
+        return previous
+
+    def _reset_current_lane(self, token):
+        self._local.lane = token
+
+    def _select_lane(self, uri, kwargs):
+        if self.lane_router is None:
+            return
+        lane = self._current_lane() or self.lane_router.route(uri)
+        if lane is not None:
+            kwargs.setdefault('lane', lane)
+
+    def batch(self, max_workers=10, max_in_flight=None):
+        """
+        并发批量调用，with 语句内当前线程调用的接口方法返回 Future::
+
+            with client.batch(max_workers=20) as batch:
+                for room_id in room_ids:
+                    client.room.info(room_id)
+            infos = batch.results()
+
+        :param max_workers: 并发线程数
+        :param max_in_flight: 已提交未完成的最大调用数，超出时提交阻塞，默认 max_workers 的 2 倍
+        """
+        return Batch(self, max_workers=max_workers, max_in_flight=max_in_flight)
+
+    def _owned_transports(self):
+        if self._own_transport:
+            yield self.transport
+        if self.lane_router is not None:
+            for lane in self.lane_router.lanes.values():
+                if lane._own_transport:
+                    yield lane.transport
+
+    def close(self):
+        """
+        关闭客户端自己创建的连接池，传入的共用 transport 需自行关闭
+        """
+        for transport in self._owned_transports():
+            transport.close()
+        if self._hedge_executor is not None:
+            self._hedge_executor[1].shutdown(wait=False)
+            self._hedge_executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def _http(self):
+        return self.transport.session
+
+    def pool_stats(self):
+        """
+        连接池统计，可根据复用率（reuse_ratio）和等待时间（wait_time）调整连接池大小
+        """
+        return self.transport.stats()
+
+    def _prepare_request(self, method, url_or_endpoint, kwargs):
         if not url_or_endpoint.startswith(('http://', 'https://')):
             api_base_url = kwargs.pop('api_base_url', self.API_BASE_URL)
             url = urljoin(api_base_url, url_or_endpoint)
@@ -53,8 +205,21 @@ class BaseClient(object):
             kwargs['headers']['Content-Type'] = 'application/x-www-form-urlencoded'
 
         kwargs['timeout'] = kwargs.get('timeout', self.timeout)
+        return url, kwargs
+
+    def _request(self, method, url_or_endpoint, **kwargs):
+        url, kwargs = self._prepare_request(method, url_or_endpoint, kwargs)
         result_processor = kwargs.pop('result_processor', None)
-        res = self._http.request(method=method, url=url, **kwargs)
+        decoder = kwargs.pop('decoder', None)
+        transport = kwargs.pop('transport', None) or self.transport
+        try:
+            res = transport.request(method=method, url=url, **kwargs)
+        except requests.RequestException as reqe:
+            logger.error("\n【请求地址】: %s\n【请求参数】：%s \n%s\n【异常信息】：%r",
+                         url, kwargs.get('params', ''), kwargs.get('data', ''), reqe)
+            raise ClientException(
+                code=None, msg=to_text(reqe) or None, client=self, request=reqe.request, response=reqe.response
+            )
         try:
             res.raise_for_status()
         except requests.RequestException as reqe:
@@ -63,27 +228,32 @@ class BaseClient(object):
             raise ClientException(
                 code=None, msg=None, client=self, request=reqe.request,  response=reqe.response
             )
-        result = self._handle_result(res, method, url, result_processor, **kwargs)
+        result = self._handle_result(res, method, url, result_processor, decoder=decoder, **kwargs)
 
         logger.debug("\n【请求地址】: %s\n【请求参数】：%s \n%s\n【响应数据】：%s",
                      url, kwargs.get('params', ''), kwargs.get('data', ''), result)
         return result
 
-    def _decode_result(self, res):
+    def _decode_result(self, res, decoder=None):
         try:
-            result = json_loads(res.content.decode('utf-8', 'ignore'), strict=False)
+            result = self._decode_content(res.content, decoder)
         except (TypeError, ValueError):
             # Return origin response object if we can not decode it as JSON
             logger.debug('Can not decode response as JSON', exc_info=True)
             return res
         return result
 
-    def _handle_result(self, res, method=None, url=None, result_processor=None, **kwargs):
+    def _decode_content(self, content, decoder=None):
+        return (decoder or self.decoder).decode(content)
+
+    def _handle_result(self, res, method=None, url=None, result_processor=None, decoder=None, **kwargs):
         if not isinstance(res, dict):
-            result = self._decode_result(res)
+            result = self._decode_result(res, decoder)
         else:
             result = res
+        return self._process_result(result, res, getattr(res, 'request', None), url, result_processor, **kwargs)
 
+    def _process_result(self, result, res, request, url=None, result_processor=None, **kwargs):
         if not isinstance(result, dict):
             return result
 
@@ -94,7 +264,7 @@ class BaseClient(object):
 
                 logger.error("\n【请求地址】: %s\n【请求参数】：%s \n%s\n【错误信息】：%s",
                              url, kwargs.get('params', ''), kwargs.get('data', ''), result)
-                raise ClientException(code, msg, client=self, request=res.request, response=res)
+                raise ClientException(code, msg, client=self, request=request, response=res)
             result = result.get('data', result)
         if result_processor and callable(result_processor):
             try:
@@ -102,7 +272,7 @@ class BaseClient(object):
             except Exception as e:
                 logger.error("\n【请求地址】: %s\n【请求参数】：%s \n%s\n【错误信息】：%s",
                              url, kwargs.get('params', ''), kwargs.get('data', ''), result)
-                raise ProcessException(result, e, client=self, request=res.request, response=res)
+                raise ProcessException(result, e, client=self, request=request, response=res)
 
         return result
 
@@ -113,11 +283,161 @@ class BaseClient(object):
         raise e
 
     def request(self, method, uri, **kwargs):
-        method, uri_with_access_token, kwargs = self._handle_pre_request(method, uri, kwargs)
+        self._select_lane(uri, kwargs)
+        batch = getattr(self._local, 'batch', None)
+        if batch is not None:
+            return batch.submit(self._shared_request, method, uri, **kwargs)
+        return self._shared_request(method, uri, **kwargs)
+
+    def _shared_request(self, method, uri, **kwargs):
+        key = request_key(method, uri, kwargs) if self.single_flight is not None else None
+        if key is None:
+            return self._do_request(method, uri, **kwargs)
+        # merged on the upstream response, every caller runs its own result_processor
+        result_processor = kwargs.pop('result_processor', None)
+        kwargs['result_processor'] = SharedResult
+        result = self.single_flight.do(key, self._do_request, method, uri, **kwargs)
+        return self._process_shared_result(result, uri, result_processor)
+
+    def _process_shared_result(self, result, uri, result_processor):
+        if not isinstance(result, SharedResult):
+            # not a JSON object response, returned as is like an unmerged call
+            return result
+        result = result.value
+        if not result_processor or not callable(result_processor):
+            return result
+        try:
+            return result_processor(result)
+        except Exception as e:
+            logger.error("\n【请求地址】: %s\n【错误信息】：%s", uri, result)
+            raise ProcessException(result, e, client=self)
+
+    @staticmethod
+    def _copy_request_kwargs(kwargs):
+        # signing adds timestamp/sign to data or params, every attempt signs its own copy
+        kwargs = dict(kwargs)
+        for key in ('data', 'params'):
+            if isinstance(kwargs.get(key), dict):
+                kwargs[key] = dict(kwargs[key])
+        return kwargs
+
+    def _attempt(self, method, uri, kwargs):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(getattr(self, 'partner_id', None), uri)
+        lane = kwargs.pop('lane', None)
+        limiter = self.concurrency_limiter
+        if lane is not None:
+            limiter = lane.limiter
+            kwargs['transport'] = lane.transport
+        if limiter is None:
+            return self._guarded_request(method, uri, kwargs)
+        started_at = limiter.acquire()
+        exc = None
         try:
+            return self._guarded_request(method, uri, kwargs)
+        except ClientException as e:
+            exc = e
+            raise
+        finally:
+            limiter.release(started_at, exc)
+
+    def _get_hedge_executor(self):
+        # (pid, executor, idle worker slots), worker threads do not survive fork
+        pid = os.getpid()
+        with self._hedge_lock:
+            if self._hedge_executor is None or self._hedge_executor[0] != pid:
+                max_workers = self.hedge_policy.max_workers
+                executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+                self._hedge_executor = (pid, executor, threading.Semaphore(max_workers))
+            return self._hedge_executor[1:]
+
+    def _submit_hedge(self, fn, *args, **kwargs):
+        """
+        只在有空闲线程时提交到对冲线程池，返回 Future，没有空闲线程或 condition() 为 False 时返回 None，不排队等待
+        """
+        condition = kwargs.pop('condition', None)
+        executor, slots = self._get_hedge_executor()
+        if not slots.acquire(False):
+            return None
+        if condition is not None and not condition():
+            slots.release()
+            return None
+        future = executor.submit(fn, *args)
+        future.add_done_callback(lambda f: slots.release())
+        return future
+
+    def _hedged_attempt(self, method, uri, kwargs):
+        hedge = self.hedge_policy
+        if hedge is None or not hedge.applies(uri):
+            return self._attempt(method, uri, kwargs)
+        started_at = time.time()
+        delay = hedge.delay(uri)
+        if delay is None:
+            result = self._attempt(method, uri, kwargs)
+            hedge.record(uri, time.time() - started_at)
+            return result
+        hedge_kwargs = self._copy_request_kwargs(kwargs)
+        first = self._submit_hedge(self._attempt, method, uri, kwargs)
+        if first is None:
+            # all workers are busy: run in the calling thread without hedging instead of queueing
+            result = self._attempt(method, uri, kwargs)
+            hedge.record(uri, time.time() - started_at)
+            return result
+        done, _ = futures.wait([first], timeout=delay)
+        second = None
+        if not done:
+            second = self._submit_hedge(self._attempt, method, uri, hedge_kwargs, condition=hedge.try_hedge)
+        if second is not None:
+            logger.info('请求 %s 超过 %.3f 秒未返回，发送对冲请求', uri, delay)
+            pending = [first, second]
+            while pending:
+                done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is second:
+                            hedge.on_hedge_win()
+                        hedge.record(uri, time.time() - started_at)
+                        return future.result()
+        result = first.result()
+        hedge.record(uri, time.time() - started_at)
+        return result
+
+    def _guarded_request(self, method, uri, kwargs):
+        method, uri_with_access_token, kwargs = self._handle_pre_request(method, uri, kwargs)
+        breaker = self.circuit_breaker
+        if breaker is None:
             return self._request(method, uri_with_access_token, **kwargs)
+        breaker.before_call(uri)
+        try:
+            result = self._request(method, uri_with_access_token, **kwargs)
         except ClientException as e:
-            return self._handle_request_except(e, self.request, method, uri, **kwargs)
+            breaker.on_failure(uri, e)
+            raise
+        except BaseException:
+            # cancelled (hedging, asyncio timeouts) or interrupted, no outcome to report
+            breaker.on_abort(uri)
+            raise
+        breaker.on_success(uri)
+        return result
+
+    def _do_request(self, method, uri, **kwargs):
+        retry_policy = self.retry_policy
+        attempt = 0
+        while True:
+            attempt += 1
+            attempt_kwargs = self._copy_request_kwargs(kwargs)
+            try:
+                result = self._hedged_attempt(method, uri, attempt_kwargs)
+            except ClientException as e:
+                if retry_policy is not None and retry_policy.should_retry(uri, e, attempt):
+                    delay = retry_policy.backoff(attempt)
+                    logger.warning('请求 %s 失败（%r），%.3f 秒后第 %d 次重试', uri, e, delay, attempt)
+                    time.sleep(delay)
+                    continue
+                return self._handle_request_except(e, self.request, method, uri, **attempt_kwargs)
+            if retry_policy is not None:
+                retry_policy.on_success()
+            return result
 
     def get(self, uri, params=None, **kwargs):
         """
@@ -143,3 +463,85 @@ class BaseClient(object):
         if params is not None:
             kwargs['params'] = params
         return self.request('POST', uri, **kwargs)
+
+    def stream_rows(self, method, uri, path=('data', 'list'), chunk_size=65536, record=None, fields=None, **kwargs):
+        """
+        流式请求返回大量记录的接口，分块读取响应并逐条解析 path 指向的记录，内存占用与响应大小无关。
+        不使用重试、对冲、合并请求及并发限制，code 不为 0 时在读取时抛出 ClientException
+
+        :param method: 请求方法
+        :param uri: 请求url
+        :param path: 记录数组在响应中的位置，默认为 data.list
+        :param chunk_size: 每次读取的字节数
+        :param record: 记录类型（见 baijiayun.core.records），None 为按 decoder 解码
+        :param fields: 记录只保留的字段，其他字段解析时丢弃，None 为保留全部字段
+        :return: RowStream
+        """
+        self._select_lane(uri, kwargs)
+        lane = kwargs.pop('lane', None)
+        if lane is not None:
+            kwargs['transport'] = lane.transport
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(getattr(self, 'partner_id', None), uri)
+        method, uri, kwargs = self._handle_pre_request(method, uri, kwargs)
+        url, kwargs = self._prepare_request(method, uri, kwargs)
+        decoder = kwargs.pop('decoder', None) or self.decoder
+        transport = kwargs.pop('transport', None) or self.transport
+        try:
+            res = transport.request(method=method, url=url, stream=True, **kwargs)
+        except requests.RequestException as reqe:
+            logger.error("\n【请求地址】: %s\n【请求参数】：%s \n%s\n【异常信息】：%r",
+                         url, kwargs.get('params', ''), kwargs.get('data', ''), reqe)
+            raise ClientException(
+                code=None, msg=to_text(reqe) or None, client=self, request=reqe.request, response=reqe.response
+            )
+        try:
+            res.raise_for_status()
+        except requests.RequestException as reqe:
+            res.close()
+            logger.error("\n【请求地址】: %s\n【请求参数】：%s \n%s\n【异常信息】：%s",
+                         url, kwargs.get('params', ''), kwargs.get('data', ''), reqe)
+            raise ClientException(
+                code=None, msg=None, client=self, request=reqe.request, response=reqe.response
+            )
+        parser = RowParser(path, None if record else getattr(decoder, 'object_class', ObjectDict), record, fields)
+        return RowStream(self._iter_rows(res, parser, url, chunk_size), parser)
+
+    def stream_columns(self, method, uri, path=('data', 'list'), types=None, **kwargs):
+        """
+        流式请求并在解析时按列保存记录，返回 Columns，不保留逐条的 dict，其他参数同 stream_rows
+
+        :param types: {字段: int/float/...}，数值列的类型，见 Columns
+        """
+        kwargs.setdefault('decoder', _COLUMNS_DECODER)
+        with self.stream_rows(method, uri, path, **kwargs) as rows:
+            return Columns.from_rows(rows, types)
+
+    def _iter_rows(self, res, parser, url, chunk_size):
+        try:
+            try:
+                for chunk in res.iter_content(chunk_size):
+                    for row in parser.feed(chunk):
+                        yield row
+                    if parser.done:
+                        break
+                rows = parser.close()
+            except requests.RequestException as reqe:
+                logger.error("\n【请求地址】: %s\n【异常信息】：%r", url, reqe)
+                raise ClientException(
+                    code=None, msg=to_text(reqe) or None, client=self, request=res.request, response=res
+                )
+            except ValueError as e:
+                logger.error("\n【请求地址】: %s\n【异常信息】：响应不是合法的 JSON %s", url, e)
+                raise ClientException(code=None, msg=to_text(e), client=self, request=res.request, response=res)
+            self._check_stream_code(parser, res.request, res, url)
+            for row in rows:
+                yield row
+        finally:
+            res.close()
+
+    def _check_stream_code(self, parser, request, response, url):
+        code = parser.code
+        if code is not None and code != 0:
+            logger.error("\n【请求地址】: %s\n【错误信息】：%s", url, parser.meta)
+            raise ClientException(code, parser.meta.get('msg', code), client=self, request=request, response=response)
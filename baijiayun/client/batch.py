@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import threading
+from concurrent import futures
+
+from ..core.exceptions import ClientException
+
+
+class Batch(object):
+    """
+    批量并发调用，通过 client.batch() 创建
+
+    with 语句内当前线程对该客户端的接口调用都会提交到线程池并立即返回 Future，
+    单个调用的 ClientException 记录在 errors 中，不影响其他调用
+    """
+
+    def __init__(self, client, max_workers=10, max_in_flight=None):
+        self.client = client
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight or max_workers * 2
+        self.futures = []
+        self.errors = []
+        self._lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._executor = None
+
+    def __enter__(self):
+        local = self.client._local
+        if getattr(local, 'batch', None) is not None:
+            raise RuntimeError('batch can not be nested')
+        self._executor = futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        local.batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.client._local.batch = None
+        self._executor.shutdown(wait=True)
+
+    def submit(self, func, *args, **kwargs):
+        """
+        提交调用，已提交未完成的调用达到 max_in_flight 时阻塞
+        """
+        self._in_flight.acquire()
+        try:
+            future = self._executor.submit(self._run, len(self.futures), func, args, kwargs)
+        except Exception:
+            self._in_flight.release()
+            raise
+        self.futures.append(future)
+        return future
+
+    def _run(self, index, func, args, kwargs):
+        try:
+            return func(*args, **kwargs)
+        except ClientException as e:
+            with self._lock:
+                self.errors.append((index, e))
+            raise
+        finally:
+            self._in_flight.release()
+
+    def results(self, timeout=None):
+        """
+        按提交顺序返回结果，失败的调用位置为对应的异常
+        """
+        return [self._result(future, timeout) for future in self.futures]
+
+    def as_completed(self, timeout=None):
+        """
+        按完成顺序返回 (提交序号, 结果或异常)
+        """
+        index = dict((future, i) for i, future in enumerate(self.futures))
+        for future in futures.as_completed(self.futures, timeout=timeout):
+            yield index[future], self._result(future)
+
+    @staticmethod
+    def _result(future, timeout=None):
+        exc = future.exception(timeout)
+        if exc is not None:
+            return exc
+        return future.result()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+from ..core.concurrency import FixedLimiter
+from ..core.ratelimit import endpoint_group
+
+
+class Lane(object):
+    """
+    请求优先级通道（隔舱），每个通道有独立的连接池和并发额度，
+    低优先级的批量导出占满自己的额度时不会影响其他通道
+
+    :param name: 通道名
+    :param max_concurrency: 通道最大并发数，None 为不限制
+    :param limiter: 自定义并发限制（如 AIMDLimiter），传入后忽略 max_concurrency
+    :param transport: 通道使用的连接池，None 时由客户端按 pool_maxsize 创建
+    :param pool_maxsize: 自动创建连接池时每个域名的最大连接数，默认等于 max_concurrency
+    """
+
+    def __init__(self, name, max_concurrency=None, limiter=None, transport=None, pool_maxsize=None):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        if limiter is None and max_concurrency:
+            limiter = FixedLimiter(max_concurrency)
+        self.limiter = limiter
+        self.transport = transport
+        self.pool_maxsize = pool_maxsize or max_concurrency or 10
+        self._own_transport = transport is None
+
+
+class LaneRouter(object):
+    """
+    按接口选择通道
+
+    :param lanes: Lane 列表
+    :param routes: {接口 uri 或接口分组: 通道名}，如
+        {'/openapi/video/getPlayerToken': 'interactive', 'room_data': 'bulk', 'video_data': 'bulk'}，
+        uri 优先于分组，未匹配的请求使用客户端默认连接池及并发限制
+    """
+
+    def __init__(self, lanes, routes=None):
+        self.lanes = dict((lane.name, lane) for lane in lanes)
+        self.routes = dict(routes or {})
+        for name in self.routes.values():
+            if name not in self.lanes:
+                raise ValueError('unknown lane: %s' % name)
+
+    def get(self, name):
+        try:
+            return self.lanes[name]
+        except KeyError:
+            raise ValueError('unknown lane: %s' % name)
+
+    def route(self, uri):
+        path = uri.split('?', 1)[0]
+        name = self.routes.get(path) or self.routes.get(endpoint_group(path))
+        return self.lanes[name] if name is not None else None
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import itertools
+import os
+import socket
+import time
+import uuid
+
+from six.moves.urllib.parse import urlencode
+
+from . import api
+from ..core.utils import PartnerKeySigner, to_binary
+from ..storage.cache import BaiJiaYunClientCache
+from ..storage.memorystorage import MemoryStorage
+
+default_storage = MemoryStorage(max_entries=100000)
+
+
+def _iter_web_signs(partner_key, records, query=False):
+    signer = PartnerKeySigner(partner_key)
+    web_sign_data = BaiJiaYunMixin._web_sign_data
+    for record in records:
+        data = web_sign_data(*record)
+        sign = signer.sign(data)
+        if query:
+            data['sign'] = sign
+            yield urlencode([(k, to_binary(v)) for k, v in data.items()])
+        else:
+            yield sign
+
+
+def _web_sign_chunk(args):
+    # runs in worker processes, must stay a module level function
+    partner_key, records, query = args
+    return list(_iter_web_signs(partner_key, records, query))
+
+
+def _iter_web_signs_parallel(partner_key, records, query, processes, chunksize):
+    from concurrent import futures
+
+    records = iter(records)
+    chunks = iter(lambda: list(itertools.islice(records, chunksize)), [])
+    with futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        for signs in executor.map(_web_sign_chunk, ((partner_key, chunk, query) for chunk in chunks)):
+            for sign in signs:
+                yield sign
+
+
+class BaiJiaYunMixin(object):
+    """
+    BaiJiaYunClient 与 AsyncBaiJiaYunClient 共用的接口列表及签名逻辑，不涉及 IO
+    """
+    PARTNER_KEY_TTL = 7200
+    # the in-process copy expires this many seconds before the shared cache entry
+    PARTNER_KEY_L1_MARGIN = 60
+    # expiry used when the shared cache has no partner_key_expires_at (written by an older version)
+    PARTNER_KEY_L1_DEFAULT_TTL = 300
+    # refresh in the background this many seconds before the key expires
+    PARTNER_KEY_REFRESH_AHEAD = 600
+    # storage lock held by the process calling createkey
+    PARTNER_KEY_LOCK_TTL = 30
+    PARTNER_KEY_LOCK_POLL_INTERVAL = 0.05
+
+    doc = api.Doc()
+    evaluation = api.Evaluation()
+    hudong = api.HuDong()
+    live = api.Live()
+    liveaccount = api.LiveAccount()
+    livesetting = api.LiveSetting()
+    notice = api.Notice()
+    playback = api.PlayBack()
+    quiz = api.Quiz()
+    room = api.Room()
+    roomdata = api.RoomData()
+    smallcourse = api.SmallCourse()
+    subaccount = api.SubAccount()
+    video = api.Video()
+    videoaccount = api.VideoAccount()
+    videodata = api.VideoData()
+
+    def _init_partner(self, partner_id, secret_key, private_domain=None, cache_prefix=None, storage=None):
+        self.partner_id = partner_id
+        self.secret_key = secret_key
+        self.private_domain = private_domain
+        self.cache = BaiJiaYunClientCache(storage or default_storage, cache_prefix or self.partner_id)
+        # (partner_key, expires_at), avoids a storage round trip on every signed request
+        self._partner_key_l1 = None
+        self._signer = None
+        if private_domain is not None:
+            self.API_BASE_URL = 'https://%s.at.baijiayun.com/' % private_domain
+
+    def _create_partner_key_kwargs(self, regenerate=0):
+        return {
+            'data': {
+                'partner_id': self.partner_id,
+                'secret_key': self.secret_key,
+                'regenerate': regenerate,
+                'timestamp': int(time.time())
+            },
+            'result_processor': lambda x: x['partner_key']
+        }
+
+    def _cached_partner_key(self):
+        """
+        先读进程内缓存，未命中再读 storage，都未命中返回 None
+        """
+        l1 = self._partner_key_l1
+        now = time.time()
+        if l1 is not None and l1[1] - self.PARTNER_KEY_L1_MARGIN > now:
+            return l1[0]
+        partner_key = self.cache.partner_key.get()
+        if partner_key is None:
+            return None
+        expires_at = self.cache.partner_key_expires_at.get()
+        if expires_at is None:
+            expires_at = now + self.PARTNER_KEY_L1_DEFAULT_TTL + self.PARTNER_KEY_L1_MARGIN
+        self._partner_key_l1 = (partner_key, expires_at)
+        return partner_key
+
+    def _partner_key_expiring(self):
+        """
+        进程内缓存的 partner_key 是否即将过期，需要提前刷新
+        """
+        l1 = self._partner_key_l1
+        return l1 is None or l1[1] - self.PARTNER_KEY_REFRESH_AHEAD <= time.time()
+
+    def _fresh_partner_key(self, ahead=False):
+        """
+        重新读取 storage（其他进程可能已刷新），ahead 为 True 时即将过期的 partner_key 视为未命中
+        """
+        self.invalidate_partner_key()
+        partner_key = self._cached_partner_key()
+        if partner_key is not None and ahead and self._partner_key_expiring():
+            return None
+        return partner_key
+
+    def _acquire_partner_key_lock(self):
+        """
+        获取跨进程的 partner_key 刷新锁，成功返回释放锁用的 token，失败返回 None
+        """
+        token = '%s:%d:%s' % (socket.gethostname(), os.getpid(), uuid.uuid4().hex)
+        if self.cache.partner_key_lock.add(value=token, ttl=self.PARTNER_KEY_LOCK_TTL):
+            return token
+        return None
+
+    def _release_partner_key_lock(self, token):
+        # the lock may have expired and been taken by another process during a slow createkey
+        self.cache.partner_key_lock.delete_if(value=token)
+
+    def _store_partner_key(self, partner_key):
+        expires_at = int(time.time()) + self.PARTNER_KEY_TTL
+        self.cache.partner_key.set(value=partner_key, ttl=self.PARTNER_KEY_TTL)
+        self.cache.partner_key_expires_at.set(value=expires_at, ttl=self.PARTNER_KEY_TTL)
+        self._partner_key_l1 = (partner_key, expires_at)
+
+    def invalidate_partner_key(self):
+        """
+        清除进程内缓存的 partner_key，其他进程重新生成 partner_key 后可调用
+        """
+        self._partner_key_l1 = None
+
+    def _sign_with_key(self, data, partner_key):
+        signer = self._signer
+        if signer is None or signer.partner_key != partner_key:
+            signer = self._signer = PartnerKeySigner(partner_key)
+        return signer.sign(data)
+
+    @staticmethod
+    def _sign_target(method, kwargs):
+        if method == 'POST':
+            data = kwargs.setdefault('data', dict())
+            data.update(kwargs.pop('params', dict()))
+        else:
+            data = kwargs.setdefault('params', dict())
+        return data
+
+    @staticmethod
+    def _web_sign_data(room_id, user_number, user_name, user_role, user_avatar='', group_id=None):
+        data = {
+            'room_id': room_id,
+            'user_number': user_number,
+            'user_name': user_name,
+            'user_role': user_role,
+            'user_avatar': user_avatar
+        }
+        if group_id is not None:
+            data['group_id'] = group_id
+        return data
+
+    @staticmethod
+    def _web_signs(partner_key, records, query=False, processes=None, chunksize=1000):
+        if processes:
+            return _iter_web_signs_parallel(partner_key, records, query, processes, chunksize)
+        return _iter_web_signs(partner_key, records, query)
+
+    @staticmethod
+    def _split_sign(data, check_timestamp_second=300):
+        """
+        校验时间戳并拆出签名，校验失败返回 (None, None)
+        """
+        assert isinstance(data, dict)
+        if 'sign' not in data:
+            return None, None
+        if check_timestamp_second > 0:
+            try:
+                timestamp = float(data['timestamp'])
+            except (KeyError, TypeError, ValueError):
+                # missing or not a number, callbacks are unauthenticated input
+                return None, None
+            # written as "not <=" so that nan is rejected too
+            if not abs(timestamp - time.time()) <= check_timestamp_second:
+                return None, None
+        data = data.copy()
+        sign = data.pop('sign', None)
+        return data, sign
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from six.moves.urllib.parse import urlsplit
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class PoolStats(object):
+    """连接池统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.limit_wait_time = 0.0
+
+    def record_limit_wait(self, wait_time):
+        with self._lock:
+            self.limit_wait_time += wait_time
+
+    def record_checkout(self, wait_time):
+        with self._lock:
+            self.requests += 1
+            self.wait_time += wait_time
+            if wait_time > self.max_wait_time:
+                self.max_wait_time = wait_time
+
+    def record_new_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    @property
+    def reuse_ratio(self):
+        if not self.requests:
+            return 0.0
+        return max(self.requests - self.connections, 0) / float(self.requests)
+
+    def as_dict(self):
+        with self._lock:
+            requests_count = self.requests
+            return {
+                'requests': requests_count,
+                'connections': self.connections,
+                'reuse_ratio': self.reuse_ratio,
+                'wait_time': self.wait_time,
+                'avg_wait_time': self.wait_time / requests_count if requests_count else 0.0,
+                'max_wait_time': self.max_wait_time,
+                'limit_wait_time': self.limit_wait_time,
+            }
+
+
+class _InstrumentedPoolMixin(object):
+    stats = None
+
+    def _get_conn(self, timeout=None):
+        start = time.time()
+        conn = super(_InstrumentedPoolMixin, self)._get_conn(timeout)
+        if self.stats is not None:
+            self.stats.record_checkout(time.time() - start)
+        return conn
+
+    def _new_conn(self):
+        if self.stats is not None:
+            self.stats.record_new_connection()
+        return super(_InstrumentedPoolMixin, self)._new_conn()
+
+
+class InstrumentedHTTPConnectionPool(_InstrumentedPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class InstrumentedHTTPSConnectionPool(_InstrumentedPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """记录连接复用率及等待时间的 HTTPAdapter"""
+
+    def __init__(self, stats=None, **kwargs):
+        self.stats = stats or PoolStats()
+        super(PooledHTTPAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(PooledHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        attrs = {'stats': self.stats}
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type(str('HTTPConnectionPool'), (InstrumentedHTTPConnectionPool, ), attrs),
+            'https': type(str('HTTPSConnectionPool'), (InstrumentedHTTPSConnectionPool, ), attrs),
+        }
+
+
+class HttpTransport(object):
+    """
+    requests 连接池封装，每个域名（API_BASE_URL）使用独立连接池
+
+    fork 后子进程首次使用时会丢弃父进程的连接池重新创建，可在 gunicorn/uwsgi 主进程中预先创建客户端
+
+    :param pool_connections: 每个域名缓存的连接池数量
+    :param pool_maxsize: 每个域名连接池保持的最大连接数
+    :param pool_block: 连接数达到 pool_maxsize 时是否等待空闲连接，为 True 时 pool_maxsize 即最大连接数
+    :param keep_alive: 是否保持长连接
+    :param max_connections: 所有域名合计的最大并发请求（连接）数，超出时等待，None 为不限制
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False, keep_alive=True,
+                 max_connections=None):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.max_connections = max_connections
+        self._reset()
+
+    def _reset(self):
+        # sockets and locks inherited from the parent process are dropped without closing them,
+        # closing would shut down connections the parent is still using
+        self._pid = os.getpid()
+        self._semaphore = threading.BoundedSemaphore(self.max_connections) if self.max_connections else None
+        self._lock = threading.Lock()
+        self._session = None
+        self._adapters = {}
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    @property
+    def session(self):
+        self._check_fork()
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._new_session()
+        return self._session
+
+    def _new_session(self):
+        session = requests.Session()
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        for prefix in ('http://', 'https://'):
+            session.mount(prefix, self._new_adapter())
+        return session
+
+    def _new_adapter(self):
+        return PooledHTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block
+        )
+
+    @staticmethod
+    def base_url(url):
+        parts = urlsplit(url)
+        return '{0}://{1}/'.format(parts.scheme, parts.netloc)
+
+    def mount(self, base_url):
+        session = self.session
+        adapter = self._adapters.get(base_url)
+        if adapter is None:
+            with self._lock:
+                adapter = self._adapters.get(base_url)
+                if adapter is None:
+                    adapter = self._new_adapter()
+                    session.mount(base_url, adapter)
+                    self._adapters[base_url] = adapter
+        return adapter
+
+    def request(self, method, url, **kwargs):
+        adapter = self.mount(self.base_url(url))
+        session = self.session
+        semaphore = self._semaphore
+        if semaphore is None:
+            return session.request(method=method, url=url, **kwargs)
+        start = time.time()
+        semaphore.acquire()
+        try:
+            adapter.stats.record_limit_wait(time.time() - start)
+            return session.request(method=method, url=url, **kwargs)
+        finally:
+            semaphore.release()
+
+    def stats(self):
+        """
+        各域名连接池统计
+
+        :return: {base_url: {requests, connections, reuse_ratio, wait_time, avg_wait_time, max_wait_time,
+            limit_wait_time}}
+        """
+        self._check_fork()
+        return dict((base_url, adapter.stats.as_dict()) for base_url, adapter in list(self._adapters.items()))
+
+    def close(self):
+        self._check_fork()
+        with self._lock:
+            session, self._session = self._session, None
+            self._adapters = {}
+        if session is not None:
+            session.close()
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import collections
+import itertools
+from array import array
+
+import six
+
+# array has no 'q' on python 2, 'l' is 64 bits there on 64-bit unix
+_INT = 'q' if six.PY3 else 'l'
+_NAN = float('nan')
+# interning stops for columns with mostly unique strings
+_POOL_MIN = 10000
+
+_AGGREGATES = ('sum', 'count', 'mean', 'min', 'max')
+
+
+def _is_int(value):
+    return type(value) in six.integer_types
+
+
+class Columns(object):
+    """
+    列式结果：每个字段保存为一列，整数列为 array('q')，浮点数列为 array('d')（缺失值为 nan），
+    其他列为 list，字符串按列去重（intern）。整数列出现缺失值或超出 64 位时转为 list，出现浮点数时转为浮点数列::
+
+        costs = client.liveaccount.get_all_room_cost(date, columnar={'cost': int})
+        total = costs.sum('cost')
+        by_type = costs.group_by('product_type', 'cost')
+        paid = costs.filter(cost=lambda v: v > 0)
+
+    :param types: {字段: int/float/...}，追加记录时先转换该字段的值（如接口返回的字符串数字），转换失败为缺失值
+    """
+
+    def __init__(self, types=None):
+        self.types = dict(types or {})
+        self._columns = collections.OrderedDict()
+        self._pools = {}
+        self._length = 0
+
+    @classmethod
+    def from_rows(cls, rows, types=None):
+        columns = cls(types)
+        for row in rows:
+            columns.append(row)
+        return columns
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def fields(self):
+        return list(self._columns)
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def __repr__(self):
+        return 'Columns(rows=%d, fields=%r)' % (self._length, self.fields)
+
+    def append(self, row):
+        """
+        追加一条记录，记录中没有的字段为缺失值
+        """
+        columns = self._columns
+        types = self.types
+        length = self._length
+        for name, value in row.items():
+            convert = types.get(name)
+            if convert is not None and value is not None:
+                try:
+                    value = convert(value)
+                except (TypeError, ValueError):
+                    value = None
+            column = columns.get(name)
+            if column is None:
+                column = self._new_column(name, value, length)
+            self._append(name, column, value)
+        self._length = length + 1
+        if len(row) < len(columns):
+            for name in list(columns):
+                if len(columns[name]) == length:
+                    self._append(name, columns[name], None)
+
+    def _new_column(self, name, value, length):
+        if _is_int(value):
+            column = array(_INT)
+        elif type(value) is float:
+            column = array('d')
+        else:
+            column = []
+            self._pools[name] = {}
+        self._columns[name] = column
+        for _ in range(length):
+            self._append(name, self._columns[name], None)
+        return self._columns[name]
+
+    def _append(self, name, column, value):
+        if type(column) is list:
+            if isinstance(value, six.text_type):
+                pool = self._pools.get(name)
+                if pool is not None:
+                    value = pool.setdefault(value, value)
+                    if len(pool) > _POOL_MIN and len(pool) * 2 > len(column):
+                        del self._pools[name]
+            column.append(value)
+            return
+        typecode = column.typecode
+        if value is None:
+            if typecode == 'd':
+                column.append(_NAN)
+                return
+        elif _is_int(value):
+            try:
+                column.append(value)
+                return
+            except OverflowError:
+                pass
+        elif type(value) is float:
+            if typecode != 'd':
+                column = self._columns[name] = array('d', column)
+            column.append(value)
+            return
+        self._to_list(name, column).append(value)
+
+    def _to_list(self, name, column):
+        # nan only marks missing values, json has no nan
+        values = [None if v != v else v for v in column] if column.typecode == 'd' else column.tolist()
+        self._columns[name] = values
+        return values
+
+    def _values(self, name):
+        # column values without missing ones
+        column = self._columns[name]
+        if type(column) is list:
+            return [v for v in column if v is not None]
+        if column.typecode == 'd':
+            return [v for v in column if v == v]
+        return column
+
+    def mask(self, name, predicate):
+        """
+        对列中每个值调用 predicate，返回布尔值列表，缺失值为 False
+        """
+        column = self._columns[name]
+        if type(column) is array and column.typecode == 'd':
+            return [v == v and bool(predicate(v)) for v in column]
+        if type(column) is list:
+            return [v is not None and bool(predicate(v)) for v in column]
+        return [bool(predicate(v)) for v in column]
+
+    def filter(self, *masks, **predicates):
+        """
+        按条件筛选记录，返回新的 Columns，多个条件同时满足::
+
+            columns.filter(cost=lambda v: v > 0, product_type=lambda v: v == 1)
+
+        :param masks: 与记录数相同的布尔序列，如 mask() 的结果或 numpy 布尔数组
+        :param predicates: {字段: 判断函数}
+        """
+        selector = None
+        masks = list(masks) + [self.mask(name, predicate) for name, predicate in predicates.items()]
+        for mask in masks:
+            selector = list(mask) if selector is None else [a and b for a, b in zip(selector, mask)]
+        if selector is None:
+            selector = [True] * self._length
+        return self.take(selector)
+
+    def take(self, selector):
+        """
+        返回 selector 为真的记录组成的新 Columns
+        """
+        result = type(self)(self.types)
+        selector = [bool(s) for s in selector]
+        for name, column in self._columns.items():
+            values = itertools.compress(column, selector)
+            if type(column) is list:
+                result._columns[name] = list(values)
+            else:
+                result._columns[name] = array(column.typecode, values)
+        result._length = sum(selector)
+        return result
+
+    def count(self, name=None):
+        """
+        记录数，传入 name 时为该列非缺失值数量
+        """
+        if name is None:
+            return self._length
+        return len(self._values(name))
+
+    def sum(self, name):
+        return sum(self._values(name))
+
+    def mean(self, name):
+        values = self._values(name)
+        return sum(values) / float(len(values)) if len(values) else None
+
+    def min(self, name):
+        values = self._values(name)
+        return min(values) if len(values) else None
+
+    def max(self, name):
+        values = self._values(name)
+        return max(values) if len(values) else None
+
+    def value_counts(self, name):
+        """
+        列中每个值出现的次数（不含缺失值）
+        """
+        return collections.Counter(self._values(name))
+
+    def group_by(self, key, name=None, agg='sum'):
+        """
+        按 key 列分组聚合，返回 {key 值: 聚合结果}
+
+        :param key: 分组字段
+        :param name: 聚合字段，agg 为 count 时可不传
+        :param agg: sum、count、mean、min、max
+        """
+        if agg not in _AGGREGATES:
+            raise ValueError('agg must be one of %s' % ', '.join(_AGGREGATES))
+        keys = self._columns[key]
+        if name is None:
+            if agg != 'count':
+                raise ValueError('name is required for %s' % agg)
+            return dict(collections.Counter(k for k in keys if k is not None and k == k))
+        groups = {}
+        for k, v in zip(keys, self._columns[name]):
+            if k is None or k != k or v is None or v != v:
+                continue
+            group = groups.get(k)
+            if group is None:
+                groups[k] = [v]
+            else:
+                group.append(v)
+        if agg == 'sum':
+            return dict((k, sum(values)) for k, values in groups.items())
+        if agg == 'count':
+            return dict((k, len(values)) for k, values in groups.items())
+        if agg == 'mean':
+            return dict((k, sum(values) / float(len(values))) for k, values in groups.items())
+        func = min if agg == 'min' else max
+        return dict((k, func(values)) for k, values in groups.items())
+
+    def to_numpy(self, name=None):
+        """
+        转换为 numpy 数组，需要安装 numpy。数值列不复制，与 Columns 共用内存（之后不能再 append），
+        其他列为 object 数组。不传 name 时返回 {字段: 数组}
+        """
+        import numpy
+        if name is None:
+            return dict((name, self.to_numpy(name)) for name in self._columns)
+        column = self._columns[name]
+        if type(column) is list:
+            return numpy.array(column, dtype=object)
+        return numpy.frombuffer(column, dtype=column.typecode)
+
+    def iter_rows(self):
+        """
+        逐条返回 dict 记录，缺失值为 None
+        """
+        names = list(self._columns)
+        columns = [self._columns[name] for name in names]
+        for values in zip(*columns):
+            yield dict((k, None if v != v else v) for k, v in zip(names, values))
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import time
+
+from .exceptions import ClientException
+from .retry import is_transient_error
+
+
+class AIMDLimiter(object):
+    """
+    自适应并发限制（AIMD）：请求正常时并发上限加性增长，超时、5xx、限流时乘性下降
+
+    :param initial_limit: 初始并发上限
+    :param min_limit: 并发上限最小值
+    :param max_limit: 并发上限最大值
+    :param increase: 每一轮（约 limit 个请求）正常返回后上限增加的值
+    :param decrease_factor: 过载时上限乘以该系数
+    :param latency_threshold: 请求耗时超过该值（秒）视为过载，None 为不按耗时判断
+    :param overload_codes: 视为限流/过载的 ClientException 错误码
+    """
+
+    def __init__(self, initial_limit=10, min_limit=1, max_limit=200, increase=1.0, decrease_factor=0.5,
+                 latency_threshold=None, overload_codes=()):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_threshold = latency_threshold
+        self.overload_codes = frozenset(overload_codes)
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._decreased_at = 0
+        self._cond = threading.Condition(threading.Lock())
+
+    @property
+    def limit(self):
+        """当前并发上限"""
+        return max(int(self._limit), self.min_limit)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def stats(self):
+        return {'limit': self.limit, 'in_flight': self._in_flight}
+
+    def try_acquire(self):
+        """
+        获取并发额度，成功返回开始时间（release 时传回），否则返回 None
+        """
+        with self._cond:
+            if self._in_flight >= self.limit:
+                return None
+            self._in_flight += 1
+            return time.time()
+
+    def acquire(self, timeout=None):
+        """
+        阻塞直到获取并发额度，返回开始时间（release 时传回），超时返回 None
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._in_flight >= self.limit:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            self._in_flight += 1
+            return time.time()
+
+    def is_overload(self, latency, exc=None):
+        if exc is not None:
+            return is_transient_error(exc) or (
+                isinstance(exc, ClientException) and exc.code in self.overload_codes
+            )
+        return self.latency_threshold is not None and latency > self.latency_threshold
+
+    def release(self, started_at, exc=None):
+        """
+        :param started_at: acquire 返回的开始时间
+        :param exc: 请求抛出的异常，成功为 None
+        """
+        now = time.time()
+        with self._cond:
+            self._in_flight -= 1
+            if self.is_overload(now - started_at, exc):
+                # requests started before the last decrease saw the old limit, count one decrease per window
+                if started_at >= self._decreased_at:
+                    self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+                    self._decreased_at = now
+            elif exc is None:
+                self._limit = min(self.max_limit, self._limit + self.increase / self._limit)
+            self._cond.notify_all()
+
+
+class FixedLimiter(object):
+    """
+    固定并发上限，接口与 AIMDLimiter 一致
+
+    :param limit: 并发上限
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._in_flight = 0
+        self._cond = threading.Condition(threading.Lock())
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def stats(self):
+        return {'limit': self.limit, 'in_flight': self._in_flight}
+
+    def try_acquire(self):
+        with self._cond:
+            if self._in_flight >= self.limit:
+                return None
+            self._in_flight += 1
+            return time.time()
+
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._in_flight >= self.limit:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            self._in_flight += 1
+            return time.time()
+
+    def release(self, started_at, exc=None):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import json
+import sys
+
+import six
+
+from .stream import RowParser
+from .utils import ObjectDict
+
+# json.loads accepts utf-8 bytes since python 3.6
+_LOADS_BYTES = six.PY2 or sys.version_info >= (3, 6)
+
+
+def to_object_dict(value, object_class=ObjectDict):
+    """
+    把解码后的普通 dict（包括嵌套的 dict、list）转换为支持属性访问的 ObjectDict
+    """
+    if isinstance(value, dict):
+        return object_class((k, to_object_dict(v, object_class)) for k, v in value.items())
+    if isinstance(value, list):
+        return [to_object_dict(v, object_class) for v in value]
+    return value
+
+
+class JsonDecoder(object):
+    """
+    标准库 json 解码，直接解析响应 bytes，不是合法 utf-8 时忽略非法字符后再解析
+
+    :param object_class: JSON 对象的类型，默认为 ObjectDict（支持属性访问，与旧版本一致），
+        None 为普通 dict，不调用 object_hook，解码更快
+    """
+
+    def __init__(self, object_class=ObjectDict):
+        self.object_class = object_class
+
+    def decode(self, content):
+        object_hook = self.object_class
+        if _LOADS_BYTES:
+            try:
+                return json.loads(content, object_hook=object_hook, strict=False)
+            except UnicodeDecodeError:
+                pass
+        return json.loads(content.decode('utf-8', 'ignore'), object_hook=object_hook, strict=False)
+
+
+class OrjsonDecoder(object):
+    """
+    orjson 解码，需要安装 orjson，orjson 无法解析的响应（如字符串中有未转义的控制字符）使用标准库 json 解码
+
+    :param object_class: JSON 对象的类型，默认为普通 dict，为 ObjectDict 时解码后再转换
+    """
+
+    def __init__(self, object_class=None):
+        import orjson
+        self._orjson = orjson
+        self.object_class = object_class
+        self._fallback = JsonDecoder(object_class=None)
+
+    def decode(self, content):
+        try:
+            result = self._orjson.loads(content)
+        except ValueError:
+            result = self._fallback.decode(content)
+        if self.object_class is not None:
+            result = to_object_dict(result, self.object_class)
+        return result
+
+
+def dict_decoder():
+    """
+    返回普通 dict 的解码器，安装了 orjson 时使用 OrjsonDecoder，否则使用不调用 object_hook 的 JsonDecoder
+    """
+    try:
+        return OrjsonDecoder()
+    except ImportError:
+        return JsonDecoder(object_class=None)
+
+
+class ProjectionDecoder(object):
+    """
+    只保留 path 指向的记录中 fields 字段的解码器，其他字段解析时丢弃，由接口的 fields= 参数使用。
+    响应的其他部分（code、msg、data.total 等）完整保留
+
+    :param fields: 记录保留的字段
+    :param path: 记录数组在响应中的位置，默认为 data.list
+    :param object_class: JSON 对象的类型，默认为 ObjectDict，None 为普通 dict
+    """
+
+    def __init__(self, fields, path=('data', 'list'), object_class=ObjectDict):
+        self.fields = frozenset(fields)
+        self.path = tuple(path)
+        self.object_class = object_class
+
+    def _key(self):
+        return self.fields, self.path, self.object_class
+
+    # equal decoders let single flight merge calls with the same fields
+    def __eq__(self, other):
+        return isinstance(other, ProjectionDecoder) and self._key() == other._key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def decode(self, content):
+        parser = RowParser(self.path, self.object_class, fields=self.fields)
+        rows = parser.feed(content)
+        rows.extend(parser.close())
+        container = parser.meta
+        for key in self.path[:-1]:
+            container = container.get(key) if isinstance(container, dict) else None
+        if isinstance(container, dict) and self.path[-1] not in container and parser.code in (0, None):
+            container[self.path[-1]] = rows
+        return parser.meta
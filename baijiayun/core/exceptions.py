@@ -46,3 +46,9 @@ class ProcessException(ClientException):
         )
         self.result = result
         self.exc = exc
+
+
+class CircuitOpenException(ClientException):
+    def __init__(self, endpoint, client=None):
+        super(CircuitOpenException, self).__init__(code=-11, msg='接口已熔断：%s' % endpoint, client=client)
+        self.endpoint = endpoint
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import collections
+import threading
+
+from .retry import endpoint_name, is_idempotent
+
+
+class HedgePolicy(object):
+    """
+    只读接口的对冲请求：等待超过该接口历史耗时的 percentile 分位仍未返回时，再发一个相同请求，取先成功返回的结果。
+    用对冲额度限制对冲请求占比，避免上游变慢时流量放大
+
+    :param endpoints: 启用对冲的接口 uri 或接口名，如 ['/openapi/video/getUrl', 'getPlayerToken']，
+        None 为全部只读接口
+    :param percentile: 对冲等待时间取历史耗时的分位数（0~1）
+    :param min_delay: 对冲等待时间下限（秒）
+    :param min_samples: 接口耗时样本数少于该值时不对冲
+    :param window: 每个接口保留的最近耗时样本数
+    :param budget_ratio: 每次成功请求增加的对冲额度，即对冲请求最多约占请求数的比例
+    :param budget_min: 对冲额度的初始值
+    :param max_workers: 同步客户端执行对冲请求的线程数，线程都忙时请求在调用线程中执行且不对冲，不会排队等待
+    """
+
+    def __init__(self, endpoints=None, percentile=0.95, min_delay=0.01, min_samples=20, window=200,
+                 budget_ratio=0.05, budget_min=5, max_workers=20):
+        self.endpoints = frozenset(endpoints) if endpoints is not None else None
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.budget_ratio = budget_ratio
+        self.budget_min = budget_min
+        self.max_workers = max_workers
+        self.hedged = 0
+        self.wins = 0
+        self._budget = float(budget_min)
+        self._budget_max = float(max(budget_min, budget_min / budget_ratio if budget_ratio else budget_min))
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    @property
+    def budget(self):
+        return self._budget
+
+    def applies(self, uri):
+        if not is_idempotent(uri):
+            return False
+        if self.endpoints is None:
+            return True
+        path = uri.split('?', 1)[0]
+        return path in self.endpoints or endpoint_name(path) in self.endpoints
+
+    def delay(self, uri):
+        """
+        对冲等待时间（秒），样本不足返回 None
+        """
+        with self._lock:
+            samples = self._latencies.get(uri)
+            if samples is None or len(samples) < self.min_samples:
+                return None
+            samples = sorted(samples)
+        index = min(int(len(samples) * self.percentile), len(samples) - 1)
+        return max(samples[index], self.min_delay)
+
+    def record(self, uri, latency):
+        """
+        记录成功请求的耗时并增加对冲额度
+        """
+        with self._lock:
+            samples = self._latencies.get(uri)
+            if samples is None:
+                samples = self._latencies[uri] = collections.deque(maxlen=self.window)
+            samples.append(latency)
+            self._budget = min(self._budget + self.budget_ratio, self._budget_max)
+
+    def try_hedge(self):
+        """
+        消耗一个对冲额度，额度不足返回 False
+        """
+        with self._lock:
+            if self._budget < 1:
+                return False
+            self._budget -= 1
+            self.hedged += 1
+            return True
+
+    def on_hedge_win(self):
+        with self._lock:
+            self.wins += 1
+
+    def stats(self):
+        return {'hedged': self.hedged, 'wins': self.wins, 'budget': self._budget}
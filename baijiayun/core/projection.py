@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import json
+
+from .utils import ObjectDict
+
+
+class _Pairs(list):
+    # key/value pairs of a JSON object, only turned into a dict when it is kept
+    __slots__ = ()
+
+
+def _materialize(value, object_class):
+    if type(value) is _Pairs:
+        return object_class((k, _materialize(v, object_class)) for k, v in value)
+    if type(value) is list:
+        return [_materialize(v, object_class) for v in value]
+    return value
+
+
+class FieldProjector(object):
+    """
+    解析单条记录并只保留 fields 中的字段，其他字段解析后直接丢弃，不会创建 dict（包括其中嵌套的对象）
+
+    :param fields: 保留的字段
+    :param object_class: JSON 对象的类型，默认为 ObjectDict，None 为普通 dict
+    """
+
+    def __init__(self, fields, object_class=ObjectDict):
+        self.fields = frozenset(fields)
+        self.object_class = object_class or dict
+        self._decoder = json.JSONDecoder(object_pairs_hook=_Pairs, strict=False)
+
+    def raw_decode(self, s, idx=0):
+        value, end = self._decoder.raw_decode(s, idx)
+        if type(value) is _Pairs:
+            fields = self.fields
+            object_class = self.object_class
+            return object_class((k, _materialize(v, object_class)) for k, v in value if k in fields), end
+        return _materialize(value, self.object_class), end
+
+
+def project(value, fields):
+    """
+    只保留接口结果中记录的 fields 字段，可用于 result_processor：列表逐条处理，含 list 的分页结果处理 list 中的记录，
+    其他 dict 作为单条记录处理。记录已经解析，不减少解析开销，只减少之后保留的内存
+    """
+    fields = frozenset(fields)
+    if isinstance(value, list):
+        return [type(row)((k, v) for k, v in row.items() if k in fields) if isinstance(row, dict) else row
+                for row in value]
+    if isinstance(value, dict):
+        rows = value.get('list')
+        if isinstance(rows, list):
+            value = type(value)(value)
+            value['list'] = project(rows, fields)
+            return value
+        return type(value)((k, v) for k, v in value.items() if k in fields)
+    return value
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import math
+import threading
+import time
+
+
+def endpoint_group(uri):
+    """
+    接口分组，如 /openapi/room_data/exportLiveReport -> room_data
+    """
+    parts = uri.split('?', 1)[0].strip('/').split('/')
+    return parts[-2] if len(parts) >= 2 else ''
+
+
+class TokenBucket(object):
+    """
+    进程内令牌桶
+
+    :param rate: 每秒生成令牌数
+    :param capacity: 桶容量（允许的突发请求数），默认等于 rate
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self._tokens = self.capacity
+        self._updated_at = time.time()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """
+        获取一个令牌，成功返回 0，否则返回需要等待的秒数
+        """
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+
+class StorageWindow(object):
+    """
+    通过 storage.incr 在多个进程间共享的固定窗口计数
+
+    :param storage: BaseStorage，需要 incr 为原子操作才能严格限流
+    :param key: 计数 key 前缀
+    :param rate: 每秒请求数
+    :param window: 窗口长度（秒）
+    """
+
+    def __init__(self, storage, key, rate, window=1.0):
+        self.storage = storage
+        self.key = key
+        self.window = float(window)
+        self.limit = max(int(rate * window), 1)
+        self._ttl = int(math.ceil(window)) + 1
+
+    def try_acquire(self):
+        now = time.time()
+        index = int(now // self.window)
+        count = self.storage.incr('{0}:{1}'.format(self.key, index), ttl=self._ttl)
+        if count <= self.limit:
+            return 0
+        return (index + 1) * self.window - now
+
+
+class RateLimiter(object):
+    """
+    按 partner_id（可选再按接口分组）限流，超出时在本地等待而不是请求后收到限流错误
+
+    :param rate: 每秒请求数
+    :param burst: 允许的突发请求数，仅进程内令牌桶有效
+    :param per_group: 是否按接口分组（如 room、room_data、video）分别限流
+    :param group_rates: 指定分组的每秒请求数，如 {'room_data': 5}
+    :param storage: 传入 BaseStorage 时在多个进程间共享限额（固定窗口计数），否则仅在进程内限流
+    :param window: 共享限额的窗口长度（秒）
+    """
+
+    def __init__(self, rate, burst=None, per_group=False, group_rates=None, storage=None, window=1.0):
+        self.rate = rate
+        self.burst = burst
+        self.per_group = per_group
+        self.group_rates = group_rates or {}
+        self.storage = storage
+        self.window = window
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def _key(self, partner_id, uri):
+        group = endpoint_group(uri)
+        if self.per_group or group in self.group_rates:
+            return 'ratelimit:{0}:{1}'.format(partner_id, group), self.group_rates.get(group, self.rate)
+        return 'ratelimit:{0}'.format(partner_id), self.rate
+
+    def _limiter(self, partner_id, uri):
+        key, rate = self._key(partner_id, uri)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(key)
+                if limiter is None:
+                    if self.storage is not None:
+                        limiter = StorageWindow(self.storage, key, rate, self.window)
+                    else:
+                        limiter = TokenBucket(rate, self.burst)
+                    self._limiters[key] = limiter
+        return limiter
+
+    def try_acquire(self, partner_id, uri):
+        """
+        成功返回 0，否则返回需要等待的秒数，等待后需再次调用
+        """
+        return self._limiter(partner_id, uri).try_acquire()
+
+    def acquire(self, partner_id, uri):
+        """
+        阻塞直到获取到额度，返回等待的总秒数
+        """
+        waited = 0
+        delay = self.try_acquire(partner_id, uri)
+        while delay > 0:
+            time.sleep(delay)
+            waited += delay
+            delay = self.try_acquire(partner_id, uri)
+        return waited
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+_FIELDS = {}
+
+
+def _fields(cls):
+    fields = _FIELDS.get(cls)
+    if fields is None:
+        fields = []
+        for klass in reversed(cls.__mro__):
+            fields.extend(name for name in klass.__dict__.get('__slots__', ()) if name != 'extra')
+        fields = _FIELDS[cls] = tuple(fields)
+    return fields
+
+
+class Record(object):
+    """
+    使用 __slots__ 的接口记录，占用内存远小于 ObjectDict。子类在 __slots__ 中声明常用字段，
+    其他字段保存在 extra 字典中（没有时为 None），不存在的字段属性访问返回 None，与 ObjectDict 一致。
+    支持 record['field']、get、keys、items 及 to_dict()，Record 本身可作为所有字段都在 extra 中的通用记录
+    """
+    __slots__ = ('extra', )
+
+    def __init__(self, data=None, **kwargs):
+        if kwargs:
+            data = dict(data or {}, **kwargs)
+        fields = _fields(type(self))
+        setattr_ = object.__setattr__
+        extra = None
+        for key, value in (data or {}).items():
+            if key in fields:
+                setattr_(self, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        setattr_(self, 'extra', extra)
+
+    def __getattr__(self, key):
+        # only called for unset slots and unknown names
+        if key == 'extra' or key.startswith('__'):
+            raise AttributeError(key)
+        extra = self.extra
+        if extra is not None:
+            return extra.get(key)
+        return None
+
+    def __setattr__(self, key, value):
+        if key == 'extra' or key in _fields(type(self)):
+            object.__setattr__(self, key, value)
+        else:
+            if self.extra is None:
+                object.__setattr__(self, 'extra', {})
+            self.extra[key] = value
+
+    def keys(self):
+        keys = []
+        for name in _fields(type(self)):
+            try:
+                object.__getattribute__(self, name)
+            except AttributeError:
+                # not in the data
+                continue
+            keys.append(name)
+        if self.extra:
+            keys.extend(self.extra)
+        return keys
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __getitem__(self, key):
+        if key in _fields(type(self)):
+            try:
+                return object.__getattribute__(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return type(self), (self.to_dict(), )
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.to_dict())
+
+
+class Room(Record):
+    """
+    教室，room.info、room.list
+    """
+    __slots__ = (
+        'room_id', 'title', 'start_time', 'end_time', 'type', 'status', 'teacher_code', 'admin_code',
+        'student_code', 'max_users', 'is_long_term', 'template_name', 'create_time',
+    )
+
+
+class Video(Record):
+    """
+    点播视频，video.get_info、video.get_video_list
+    """
+    __slots__ = (
+        'video_id', 'name', 'status', 'total_size', 'length', 'width', 'height', 'preface_url', 'play_url',
+        'file_md5', 'publish_status', 'category_id', 'create_time', 'update_time',
+    )
+
+
+class Playback(Record):
+    """
+    回放，playback.get_list
+    """
+    __slots__ = (
+        'room_id', 'session_id', 'video_id', 'title', 'status', 'length', 'size', 'preface_url', 'play_url',
+        'publish_status', 'version', 'create_time',
+    )
+
+
+class PlayRecord(Record):
+    """
+    点播、回放观看记录，videodata.get_video_play_record、export_video_report_batch、get_playback_play_record
+    """
+    __slots__ = (
+        'video_id', 'room_id', 'session_id', 'user_number', 'user_name', 'start_time', 'end_time', 'watch_time',
+        'duration', 'client_type', 'ip', 'product_type',
+    )
+
+
+class LiveReportRow(Record):
+    """
+    直播观看记录，roomdata.export_live_report
+    """
+    __slots__ = (
+        'room_id', 'user_number', 'user_name', 'user_role', 'user_avatar', 'enter_time', 'leave_time',
+        'duration', 'client_type', 'ip',
+    )
+
+
+class RoomCost(Record):
+    """
+    教室消耗，liveaccount.get_all_room_cost、smallcourse.get_room_cost
+    """
+    __slots__ = ('room_id', 'title', 'date', 'cost', 'user_count', 'product_type')
+
+
+def to_records(value, record_class):
+    """
+    把接口结果中的记录转换为 record_class：列表逐条转换，含 list 的分页结果转换 list 中的记录，其他 dict 转换为单条记录
+    """
+    if isinstance(value, list):
+        return [record_class(row) if isinstance(row, dict) else row for row in value]
+    if isinstance(value, dict):
+        rows = value.get('list')
+        if isinstance(rows, list):
+            # results may be shared by merged calls, the page is copied instead of changed
+            value = type(value)(value)
+            value['list'] = to_records(rows, record_class)
+            return value
+        return record_class(value)
+    return value
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import random
+import re
+import threading
+import time
+
+from .exceptions import CircuitOpenException, ClientException
+
+IDEMPOTENT_ENDPOINT_RE = re.compile(r'^(get|list|export)|^info$', re.IGNORECASE)
+
+
+def endpoint_name(uri):
+    """
+    接口名，如 /openapi/room/getcode -> getcode
+    """
+    return uri.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+
+
+def is_idempotent(uri):
+    """
+    只读接口（get*、list*、export*、info）可安全重试
+    """
+    return IDEMPOTENT_ENDPOINT_RE.match(endpoint_name(uri)) is not None
+
+
+def is_transient_error(exc):
+    """
+    网络异常、5xx 及 429 视为临时错误，业务错误码不重试
+    """
+    if not isinstance(exc, ClientException) or isinstance(exc, CircuitOpenException) or exc.code is not None:
+        return False
+    status_code = getattr(exc.response, 'status_code', None) or getattr(exc.response, 'status', None)
+    return status_code is None or status_code >= 500 or status_code == 429
+
+
+class RetryPolicy(object):
+    """
+    只读接口的重试策略：指数退避 + full jitter，并用重试预算限制重试占比
+
+    :param max_attempts: 最大尝试次数（含首次请求）
+    :param backoff_base: 退避基数（秒），第 n 次重试等待 random(0, min(backoff_max, backoff_base * 2 ** n))
+    :param backoff_max: 单次退避上限（秒）
+    :param budget_ratio: 每次成功请求增加的重试额度，即重试数最多约占请求数的比例
+    :param budget_min: 重试额度的下限及初始值，保证低流量时也能重试
+    """
+
+    def __init__(self, max_attempts=3, backoff_base=0.1, backoff_max=5.0, budget_ratio=0.1, budget_min=10):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget_ratio = budget_ratio
+        self.budget_min = budget_min
+        self._budget = float(budget_min)
+        self._budget_max = float(max(budget_min, budget_min / budget_ratio if budget_ratio else budget_min))
+        self._lock = threading.Lock()
+
+    @property
+    def budget(self):
+        return self._budget
+
+    def on_success(self):
+        with self._lock:
+            self._budget = min(self._budget + self.budget_ratio, self._budget_max)
+
+    def _withdraw(self):
+        with self._lock:
+            if self._budget < 1:
+                return False
+            self._budget -= 1
+            return True
+
+    def should_retry(self, uri, exc, attempt):
+        """
+        :param attempt: 已完成的尝试次数
+        """
+        if attempt >= self.max_attempts or not is_idempotent(uri) or not is_transient_error(exc):
+            return False
+        return self._withdraw()
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker(object):
+    """
+    按接口熔断：连续 failure_threshold 次临时错误后熔断 recovery_timeout 秒，
+    期间直接抛出 CircuitOpenException；到期后放行一个探测请求，成功则恢复，
+    探测请求被取消或 recovery_timeout 内没有结果时重新放行一个探测请求
+
+    :param failure_threshold: 触发熔断的连续失败次数
+    :param recovery_timeout: 熔断时长（秒）
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._circuits = {}
+
+    def state(self, endpoint):
+        with self._lock:
+            return self._circuits.get(endpoint, (self.CLOSED, 0, 0))[0]
+
+    def before_call(self, endpoint):
+        with self._lock:
+            state, failures, opened_at = self._circuits.get(endpoint, (self.CLOSED, 0, 0))
+            if state == self.CLOSED:
+                return
+            # a probe that never reported back does not keep the circuit half open forever
+            now = time.time()
+            if now - opened_at >= self.recovery_timeout:
+                # while half open the last field is when the probe started
+                self._circuits[endpoint] = (self.HALF_OPEN, failures, now)
+                return
+        raise CircuitOpenException(endpoint)
+
+    def on_success(self, endpoint):
+        with self._lock:
+            self._circuits.pop(endpoint, None)
+
+    def on_abort(self, endpoint):
+        """
+        请求被取消或因其他异常中断，没有结果：探测请求中断时下一个请求立即重新探测
+        """
+        with self._lock:
+            state, failures, started_at = self._circuits.get(endpoint, (self.CLOSED, 0, 0))
+            if state == self.HALF_OPEN:
+                self._circuits[endpoint] = (self.OPEN, failures, time.time() - self.recovery_timeout)
+
+    def on_failure(self, endpoint, exc):
+        if not is_transient_error(exc):
+            self.on_success(endpoint)
+            return
+        with self._lock:
+            state, failures, opened_at = self._circuits.get(endpoint, (self.CLOSED, 0, 0))
+            failures += 1
+            if state == self.HALF_OPEN or failures >= self.failure_threshold:
+                self._circuits[endpoint] = (self.OPEN, failures, time.time())
+            else:
+                self._circuits[endpoint] = (self.CLOSED, failures, opened_at)
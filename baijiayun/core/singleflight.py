@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import threading
+
+import six
+
+from .retry import is_idempotent
+
+# kwargs that do not change the upstream response, result_processor runs per caller
+_KEY_IGNORED = frozenset(['lane', 'timeout', 'result_processor'])
+_KEY_ALLOWED = frozenset(['data', 'params', 'api_base_url', 'decoder']) | _KEY_IGNORED
+
+
+def _freeze(value):
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return tuple(sorted((k, six.text_type(v)) for k, v in value.items()))
+    return six.text_type(value)
+
+
+def request_key(method, uri, kwargs):
+    """
+    只读接口按 (method, uri, 未签名的参数, decoder) 生成合并 key，不可合并的请求（写接口、上传文件等）返回 None，
+    result_processor 不影响 key，由每个调用方各自处理共用的结果
+    """
+    if not is_idempotent(uri) or not _KEY_ALLOWED.issuperset(kwargs):
+        return None
+    return (
+        method.upper(), uri, kwargs.get('api_base_url'),
+        _freeze(kwargs.get('data')), _freeze(kwargs.get('params')), kwargs.get('decoder')
+    )
+
+
+class SharedResult(object):
+    """
+    合并请求使用的 result_processor：保存未处理的接口结果，调用方再各自执行自己的 result_processor
+    """
+    __slots__ = ('value', )
+
+    def __init__(self, value):
+        self.value = value
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.exc = None
+
+
+class SingleFlight(object):
+    """
+    合并同一 key 正在进行中的调用：第一个调用实际执行，其他线程等待并共用它的结果或异常，
+    共用的结果是同一个对象，调用方不应修改
+    """
+
+    def __init__(self):
+        self.shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.event.wait()
+            if call.exc is not None:
+                raise call.exc
+            return call.result
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.exc = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+
+class AsyncSingleFlight(object):
+    """
+    SingleFlight 的 asyncio 版本，do 返回 awaitable，
+    某个等待方被取消不会取消实际执行的请求
+    """
+
+    def __init__(self):
+        self.shared = 0
+        self._calls = {}
+
+    def do(self, key, coro_func, *args, **kwargs):
+        import asyncio
+
+        task = self._calls.get(key)
+        if task is None or task.done():
+            task = asyncio.ensure_future(coro_func(*args, **kwargs))
+            self._calls[key] = task
+
+            def done(t):
+                if self._calls.get(key) is t:
+                    del self._calls[key]
+            task.add_done_callback(done)
+        else:
+            self.shared += 1
+        return asyncio.shield(task)
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import codecs
+import json
+import re
+
+import six
+
+from .projection import FieldProjector
+from .utils import ObjectDict
+
+_WS = re.compile(r'[ \t\n\r]*')
+
+_START = 0
+_KEY_FIRST = 1
+_KEY_NEXT = 2
+_KEY = 3
+_COLON = 4
+_VALUE = 5
+_ROW_FIRST = 6
+_ROW_NEXT = 7
+_ROW = 8
+_DONE = 9
+
+
+class RowParser(object):
+    """
+    增量解析 JSON 响应：分块传入响应数据，逐条返回 path 指向的数组中的记录，
+    其他字段（code、msg、data.total 等）保存在 meta 中，内存占用只与单条记录大小有关。
+    code 不为 0 时不再解析记录
+
+    :param path: 记录数组在响应中的位置，默认为 data.list
+    :param object_class: JSON 对象的类型，默认为 ObjectDict，None 为普通 dict
+    :param record: 记录类型（见 baijiayun.core.records），传入时每条记录解析后转换为该类型
+    :param fields: 记录只保留的字段，其他字段解析时丢弃，见 FieldProjector
+    """
+
+    def __init__(self, path=('data', 'list'), object_class=ObjectDict, record=None, fields=None):
+        self.path = tuple(path)
+        self.record = record
+        self.object_class = object_class or dict
+        self.meta = self.object_class()
+        self._decoder = json.JSONDecoder(object_hook=object_class, strict=False)
+        self._row_decoder = self._decoder if fields is None else FieldProjector(fields, object_class)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')('ignore')
+        self._buf = ''
+        self._pos = 0
+        # characters needed before decoding an incomplete value again, keeps large values linear
+        self._need = 0
+        # objects along path that are being parsed, meta is the outermost
+        self._objects = []
+        self._key = None
+        self._state = _START
+
+    @property
+    def done(self):
+        return self._state == _DONE
+
+    @property
+    def code(self):
+        return self.meta.get('code')
+
+    def feed(self, data):
+        """
+        传入一块响应数据，返回其中已完整的记录列表
+        """
+        if isinstance(data, six.binary_type):
+            data = self._utf8.decode(data)
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return self._parse(False)
+
+    def close(self):
+        """
+        响应读取完毕，返回剩余的记录，响应不完整时抛出 ValueError
+        """
+        rows = self.feed(self._utf8.decode(b'', True))
+        rows.extend(self._parse(True))
+        if not self.done:
+            raise ValueError('incomplete JSON response')
+        return rows
+
+    def _decode(self, pos, eof, decoder=None):
+        # returns (value, end), or None when more data is needed
+        buf = self._buf
+        if not eof and len(buf) - pos < self._need:
+            return None
+        try:
+            value, end = (decoder or self._decoder).raw_decode(buf, pos)
+        except ValueError:
+            if eof:
+                raise
+            self._need = 2 * (len(buf) - pos)
+            return None
+        if end == len(buf) and not eof:
+            # a number or literal may continue in the next chunk
+            self._need = len(buf) - pos + 1
+            return None
+        self._need = 0
+        return value, end
+
+    def _descend(self, ch):
+        depth = len(self._objects)
+        if self._key != self.path[depth - 1] or self.meta.get('code', 0) != 0:
+            return None
+        if depth < len(self.path):
+            return _KEY_FIRST if ch == '{' else None
+        return _ROW_FIRST if ch == '[' else None
+
+    def _parse(self, eof):
+        rows = []
+        buf = self._buf
+        pos = self._pos
+        state = self._state
+        while state != _DONE:
+            pos = _WS.match(buf, pos).end()
+            if pos >= len(buf):
+                break
+            ch = buf[pos]
+            if state == _START:
+                if ch != '{':
+                    raise ValueError('response is not a JSON object')
+                self._objects.append(self.meta)
+                pos += 1
+                state = _KEY_FIRST
+            elif (state == _KEY_FIRST or state == _KEY_NEXT) and ch == '}':
+                self._objects.pop()
+                pos += 1
+                state = _KEY_NEXT if self._objects else _DONE
+            elif state == _KEY_NEXT:
+                if ch != ',':
+                    raise ValueError('expecting , or } at %d' % pos)
+                pos += 1
+                state = _KEY
+            elif state == _KEY_FIRST or state == _KEY:
+                decoded = self._decode(pos, eof)
+                if decoded is None:
+                    break
+                self._key, pos = decoded
+                state = _COLON
+            elif state == _COLON:
+                if ch != ':':
+                    raise ValueError('expecting : at %d' % pos)
+                pos += 1
+                state = _VALUE
+            elif state == _VALUE:
+                next_state = self._descend(ch)
+                if next_state is None:
+                    decoded = self._decode(pos, eof)
+                    if decoded is None:
+                        break
+                    self._objects[-1][self._key], pos = decoded
+                    state = _KEY_NEXT
+                else:
+                    if next_state == _KEY_FIRST:
+                        obj = self.object_class()
+                        self._objects[-1][self._key] = obj
+                        self._objects.append(obj)
+                    pos += 1
+                    state = next_state
+            elif (state == _ROW_FIRST or state == _ROW_NEXT) and ch == ']':
+                pos += 1
+                state = _KEY_NEXT
+            elif state == _ROW_NEXT:
+                if ch != ',':
+                    raise ValueError('expecting , or ] at %d' % pos)
+                pos += 1
+                state = _ROW
+            else:
+                decoded = self._decode(pos, eof, self._row_decoder)
+                if decoded is None:
+                    break
+                row, pos = decoded
+                if self.record is not None and isinstance(row, dict):
+                    row = self.record(row)
+                rows.append(row)
+                state = _ROW_NEXT
+        self._pos = pos
+        self._state = state
+        return rows
+
+
+class RowStream(object):
+    """
+    流式响应的记录迭代器，读取完毕、出错或调用 close() 后释放连接::
+
+        with client.roomdata.export_live_report(room_id, stream=True) as rows:
+            for row in rows:
+                ...
+            total = rows.meta['data'].get('total')
+
+    :param rows: 记录生成器
+    :param parser: RowParser，meta 为响应中除记录外的字段，读取完毕后完整
+    """
+
+    def __init__(self, rows, parser):
+        self._rows = rows
+        self.parser = parser
+
+    @property
+    def meta(self):
+        return self.parser.meta
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._rows)
+
+    next = __next__
+
+    def close(self):
+        self._rows.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -10,6 +10,10 @@ import string
 import six
 
 
+# values whose '%s' formatting equals to_text
+_PLAIN_TYPES = (six.text_type, ) + six.integer_types
+
+
 class ObjectDict(dict):
     """Makes a dictionary behave like an object, with attribute-style access.
     """
@@ -50,6 +54,31 @@ class Md5Signer(Signer):
         return hashlib.md5(str_to_sign).hexdigest().lower()
 
 
+class PartnerKeySigner(object):
+    """
+    接口签名，结果与 Md5Signer(delimiter=b'&', key='partner_key=' + partner_key) 一致。
+    partner_key 只编码一次，字符串及整数值不再转换，原地排序后拼接并只计算一次 md5
+
+    :param partner_key: partner_key
+    """
+
+    def __init__(self, partner_key):
+        self.partner_key = partner_key
+        self._suffix = 'partner_key=' + to_text(partner_key)
+
+    def sign(self, data):
+        parts = []
+        append = parts.append
+        for k, v in data.items():
+            if type(v) not in _PLAIN_TYPES:
+                v = to_text(v)
+            append('%s=%s' % (k, v))
+        # utf-8 keeps code point order, sorting text gives the same order as Md5Signer sorting bytes
+        parts.sort()
+        append(self._suffix)
+        return hashlib.md5('&'.join(parts).encode('utf-8')).hexdigest()
+
+
 def to_text(value, encoding='utf-8'):
     """Convert value to unicode, default encoding is utf-8
 
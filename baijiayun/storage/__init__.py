@@ -13,6 +13,54 @@ class BaseStorage(object):
     def delete(self, key):
         raise NotImplementedError()
 
+    def incr(self, key, delta=1, ttl=None):
+        """
+        计数加 delta 并返回新值，默认实现非原子操作，共享存储应覆盖
+        """
+        value = (self.get(key) or 0) + delta
+        self.set(key, value, ttl)
+        return value
+
+    def add(self, key, value, ttl=None):
+        """
+        key 不存在时写入并返回 True，已存在返回 False，默认实现非原子操作，共享存储应覆盖
+        """
+        if self.get(key) is not None:
+            return False
+        self.set(key, value, ttl)
+        return True
+
+    def delete_if(self, key, value):
+        """
+        key 的值等于 value 时删除并返回 True，用于只释放自己持有的锁，默认实现非原子操作，共享存储应覆盖
+        """
+        if self.get(key) != value:
+            return False
+        self.delete(key)
+        return True
+
+    def get_many(self, keys):
+        """
+        批量读取，返回 {key: value}，不包含不存在的 key
+        """
+        result = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+
+    def set_many(self, mapping, ttl=None):
+        """
+        批量写入 {key: value}
+        """
+        for key, value in mapping.items():
+            self.set(key, value, ttl)
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.delete(key)
+
     def __getitem__(self, key):
         self.get(key)
 
@@ -34,6 +34,12 @@ class BaiJiaYunCacheItem(object):
     def delete(self, key=None):
         return self.cache.storage.delete(self.key_name(key))
 
+    def add(self, key=None, value=None, ttl=None):
+        return self.cache.storage.add(self.key_name(key), value, ttl)
+
+    def delete_if(self, key=None, value=None):
+        return self.cache.storage.delete_if(self.key_name(key), value)
+
 
 class BaseCache(object):
 
@@ -54,3 +60,5 @@ class BaseCache(object):
 
 class BaiJiaYunClientCache(BaseCache):
     partner_key = BaiJiaYunCacheItem()
+    partner_key_expires_at = BaiJiaYunCacheItem()
+    partner_key_lock = BaiJiaYunCacheItem()
@@ -1,19 +1,26 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals
 
-import json
-
-from ..core.utils import to_text
 from . import BaseStorage
+from .serializers import JsonSerializer
 
 
 class KvStorage(BaseStorage):
+    """
+    基于 kvdb（redis、memcache、django cache 等实现 get/set/delete 的对象）的存储，
+    批量操作优先使用 kvdb 的 get_many/get_multi/mget、set_many/set_multi、delete_many/delete_multi 或 pipeline
+
+    :param kvdb: kvdb 对象，set 的第三个参数为过期时间（秒）
+    :param prefix: key 前缀
+    :param serializer: 序列化，需实现 dumps/loads，默认为 JsonSerializer，见 baijiayun.storage.serializers
+    """
 
-    def __init__(self, kvdb, prefix='baijiayun'):
+    def __init__(self, kvdb, prefix='baijiayun', serializer=None):
         for method_name in ('get', 'set', 'delete'):
             assert hasattr(kvdb, method_name)
         self.kvdb = kvdb
         self.prefix = prefix
+        self.serializer = serializer or JsonSerializer()
 
     def key_name(self, key):
         return '{0}:{1}'.format(self.prefix, key)
@@ -23,15 +30,81 @@ class KvStorage(BaseStorage):
         value = self.kvdb.get(key)
         if value is None:
             return default
-        return json.loads(to_text(value))
+        return self.serializer.loads(value)
 
     def set(self, key, value, ttl=None):
         if value is None:
             return
         key = self.key_name(key)
-        value = json.dumps(value)
+        value = self.serializer.dumps(value)
         self.kvdb.set(key, value, ttl)
 
     def delete(self, key):
         key = self.key_name(key)
         self.kvdb.delete(key)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        names = [self.key_name(key) for key in keys]
+        kvdb = self.kvdb
+        if hasattr(kvdb, 'get_many') or hasattr(kvdb, 'get_multi'):
+            found = (kvdb.get_many if hasattr(kvdb, 'get_many') else kvdb.get_multi)(names)
+            values = [found.get(name) for name in names]
+        elif hasattr(kvdb, 'mget'):
+            values = kvdb.mget(names)
+        elif hasattr(kvdb, 'pipeline'):
+            pipe = kvdb.pipeline()
+            for name in names:
+                pipe.get(name)
+            values = pipe.execute()
+        else:
+            values = [kvdb.get(name) for name in names]
+        loads = self.serializer.loads
+        return dict((key, loads(value)) for key, value in zip(keys, values) if value is not None)
+
+    def set_many(self, mapping, ttl=None):
+        dumps = self.serializer.dumps
+        data = dict((self.key_name(key), dumps(value)) for key, value in mapping.items() if value is not None)
+        kvdb = self.kvdb
+        if hasattr(kvdb, 'set_many'):
+            kvdb.set_many(data, ttl)
+        elif hasattr(kvdb, 'set_multi'):
+            kvdb.set_multi(data, ttl or 0)
+        elif hasattr(kvdb, 'pipeline'):
+            pipe = kvdb.pipeline()
+            for name, value in data.items():
+                pipe.set(name, value, ttl)
+            pipe.execute()
+        else:
+            for name, value in data.items():
+                kvdb.set(name, value, ttl)
+
+    def delete_many(self, keys):
+        names = [self.key_name(key) for key in keys]
+        kvdb = self.kvdb
+        if hasattr(kvdb, 'delete_many'):
+            kvdb.delete_many(names)
+        elif hasattr(kvdb, 'delete_multi'):
+            kvdb.delete_multi(names)
+        elif hasattr(kvdb, 'pipeline'):
+            pipe = kvdb.pipeline()
+            for name in names:
+                pipe.delete(name)
+            pipe.execute()
+        else:
+            for name in names:
+                kvdb.delete(name)
+
+    def incr(self, key, delta=1, ttl=None):
+        if not hasattr(self.kvdb, 'incr'):
+            return super(KvStorage, self).incr(key, delta, ttl)
+        key = self.key_name(key)
+        value = int(self.kvdb.incr(key, delta))
+        if ttl and value == delta and hasattr(self.kvdb, 'expire'):
+            self.kvdb.expire(key, ttl)
+        return value
+
+    def add(self, key, value, ttl=None):
+        if not hasattr(self.kvdb, 'add'):
+            return super(KvStorage, self).add(key, value, ttl)
+        return bool(self.kvdb.add(self.key_name(key), self.serializer.dumps(value), ttl))
@@ -1,32 +1,181 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals
 
+import collections
+import os
+import sys
+import threading
 import time
 
 from . import BaseStorage
 
 
-class MemoryStorage(BaseStorage):
+_COUNTERS = ('hits', 'misses', 'evictions', 'expirations')
+
+
+def _touch(data, key):
+    if hasattr(data, 'move_to_end'):
+        data.move_to_end(key)
+    else:
+        data[key] = data.pop(key)
+
+
+class _Stripe(object):
 
     def __init__(self):
-        self._data = {}
+        self.lock = threading.Lock()
+        # key -> (value, expires_at, size), ordered from least to most recently used
+        self.data = collections.OrderedDict()
+        self.size = 0
+        self.next_sweep = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+class MemoryStorage(BaseStorage):
+    """
+    进程内存储，按最近最少使用淘汰，过期数据在读取时及定期清理，fork 后子进程从空数据开始，不继承父进程缓存
+
+    :param max_entries: 最大条目数，None 为不限制，按分段平均分配，每个分段单独淘汰
+    :param max_bytes: 最大占用字节数（按 sys.getsizeof 估算），None 为不限制
+    :param stripes: 分段锁数量，key 按 hash 分到不同分段，减少多线程竞争
+    :param sweep_interval: 每个分段清理过期数据的间隔（秒）
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, stripes=16, sweep_interval=60):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stripes = min(stripes, max_entries) if max_entries else stripes
+        self.sweep_interval = sweep_interval
+        self._stripe_entries = -(-max_entries // self.stripes) if max_entries else None
+        self._stripe_bytes = -(-max_bytes // self.stripes) if max_bytes else None
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._stripes = [_Stripe() for _ in range(self.stripes)]
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _stripe(self, key):
+        self._check_fork()
+        return self._stripes[hash(key) % self.stripes]
+
+    def _get(self, stripe, key, now):
+        # caller holds stripe.lock, returns the entry or None
+        entry = stripe.data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            del stripe.data[key]
+            stripe.size -= entry[2]
+            stripe.expirations += 1
+            return None
+        _touch(stripe.data, key)
+        return entry
+
+    def _set(self, stripe, key, value, ttl, now):
+        # caller holds stripe.lock
+        old = stripe.data.pop(key, None)
+        if old is not None:
+            stripe.size -= old[2]
+        size = sys.getsizeof(key) + sys.getsizeof(value) if self._stripe_bytes else 0
+        stripe.data[key] = (value, None if ttl is None else now + ttl, size)
+        stripe.size += size
+        if now >= stripe.next_sweep:
+            self._sweep(stripe, now)
+        while stripe.data and (
+            (self._stripe_entries and len(stripe.data) > self._stripe_entries) or
+            (self._stripe_bytes and stripe.size > self._stripe_bytes)
+        ):
+            _, entry = stripe.data.popitem(last=False)
+            stripe.size -= entry[2]
+            stripe.evictions += 1
+
+    def _sweep(self, stripe, now):
+        expired = [k for k, entry in stripe.data.items() if entry[1] is not None and entry[1] <= now]
+        for k in expired:
+            stripe.size -= stripe.data.pop(k)[2]
+        stripe.next_sweep = now + self.sweep_interval
+        stripe.expirations += len(expired)
 
     def get(self, key, default=None):
-        ret = self._data.get(key, None)
-        if ret is None or len(ret) != 2:
-            return default
-        else:
-            value = ret[0]
-            expires_at = ret[1]
-            if expires_at is None or expires_at > time.time():
-                return value
-            else:
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = self._get(stripe, key, time.time())
+            if entry is None:
+                stripe.misses += 1
                 return default
+            stripe.hits += 1
+            return entry[0]
 
     def set(self, key, value, ttl=None):
         if value is None:
             return
-        self._data[key] = (value, int(time.time()) + ttl)
+        stripe = self._stripe(key)
+        with stripe.lock:
+            self._set(stripe, key, value, ttl, time.time())
 
     def delete(self, key):
-        self._data.pop(key, None)
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = stripe.data.pop(key, None)
+            if entry is not None:
+                stripe.size -= entry[2]
+
+    def incr(self, key, delta=1, ttl=None):
+        stripe = self._stripe(key)
+        now = time.time()
+        with stripe.lock:
+            entry = self._get(stripe, key, now)
+            if entry is None:
+                value = delta
+                self._set(stripe, key, value, ttl, now)
+            else:
+                value = entry[0] + delta
+                # keep the expiry of the existing counter
+                stripe.data[key] = (value, entry[1], entry[2])
+        return value
+
+    def add(self, key, value, ttl=None):
+        stripe = self._stripe(key)
+        now = time.time()
+        with stripe.lock:
+            if self._get(stripe, key, now) is not None:
+                return False
+            self._set(stripe, key, value, ttl, now)
+        return True
+
+    def delete_if(self, key, value):
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = self._get(stripe, key, time.time())
+            if entry is None or entry[0] != value:
+                return False
+            del stripe.data[key]
+            stripe.size -= entry[2]
+        return True
+
+    def sweep(self):
+        """
+        立即清理所有分段的过期数据
+        """
+        self._check_fork()
+        now = time.time()
+        for stripe in self._stripes:
+            with stripe.lock:
+                self._sweep(stripe, now)
+
+    def stats(self):
+        """
+        命中、未命中、淘汰、过期清理次数及当前条目数
+        """
+        self._check_fork()
+        stats = dict((name, sum(getattr(stripe, name) for stripe in self._stripes)) for name in _COUNTERS)
+        stats['entries'] = sum(len(stripe.data) for stripe in self._stripes)
+        stats['bytes'] = sum(stripe.size for stripe in self._stripes) if self._stripe_bytes else None
+        return stats
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import os
+import socket
+import time
+import uuid
+
+from . import BaseStorage
+from .serializers import JsonSerializer
+
+# delete the key only if it still holds our value (lock token)
+_UNLOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLock(object):
+    """
+    基于 SET NX PX 的分布式锁，只释放自己持有的锁，通过 RedisStorage.lock() 创建
+    """
+
+    def __init__(self, storage, key, ttl=30, blocking_timeout=None, poll_interval=0.05):
+        self.storage = storage
+        self.name = storage.key_name(key)
+        self.ttl = ttl
+        self.blocking_timeout = blocking_timeout
+        self.poll_interval = poll_interval
+        self.token = '{0}:{1}:{2}'.format(socket.gethostname(), os.getpid(), uuid.uuid4().hex)
+
+    def acquire(self, blocking=True):
+        """
+        获取锁，blocking 为 True 时最多等待 blocking_timeout 秒（None 为一直等待），获取失败返回 False
+        """
+        deadline = None if self.blocking_timeout is None else time.time() + self.blocking_timeout
+        while True:
+            if self.storage.redis.set(self.name, self.token, px=int(self.ttl * 1000), nx=True):
+                return True
+            if not blocking or (deadline is not None and time.time() >= deadline):
+                return False
+            time.sleep(self.poll_interval)
+
+    def release(self):
+        """
+        释放锁，锁已过期并被其他进程获取时不会删除，返回是否释放了自己持有的锁
+        """
+        return bool(self.storage.redis.eval(_UNLOCK_SCRIPT, 1, self.name, self.token))
+
+    def __enter__(self):
+        if not self.acquire():
+            raise RuntimeError('can not acquire lock: %s' % self.name)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class RedisStorage(BaseStorage):
+    """
+    Redis 存储，使用 Redis 原生过期时间（SET PX），批量操作使用 MGET 及 pipeline，add 为 SET NX 原子操作
+
+    :param redis: redis.Redis 或兼容接口的客户端
+    :param prefix: key 前缀
+    :param serializer: 序列化，默认为 JsonSerializer，见 baijiayun.storage.serializers，
+        incr 的计数以整数保存，使用其他序列化时不要用 get 读取计数
+    """
+
+    def __init__(self, redis, prefix='baijiayun', serializer=None):
+        self.redis = redis
+        self.prefix = prefix
+        self.serializer = serializer or JsonSerializer()
+
+    def key_name(self, key):
+        return '{0}:{1}'.format(self.prefix, key)
+
+    @staticmethod
+    def _px(ttl):
+        return None if ttl is None else max(int(ttl * 1000), 1)
+
+    def get(self, key, default=None):
+        value = self.redis.get(self.key_name(key))
+        if value is None:
+            return default
+        return self.serializer.loads(value)
+
+    def set(self, key, value, ttl=None):
+        if value is None:
+            return
+        self.redis.set(self.key_name(key), self.serializer.dumps(value), px=self._px(ttl))
+
+    def delete(self, key):
+        self.redis.delete(self.key_name(key))
+
+    def add(self, key, value, ttl=None):
+        return bool(self.redis.set(self.key_name(key), self.serializer.dumps(value), px=self._px(ttl), nx=True))
+
+    def delete_if(self, key, value):
+        return bool(self.redis.eval(_UNLOCK_SCRIPT, 1, self.key_name(key), self.serializer.dumps(value)))
+
+    def incr(self, key, delta=1, ttl=None):
+        name = self.key_name(key)
+        pipe = self.redis.pipeline()
+        if ttl:
+            # creates the counter with its expiry, INCRBY keeps the expiry of an existing key
+            pipe.set(name, 0, px=self._px(ttl), nx=True)
+        pipe.incrby(name, delta)
+        return int(pipe.execute()[-1])
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.redis.mget([self.key_name(key) for key in keys])
+        loads = self.serializer.loads
+        return dict((key, loads(value)) for key, value in zip(keys, values) if value is not None)
+
+    def set_many(self, mapping, ttl=None):
+        pipe = self.redis.pipeline(transaction=False)
+        px = self._px(ttl)
+        dumps = self.serializer.dumps
+        for key, value in mapping.items():
+            if value is not None:
+                pipe.set(self.key_name(key), dumps(value), px=px)
+        pipe.execute()
+
+    def delete_many(self, keys):
+        names = [self.key_name(key) for key in keys]
+        if names:
+            self.redis.delete(*names)
+
+    def lock(self, key, ttl=30, blocking_timeout=None):
+        """
+        分布式锁::
+
+            with storage.lock('refresh:partner_key', ttl=30, blocking_timeout=5):
+                ...
+
+        :param ttl: 锁的过期时间（秒），持有者异常退出后自动释放
+        :param blocking_timeout: 获取锁的最长等待时间（秒），None 为一直等待
+        """
+        return RedisLock(self, key, ttl=ttl, blocking_timeout=blocking_timeout)
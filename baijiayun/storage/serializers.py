@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import json
+import zlib
+
+from six.moves import cPickle as pickle
+
+from ..core.utils import to_binary, to_text
+
+
+class JsonSerializer(object):
+    """
+    JSON 序列化，与旧版本 KvStorage 写入的数据兼容
+    """
+
+    def dumps(self, value):
+        return json.dumps(value)
+
+    def loads(self, data):
+        return json.loads(to_text(data))
+
+
+class PickleSerializer(object):
+    """
+    pickle 序列化，只应用于可信的存储
+    """
+
+    def __init__(self, protocol=pickle.HIGHEST_PROTOCOL):
+        self.protocol = protocol
+
+    def dumps(self, value):
+        return pickle.dumps(value, self.protocol)
+
+    def loads(self, data):
+        return pickle.loads(to_binary(data))
+
+
+class MsgpackSerializer(object):
+    """
+    msgpack 序列化，需要安装 msgpack
+    """
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def dumps(self, value):
+        return self._msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data):
+        return self._msgpack.unpackb(to_binary(data), raw=False)
+
+
+class CompressedSerializer(object):
+    """
+    序列化后超过 threshold 字节时使用 zlib 压缩，首字节标记是否压缩，没有标记的旧数据按未压缩处理
+
+    :param serializer: 实际使用的序列化，默认为 JsonSerializer
+    :param threshold: 压缩阈值（字节）
+    :param level: zlib 压缩级别
+    """
+    RAW = b'\x00'
+    ZLIB = b'\x01'
+
+    def __init__(self, serializer=None, threshold=1024, level=6):
+        self.serializer = serializer or JsonSerializer()
+        self.threshold = threshold
+        self.level = level
+
+    def dumps(self, value):
+        data = to_binary(self.serializer.dumps(value))
+        if len(data) > self.threshold:
+            return self.ZLIB + zlib.compress(data, self.level)
+        return self.RAW + data
+
+    def loads(self, data):
+        data = to_binary(data)
+        header = data[:1]
+        if header == self.ZLIB:
+            data = zlib.decompress(data[1:])
+        elif header == self.RAW:
+            data = data[1:]
+        return self.serializer.loads(data)
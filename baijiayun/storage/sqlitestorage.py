@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import os
+import sqlite3
+import threading
+import time
+
+import six
+
+from . import BaseStorage
+from .serializers import JsonSerializer
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS kv_expires_at ON kv (expires_at);
+'''
+
+# sqlite limits the number of host parameters in one statement
+_BATCH_SIZE = 500
+
+
+class SqliteStorage(BaseStorage):
+    """
+    基于本地 SQLite（WAL 模式）的存储，同一台机器上的多个进程共用一份缓存（partner_key、限流计数等），
+    add、incr 为原子操作，过期数据在读取时忽略并定期清理
+
+    :param path: 数据库文件路径
+    :param serializer: 序列化，默认为 JsonSerializer，见 baijiayun.storage.serializers
+    :param compact_interval: 每个进程清理过期数据的间隔（秒）
+    :param timeout: 等待其他进程写锁的超时时间（秒）
+    """
+
+    def __init__(self, path, serializer=None, compact_interval=60, timeout=30):
+        self.path = path
+        self.serializer = serializer or JsonSerializer()
+        self.compact_interval = compact_interval
+        self.timeout = timeout
+        self._local = threading.local()
+        self._next_compact = 0
+        self._conn.executescript(_SCHEMA)
+
+    @property
+    def _conn(self):
+        # sqlite connections can not be shared between threads or across fork
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = pid
+        return self._local.conn
+
+    def _dumps(self, value):
+        data = self.serializer.dumps(value)
+        if isinstance(data, six.binary_type):
+            return sqlite3.Binary(data)
+        return data
+
+    def _loads(self, data):
+        if not isinstance(data, (six.text_type, six.binary_type)):
+            # blobs are returned as memoryview/buffer
+            data = bytes(data)
+        return self.serializer.loads(data)
+
+    @staticmethod
+    def _expires_at(ttl, now):
+        return None if ttl is None else now + ttl
+
+    def _maybe_compact(self, now):
+        if now >= self._next_compact:
+            self._next_compact = now + self.compact_interval
+            self.compact()
+
+    def compact(self):
+        """
+        删除已过期的数据
+        """
+        self._conn.execute('DELETE FROM kv WHERE expires_at <= ?', (time.time(), ))
+
+    def get(self, key, default=None):
+        row = self._conn.execute(
+            'SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)', (key, time.time())
+        ).fetchone()
+        if row is None:
+            return default
+        return self._loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        if value is None:
+            return
+        now = time.time()
+        self._conn.execute(
+            'INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, self._dumps(value), self._expires_at(ttl, now))
+        )
+        self._maybe_compact(now)
+
+    def delete(self, key):
+        self._conn.execute('DELETE FROM kv WHERE key = ?', (key, ))
+
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        conn = self._conn
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM kv WHERE key = ? AND expires_at <= ?', (key, now))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO kv (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, self._dumps(value), self._expires_at(ttl, now))
+            )
+            return cursor.rowcount == 1
+
+    def delete_if(self, key, value):
+        conn = self._conn
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)', (key, time.time())
+            ).fetchone()
+            if row is None or self._loads(row[0]) != value:
+                return False
+            conn.execute('DELETE FROM kv WHERE key = ?', (key, ))
+        return True
+
+    def incr(self, key, delta=1, ttl=None):
+        now = time.time()
+        conn = self._conn
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT value, expires_at FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)', (key, now)
+            ).fetchone()
+            if row is None:
+                value, expires_at = delta, self._expires_at(ttl, now)
+            else:
+                # keep the expiry of the existing counter
+                value, expires_at = self._loads(row[0]) + delta, row[1]
+            conn.execute(
+                'INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, self._dumps(value), expires_at)
+            )
+        return value
+
+    def get_many(self, keys):
+        keys = list(keys)
+        result = {}
+        now = time.time()
+        for i in range(0, len(keys), _BATCH_SIZE):
+            chunk = keys[i:i + _BATCH_SIZE]
+            rows = self._conn.execute(
+                'SELECT key, value FROM kv WHERE key IN (%s) AND (expires_at IS NULL OR expires_at > ?)'
+                % ', '.join('?' * len(chunk)), chunk + [now]
+            ).fetchall()
+            for key, value in rows:
+                result[key] = self._loads(value)
+        return result
+
+    def set_many(self, mapping, ttl=None):
+        now = time.time()
+        expires_at = self._expires_at(ttl, now)
+        conn = self._conn
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                'INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)',
+                [(key, self._dumps(value), expires_at) for key, value in mapping.items() if value is not None]
+            )
+        self._maybe_compact(now)
+
+    def delete_many(self, keys):
+        conn = self._conn
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany('DELETE FROM kv WHERE key = ?', [(key, ) for key in keys])
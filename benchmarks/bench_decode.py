@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+响应解码性能对比（需先 pip install -e .）：python benchmarks/bench_decode.py
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+
+import json
+import timeit
+
+from baijiayun.core.decoders import JsonDecoder, OrjsonDecoder, dict_decoder
+from baijiayun.core.utils import ObjectDict, json_loads
+
+ROWS = [
+    {
+        'user_number': 1000000 + i,
+        'user_name': '学生%d' % i,
+        'user_role': 0,
+        'enter_time': '2019-01-01 10:00:00',
+        'leave_time': '2019-01-01 11:00:00',
+        'duration': 3600,
+        'ip': '10.0.0.%d' % (i % 255),
+    }
+    for i in range(1000)
+]
+CONTENT = json.dumps({'code': 0, 'data': {'list': ROWS, 'total': len(ROWS)}}).encode('utf-8')
+
+
+def legacy(content):
+    return json_loads(content.decode('utf-8', 'ignore'), strict=False)
+
+
+if __name__ == '__main__':
+    decoders = [
+        ('legacy', legacy),
+        ('JsonDecoder()', JsonDecoder().decode),
+        ('JsonDecoder(None)', JsonDecoder(object_class=None).decode),
+        ('dict_decoder()', dict_decoder().decode),
+    ]
+    try:
+        decoders.append(('OrjsonDecoder(OD)', OrjsonDecoder(object_class=ObjectDict).decode))
+    except ImportError:
+        pass
+    number = 50
+    for name, func in decoders:
+        assert func(CONTENT) == legacy(CONTENT)
+        seconds = min(timeit.repeat(lambda: func(CONTENT), number=number, repeat=3))
+        print('%-18s %.2f ms/page' % (name, seconds / number * 1e3))
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+签名性能对比（需先 pip install -e .）：python benchmarks/bench_sign.py
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+
+import timeit
+
+from baijiayun.core.utils import Md5Signer, PartnerKeySigner, to_text
+
+PARTNER_KEY = 'x7kQ2mZp9vLw3nRt8sYb4cHd6fJg1aE5uWoI0eTr'
+DATA = {
+    'partner_id': 12345678,
+    'room_id': 20012345678901,
+    'user_number': 1000001,
+    'user_name': '学生一号',
+    'user_role': 0,
+    'user_avatar': 'https://img.example.com/avatar/1000001.png',
+    'timestamp': 1700000000,
+}
+
+
+def md5_signer():
+    signer = Md5Signer(delimiter=b'&', key='partner_key=' + PARTNER_KEY)
+    for k, v in DATA.items():
+        signer.add_data('%s=%s' % (k, to_text(v)))
+    return signer.signature
+
+
+partner_key_signer = PartnerKeySigner(PARTNER_KEY)
+
+
+def fast_signer():
+    return partner_key_signer.sign(DATA)
+
+
+if __name__ == '__main__':
+    assert md5_signer() == fast_signer()
+    number = 100000
+    for name, func in (('Md5Signer', md5_signer), ('PartnerKeySigner', fast_signer)):
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        print('%-18s %.2f us/sign' % (name, seconds / number * 1e6))
@@ -74,6 +74,9 @@ setup(
     ],
     packages=find_packages(exclude=('tests',)),
     install_requires=requirements,
+    extras_require={
+        'async': ['aiohttp>=3.3', 'contextvars; python_version < "3.7"'],
+    },
     zip_safe=False,
     include_package_data=True,
     tests_require=[
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import sys
+import unittest
+
+from baijiayun.core.utils import Md5Signer
+from baijiayun.storage.memorystorage import MemoryStorage
+
+try:
+    import asyncio
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+except (ImportError, SyntaxError):
+    web = None
+
+
+def _sign(data, partner_key):
+    signer = Md5Signer(delimiter=b'&', key="partner_key=" + partner_key)
+    for k, v in data.items():
+        signer.add_data("%s=%s" % (k, v))
+    return signer.signature
+
+
+@unittest.skipIf(web is None or sys.version_info < (3, 7), 'aiohttp is not installed')
+class AsyncClientTestCase(unittest.TestCase):
+
+    def run_with_server(self, coro_func, **client_kwargs):
+        calls = []
+
+        async def createkey(request):
+            calls.append('createkey')
+            return web.json_response({'code': 0, 'data': {'partner_key': 'pkey'}})
+
+        async def room_info(request):
+            data = dict(await request.post())
+            sign = data.pop('sign')
+            calls.append('info')
+            if sign != _sign(data, 'pkey'):
+                return web.json_response({'code': 1, 'msg': 'sign error'})
+            return web.json_response({'code': 0, 'data': {'room_id': data['room_id'], 'title': 'title'}})
+
+        async def live_report(request):
+            data = dict(await request.post())
+            if data['room_id'] == '0':
+                return web.json_response({'code': 1, 'msg': 'room not found'})
+            rows = [{'user_number': i} for i in range(int(data['page_size']))]
+            return web.json_response({'code': 0, 'data': {'list': rows, 'total': len(rows)}})
+
+        async def main():
+            from baijiayun import AsyncBaiJiaYunClient
+
+            app = web.Application()
+            app.router.add_post('/openapi/partner/createkey', createkey)
+            app.router.add_post('/openapi/room/info', room_info)
+            app.router.add_post('/openapi/room_data/exportLiveReport', live_report)
+            server = TestServer(app)
+            await server.start_server()
+            try:
+                async with AsyncBaiJiaYunClient('1', 'secret', storage=MemoryStorage(), **client_kwargs) as client:
+                    client.API_BASE_URL = str(server.make_url('/'))
+                    return await coro_func(client)
+            finally:
+                await server.close()
+
+        return asyncio.run(main()), calls
+
+    def test_request(self):
+        async def call(client):
+            return await asyncio.gather(*[client.room.info(room_id) for room_id in range(10)])
+
+        results, calls = self.run_with_server(call)
+        self.assertEqual([str(i) for i in range(10)], [r.room_id for r in results])
+        self.assertEqual(1, calls.count('createkey'))
+
+    def test_pool_stats(self):
+        async def call(client):
+            for room_id in range(3):
+                await client.room.info(room_id)
+            return client.pool_stats()
+
+        stats, _ = self.run_with_server(call)
+        self.assertEqual(1, len(stats))
+        stats = list(stats.values())[0]
+        self.assertEqual(4, stats['requests'])
+        self.assertEqual(1, stats['connections'])
+
+    def test_network_error(self):
+        from baijiayun import AsyncBaiJiaYunClient
+        from baijiayun.core.exceptions import ClientException
+
+        async def call():
+            async with AsyncBaiJiaYunClient('1', 'secret', storage=MemoryStorage()) as client:
+                client.API_BASE_URL = 'http://127.0.0.1:1/'
+                with self.assertRaises(ClientException) as cm:
+                    await client.room.info(1)
+                self.assertIsNone(cm.exception.code)
+
+        asyncio.run(call())
+
+    def test_web_sign(self):
+        async def call(client):
+            return await client.get_web_sign(1, 2, 'name', 0)
+
+        sign, _ = self.run_with_server(call)
+        data = {'room_id': 1, 'user_number': 2, 'user_name': 'name', 'user_role': 0, 'user_avatar': ''}
+        self.assertEqual(_sign(data, 'pkey'), sign)
+
+    def test_single_flight(self):
+        async def call(client):
+            results = await asyncio.gather(*[client.room.info(room_id % 2) for room_id in range(10)])
+            return results, client.single_flight.shared
+
+        (results, shared), calls = self.run_with_server(call, single_flight=True)
+        self.assertEqual(['0', '1'] * 5, [r.room_id for r in results])
+        self.assertEqual(2, calls.count('info'))
+        self.assertEqual(8, shared)
+
+    def test_cancelled_probe(self):
+        from baijiayun.core.exceptions import ClientException
+        from baijiayun.core.retry import CircuitBreaker
+
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+
+        async def call(client):
+            await client.room.info(1)
+            breaker.on_failure('/openapi/room/info', ClientException(code=None, msg='timeout'))
+            # recovery_timeout has passed
+            breaker._circuits['/openapi/room/info'] = (CircuitBreaker.OPEN, 1, 0)
+            request = client._request
+
+            async def hang(*args, **kwargs):
+                await asyncio.sleep(10)
+
+            client._request = hang
+            try:
+                await asyncio.wait_for(client.room.info(1), 0.05)
+            except asyncio.TimeoutError:
+                pass
+            client._request = request
+            state = breaker.state('/openapi/room/info')
+            return state, await client.room.info(1)
+
+        (state, info), _ = self.run_with_server(call, circuit_breaker=breaker)
+        self.assertEqual(CircuitBreaker.OPEN, state)
+        self.assertEqual('title', info.title)
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state('/openapi/room/info'))
+
+    def test_batch(self):
+        async def call(client):
+            async with client.batch(max_workers=2) as batch:
+                for room_id in range(1, 5):
+                    batch.submit(client.room.info(room_id))
+                batch.submit(client.roomdata.export_live_report(0))
+            completed = [i async for i, _ in batch.as_completed()]
+            return batch.results(), batch.errors, completed
+
+        (results, errors, completed), _ = self.run_with_server(call)
+        self.assertEqual(['1', '2', '3', '4'], [r.room_id for r in results[:4]])
+        self.assertEqual(1, results[4].code)
+        self.assertEqual([4], [i for i, _ in errors])
+        self.assertEqual(list(range(5)), sorted(completed))
+
+    def test_stream_rows(self):
+        from baijiayun.core.exceptions import ClientException
+
+        async def call(client):
+            stream = await client.roomdata.export_live_report(1, page_size=3000, stream=True)
+            async with stream:
+                rows = [row async for row in stream]
+            first = None
+            async with await client.roomdata.export_live_report(1, page_size=10, stream=True) as stream:
+                async for row in stream:
+                    first = row
+                    break
+            try:
+                async for _ in await client.roomdata.export_live_report(0, stream=True):
+                    pass
+            except ClientException as e:
+                error = e
+            return rows, stream.meta, first, error, client.pool_stats()
+
+        (rows, meta, first, error, stats), _ = self.run_with_server(call)
+        self.assertEqual(list(range(3000)), [row.user_number for row in rows])
+        self.assertEqual(0, first.user_number)
+        self.assertEqual(1, error.code)
+        self.assertEqual({'code': 0}, dict((k, v) for k, v in meta.items() if k != 'data'))
+
+    def test_lane_per_task(self):
+        from baijiayun.client.lanes import Lane
+
+        async def call(client):
+            entered = asyncio.Event()
+            done = asyncio.Event()
+
+            async def bulk():
+                with client.lane('bulk'):
+                    entered.set()
+                    await client.room.info(1)
+                    await done.wait()
+                    with client.lane('interactive'):
+                        inner = client._current_lane().name
+                    return inner, client._current_lane().name
+
+            async def player():
+                await entered.wait()
+                kwargs = {}
+                client._select_lane('/openapi/video/getPlayerToken', kwargs)
+                await client.room.info(2)
+                done.set()
+                return kwargs['lane'].name
+
+            results = await asyncio.gather(bulk(), player())
+            return results, client._current_lane()
+
+        ((bulk, player), after), _ = self.run_with_server(
+            call,
+            lanes=[Lane('bulk', max_concurrency=1), Lane('interactive', max_concurrency=4)],
+            lane_routes={'/openapi/video/getPlayerToken': 'interactive'},
+        )
+        self.assertEqual(('interactive', 'bulk'), bulk)
+        self.assertEqual('interactive', player)
+        self.assertIsNone(after)
+
+    def test_stream_columns(self):
+        async def call(client):
+            return await client.stream_columns('POST', '/openapi/room_data/exportLiveReport',
+                                               data={'room_id': 1, 'page_size': 100})
+
+        columns, _ = self.run_with_server(call)
+        self.assertEqual(100, len(columns))
+        self.assertEqual(4950, columns.sum('user_number'))
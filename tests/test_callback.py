@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from six.moves.urllib.parse import urlencode
+
+from baijiayun import BaiJiaYunClient
+from baijiayun.callback import (
+    ACCEPTED, BUSY, DUPLICATE, INVALID, CallbackPipeline, CallbackReceiver, ReplayCache
+)
+from baijiayun.storage.memorystorage import MemoryStorage
+
+
+class CallbackReceiverTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = BaiJiaYunClient('1', 'secret', storage=MemoryStorage())
+        self.client.cache.partner_key.set(value='pkey', ttl=7200)
+        self.client.cache.partner_key_expires_at.set(value=int(time.time()) + 7200, ttl=7200)
+        self.events = []
+        self.receiver = CallbackReceiver(self.client, handler=self.events.append)
+
+    def tearDown(self):
+        self.receiver.close()
+        self.client.close()
+
+    def payload(self, **kwargs):
+        data = {'video_id': '1', 'status': '100', 'timestamp': str(int(time.time()))}
+        data.update(kwargs)
+        data['sign'] = self.client.get_sign(data)
+        return data
+
+    def call_wsgi(self, body, content_type='application/x-www-form-urlencoded'):
+        result = {}
+
+        def start_response(status, headers):
+            result['status'] = status
+
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': content_type,
+            'CONTENT_LENGTH': str(len(body)),
+            'QUERY_STRING': '',
+            'wsgi.input': io.BytesIO(body),
+        }
+        body = b''.join(self.receiver(environ, start_response))
+        return result['status'], json.loads(body.decode('utf-8')) if body else None
+
+    def test_receive(self):
+        data = self.payload()
+        self.assertEqual(ACCEPTED, self.receiver.receive(data))
+        self.assertEqual(DUPLICATE, self.receiver.receive(data))
+        self.assertEqual(INVALID, self.receiver.receive(dict(data, status='200')))
+        self.assertEqual(INVALID, self.receiver.receive(self.payload(timestamp=str(int(time.time()) - 1000))))
+        self.receiver.sink.join()
+        self.assertEqual(1, len(self.events))
+        self.assertNotIn('sign', self.events[0])
+        self.assertEqual('100', self.events[0]['status'])
+
+    def test_receive_many(self):
+        payloads = [self.payload(video_id=str(i)) for i in range(5)]
+        self.assertEqual([ACCEPTED] * 5 + [DUPLICATE], self.receiver.receive_many(payloads + payloads[:1]))
+
+    def test_busy(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def handler(event):
+            started.set()
+            release.wait()
+
+        receiver = CallbackReceiver(self.client, handler=handler, queue_size=1)
+        # one event is being handled and one waits in the queue
+        self.assertEqual(ACCEPTED, receiver.receive(self.payload(video_id='1')))
+        started.wait(1)
+        self.assertEqual(ACCEPTED, receiver.receive(self.payload(video_id='2')))
+        self.assertEqual(BUSY, receiver.receive(self.payload(video_id='3')))
+        release.set()
+        receiver.close()
+        # busy callbacks are not remembered, the vendor retry is accepted
+        self.assertEqual(ACCEPTED, receiver.receive(self.payload(video_id='3')))
+        receiver.close()
+
+    def test_wsgi(self):
+        self.assertEqual(('200 OK', {'code': 0}), self.call_wsgi(urlencode(self.payload()).encode('utf-8')))
+        status, _ = self.call_wsgi(json.dumps(self.payload(video_id='2', sign='x')).encode('utf-8'),
+                                   'application/json')
+        self.assertEqual('403 Forbidden', status)
+        self.assertEqual('400 Bad Request', self.call_wsgi(b'[1]', 'application/json')[0])
+
+    def test_invalid_timestamp(self):
+        self.assertEqual('403 Forbidden', self.call_wsgi(b'timestamp=abc&sign=x')[0])
+        for timestamp in ([1], 'nan', None, {'a': 1}):
+            body = json.dumps({'video_id': '1', 'timestamp': timestamp, 'sign': 'x'}).encode('utf-8')
+            self.assertEqual('403 Forbidden', self.call_wsgi(body, 'application/json')[0])
+        self.assertEqual(INVALID, self.receiver.receive({'video_id': '1', 'timestamp': [1], 'sign': 'x'}))
+        self.assertFalse(self.client.check_sign({'timestamp': 'abc', 'sign': 'x'}))
+        self.assertEqual([], self.events)
+
+    def test_replay_cache(self):
+        cache = ReplayCache(maxsize=2, window=0.05)
+        self.assertTrue(cache.add('a'))
+        self.assertFalse(cache.add('a'))
+        cache.add('b')
+        cache.add('c')
+        self.assertEqual(2, len(cache))
+        self.assertNotIn('a', cache)
+        time.sleep(0.06)
+        self.assertTrue(cache.add('b'))
+        self.assertEqual(1, len(cache))
+
+    @unittest.skipIf(sys.version_info < (3, 7), 'asyncio.run requires python 3.7')
+    def test_asgi(self):
+        import asyncio
+
+        app = self.receiver.asgi_app()
+        body = urlencode(self.payload()).encode('utf-8')
+        messages = [{'type': 'http.request', 'body': body[:10], 'more_body': True},
+                    {'type': 'http.request', 'body': body[10:]}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'query_string': b'',
+                 'headers': [(b'content-type', b'application/x-www-form-urlencoded')]}
+        asyncio.run(app(scope, receive, send))
+        self.assertEqual(200, sent[0]['status'])
+        self.assertEqual({'code': 0}, json.loads(sent[1]['body'].decode('utf-8')))
+
+
+class CallbackPipelineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'callbacks.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_dedupe_and_fan_out(self):
+        received = {'a': [], 'b': []}
+        pipeline = CallbackPipeline(self.path, workers=2, poll_interval=0.01)
+        pipeline.register(lambda event: received['a'].append(event['video_id']), name='a')
+        pipeline.register(lambda event: received['b'].append(event['video_id']), name='b')
+        self.assertTrue(pipeline.put({'video_id': '1', 'status': '100', 'timestamp': 1}))
+        # vendor retry with a new timestamp
+        self.assertTrue(pipeline.put({'video_id': '1', 'status': '100', 'timestamp': 2}))
+        self.assertTrue(pipeline.put({'video_id': '2', 'status': '100', 'timestamp': 2}))
+        self.assertTrue(pipeline.join(5))
+        pipeline.close()
+        self.assertEqual(['1', '2'], sorted(received['a']))
+        self.assertEqual(['1', '2'], sorted(received['b']))
+
+    def test_retry_and_failed(self):
+        attempts = []
+
+        def flaky(event):
+            attempts.append(event['video_id'])
+            if event['video_id'] == '2' or len(attempts) < 2:
+                raise ValueError('boom')
+
+        pipeline = CallbackPipeline(self.path, max_attempts=3, retry_delay=0.01, poll_interval=0.01)
+        pipeline.register(flaky, name='flaky')
+        pipeline.put({'video_id': '1'})
+        pipeline.put({'video_id': '2'})
+        self.assertTrue(pipeline.join(5))
+        pipeline.close()
+        self.assertEqual(2, attempts.count('1'))
+        self.assertEqual(3, attempts.count('2'))
+        failed = pipeline.failed()
+        self.assertEqual([({'video_id': '2'}, 'flaky')], [(event, name) for event, name, _ in failed])
+
+    def test_durable_and_backpressure(self):
+        pipeline = CallbackPipeline(self.path, max_pending=2, poll_interval=0.01)
+        pipeline.register(lambda event: None, name='noop')
+        # not started: events stay in the queue file
+        pipeline._check_workers = lambda: None
+        self.assertTrue(pipeline.put({'video_id': '1'}))
+        self.assertTrue(pipeline.put({'video_id': '2'}))
+        self.assertFalse(pipeline.put({'video_id': '3'}))
+
+        handled = []
+        restarted = CallbackPipeline(self.path, poll_interval=0.01)
+        restarted.register(lambda event: handled.append(event['video_id']), name='noop')
+        self.assertTrue(restarted.put({'video_id': '1'}))
+        self.assertTrue(restarted.join(5))
+        restarted.close()
+        self.assertEqual(['1', '2'], sorted(handled))
+
+    def test_running_deliveries_are_owned(self):
+        handled = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow(event):
+            handled.append(('A', event['room_id']))
+            started.set()
+            release.wait(5)
+
+        first = CallbackPipeline(self.path, poll_interval=0.01)
+        first.register(slow, name='handler')
+        first.put({'room_id': 1})
+        self.assertTrue(started.wait(5))
+        # a worker started later must not take the delivery the first one is running
+        second = CallbackPipeline(self.path, poll_interval=0.01)
+        second.register(lambda event: handled.append(('B', event['room_id'])), name='handler')
+        second.put({'room_id': 2})
+        time.sleep(0.2)
+        release.set()
+        self.assertTrue(second.join(5))
+        first.close()
+        second.close()
+        self.assertEqual([('A', 1), ('B', 2)], sorted(handled))
+
+    def test_reclaim_expired_or_dead(self):
+        pipeline = CallbackPipeline(self.path, poll_interval=0.01)
+        pipeline._check_workers = lambda: None
+        pipeline.register(lambda event: None, name='handler')
+        pipeline.put({'room_id': 1})
+        pipeline.put({'room_id': 2})
+        conn = pipeline._conn
+        # a crashed process with a live lease and a live process whose lease expired
+        conn.execute("UPDATE deliveries SET status = 1, owner = '999999999:x', lease_until = ? WHERE event_id = 1",
+                     (time.time() + 3600, ))
+        conn.execute("UPDATE deliveries SET status = 1, owner = ?, lease_until = ? WHERE event_id = 2",
+                     ('%d:y' % os.getpid(), time.time() - 1))
+
+        handled = []
+        restarted = CallbackPipeline(self.path, poll_interval=0.01)
+        restarted.register(lambda event: handled.append(event['room_id']), name='handler')
+        restarted._check_workers()
+        self.assertTrue(restarted.join(5))
+        restarted.close()
+        self.assertEqual([1, 2], sorted(handled))
+
+    def test_receiver_sink(self):
+        client = BaiJiaYunClient('1', 'secret', storage=MemoryStorage())
+        client.cache.partner_key.set(value='pkey', ttl=7200)
+        client.cache.partner_key_expires_at.set(value=int(time.time()) + 7200, ttl=7200)
+        handled = []
+        pipeline = CallbackPipeline(self.path, poll_interval=0.01)
+        pipeline.register(handled.append)
+        receiver = CallbackReceiver(client, sink=pipeline)
+        data = {'room_id': '1', 'op': 'end', 'timestamp': str(int(time.time()))}
+        data['sign'] = client.get_sign(data)
+        self.assertEqual(ACCEPTED, receiver.receive(data))
+        self.assertTrue(pipeline.join(5))
+        receiver.close()
+        client.close()
+        self.assertEqual('end', handled[0]['op'])
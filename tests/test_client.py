@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import json
+import threading
+import time
+import unittest
+
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import parse_qsl
+
+from baijiayun import BaiJiaYunClient
+from baijiayun.client.lanes import Lane
+from baijiayun.core.columns import Columns
+from baijiayun.core.decoders import JsonDecoder, dict_decoder, to_object_dict
+from baijiayun.core.exceptions import CircuitOpenException, ClientException
+from baijiayun.core.hedge import HedgePolicy
+from baijiayun.core.records import LiveReportRow, Room
+from baijiayun.core.retry import CircuitBreaker, RetryPolicy
+from baijiayun.core.utils import ObjectDict
+from baijiayun.storage.memorystorage import MemoryStorage
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        data = dict(parse_qsl(self.rfile.read(length).decode('utf-8')))
+        status, body = self.server.handle(self.path, data)
+        body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeOpenAPIServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """按 path 分发到 routes 中的函数，函数返回 (status, body)"""
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), _Handler)
+        self.lock = threading.Lock()
+        self.calls = []
+        self.routes = {
+            '/openapi/partner/createkey': lambda data: (200, {'code': 0, 'data': {'partner_key': 'pkey'}}),
+        }
+
+    def handle(self, path, data):
+        with self.lock:
+            self.calls.append(path)
+        return self.routes[path](data)
+
+    def count(self, path):
+        with self.lock:
+            return self.calls.count(path)
+
+
+class ClientTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeOpenAPIServer()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.client = self.make_client()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def make_client(self, **kwargs):
+        client = BaiJiaYunClient('1', 'secret', storage=MemoryStorage(), **kwargs)
+        client.API_BASE_URL = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+        return client
+
+    def test_batch(self):
+        def info(data):
+            time.sleep(0.01)
+            if data['room_id'] == '3':
+                return 200, {'code': 1, 'msg': 'not found'}
+            return 200, {'code': 0, 'data': {'room_id': data['room_id']}}
+
+        self.server.routes['/openapi/room/info'] = info
+        with self.client.batch(max_workers=4, max_in_flight=4) as batch:
+            for room_id in range(10):
+                self.client.room.info(room_id)
+        results = batch.results()
+        self.assertEqual(10, len(results))
+        self.assertEqual('0', results[0].room_id)
+        self.assertIsInstance(results[3], ClientException)
+        self.assertEqual([3], [index for index, _ in batch.errors])
+        self.assertEqual(set(range(10)), set(index for index, _ in batch.as_completed()))
+        self.assertEqual('5', self.client.room.info(5).room_id)
+
+    def test_network_error(self):
+        self.client.API_BASE_URL = 'http://127.0.0.1:1/'
+        with self.assertRaises(ClientException) as cm:
+            self.client.room.info(1)
+        self.assertIsNone(cm.exception.code)
+
+    def test_retry(self):
+        signs = []
+
+        def info(data):
+            signs.append(data['sign'])
+            if len(signs) < 3:
+                return 502, {}
+            return 200, {'code': 0, 'data': {'room_id': data['room_id']}}
+
+        self.server.routes['/openapi/room/info'] = info
+        self.server.routes['/openapi/room/update'] = lambda data: (502, {})
+        client = self.make_client(retry_policy=RetryPolicy(max_attempts=3, backoff_base=0))
+        self.assertEqual('1', client.room.info(1).room_id)
+        self.assertEqual(3, len(signs))
+        with self.assertRaises(ClientException):
+            client.room.update(1, title='t')
+        self.assertEqual(1, self.server.count('/openapi/room/update'))
+        client.close()
+
+    def test_circuit_breaker(self):
+        self.server.routes['/openapi/room/info'] = lambda data: (503, {})
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+        client = self.make_client(circuit_breaker=breaker)
+        for _ in range(2):
+            with self.assertRaises(ClientException):
+                client.room.info(1)
+        with self.assertRaises(CircuitOpenException):
+            client.room.info(1)
+        self.assertEqual(2, self.server.count('/openapi/room/info'))
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state('/openapi/room/info'))
+        client.close()
+
+    def test_circuit_breaker_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+        error = ClientException(code=None, msg='timeout')
+        breaker.on_failure('/openapi/room/info', error)
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state('/openapi/room/info'))
+        time.sleep(0.05)
+        breaker.before_call('/openapi/room/info')
+        with self.assertRaises(CircuitOpenException):
+            breaker.before_call('/openapi/room/info')
+        # the probe was cancelled: the next call probes again
+        breaker.on_abort('/openapi/room/info')
+        breaker.before_call('/openapi/room/info')
+        # the probe never reported back: another one is let through after recovery_timeout
+        time.sleep(0.05)
+        breaker.before_call('/openapi/room/info')
+        breaker.on_success('/openapi/room/info')
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state('/openapi/room/info'))
+
+    def test_lanes(self):
+        state = {'active': 0, 'max_active': 0}
+
+        def export(data):
+            with self.server.lock:
+                state['active'] += 1
+                state['max_active'] = max(state['max_active'], state['active'])
+            time.sleep(0.02)
+            with self.server.lock:
+                state['active'] -= 1
+            return 200, {'code': 0, 'data': {'list': []}}
+
+        self.server.routes['/openapi/room_data/exportLiveReport'] = export
+        self.server.routes['/openapi/room/getcode'] = lambda data: (200, {'code': 0, 'data': {'student_code': 'c'}})
+        client = self.make_client(
+            lanes=[Lane('bulk', max_concurrency=1), Lane('interactive', max_concurrency=4)],
+            lane_routes={'room_data': 'bulk', '/openapi/room/getcode': 'interactive'}
+        )
+        with client.batch(max_workers=4) as batch:
+            for _ in range(4):
+                client.roomdata.export_live_report(1)
+            client.room.getcode(1, 1)
+        self.assertFalse(batch.errors)
+        self.assertEqual(1, state['max_active'])
+        bulk = client.lane_router.get('bulk')
+        interactive = client.lane_router.get('interactive')
+        self.assertIsNot(bulk.transport, interactive.transport)
+        self.assertEqual(4, sum(s['requests'] for s in bulk.transport.stats().values()))
+        self.assertEqual(1, sum(s['requests'] for s in interactive.transport.stats().values()))
+        with client.lane('bulk'):
+            client.room.getcode(1, 1)
+        self.assertEqual(5, sum(s['requests'] for s in bulk.transport.stats().values()))
+        client.close()
+
+    def test_single_flight(self):
+        def info(data):
+            time.sleep(0.1)
+            return 200, {'code': 0, 'data': {'room_id': data['room_id']}}
+
+        self.server.routes['/openapi/room/info'] = info
+        self.server.routes['/openapi/room/update'] = lambda data: (200, {'code': 0, 'data': {}})
+        client = self.make_client(single_flight=True)
+        client.get_partner_key()
+        with client.batch(max_workers=8) as batch:
+            for _ in range(6):
+                client.room.info(1)
+            client.room.info(2)
+            client.room.update(1, title='t')
+            client.room.update(1, title='t')
+        results = batch.results()
+        self.assertEqual(['1'] * 6 + ['2'], [r.room_id for r in results[:7]])
+        self.assertEqual(2, self.server.count('/openapi/room/info'))
+        self.assertEqual(2, self.server.count('/openapi/room/update'))
+        self.assertEqual(5, client.single_flight.shared)
+        client.room.info(1)
+        self.assertEqual(3, self.server.count('/openapi/room/info'))
+        client.close()
+
+    def test_single_flight_result_processor(self):
+        def live_status(data):
+            time.sleep(0.1)
+            return 200, {'code': 0, 'data': {'status': 1}}
+
+        def info(data):
+            time.sleep(0.1)
+            return 200, {'code': 0, 'data': {'room_id': data['room_id'], 'title': 't'}}
+
+        self.server.routes['/openapi/live/getLiveStatus'] = live_status
+        self.server.routes['/openapi/room/info'] = info
+        client = self.make_client(single_flight=True)
+        client.get_partner_key()
+        with client.batch(max_workers=8) as batch:
+            for _ in range(4):
+                client.live.get_live_status(1)
+            client.room.info(1, record=Room)
+            client.room.info(1, record=Room)
+        results = batch.results()
+        self.assertEqual([1] * 4, results[:4])
+        self.assertEqual([Room, Room], [type(r) for r in results[4:]])
+        self.assertEqual(1, self.server.count('/openapi/live/getLiveStatus'))
+        self.assertEqual(1, self.server.count('/openapi/room/info'))
+        self.assertEqual(4, client.single_flight.shared)
+        client.close()
+
+    def test_hedge(self):
+        calls = []
+
+        def get_url(data):
+            with self.server.lock:
+                calls.append(data['video_id'])
+                first = len(calls) == 1
+            time.sleep(1 if first else 0.01)
+            return 200, {'code': 0, 'data': {'video_id': data['video_id']}}
+
+        self.server.routes['/openapi/video/getUrl'] = get_url
+        hedge = HedgePolicy(endpoints=['getUrl'], min_samples=5)
+        for _ in range(5):
+            hedge.record('/openapi/video/getUrl', 0.02)
+        client = self.make_client(hedge_policy=hedge)
+        client.get_partner_key()
+        started_at = time.time()
+        self.assertEqual('1', client.video.get_url(1).video_id)
+        self.assertLess(time.time() - started_at, 0.5)
+        self.assertEqual(2, len(calls))
+        self.assertEqual({'hedged': 1, 'wins': 1}, dict((k, hedge.stats()[k]) for k in ('hedged', 'wins')))
+        client.close()
+
+    def test_hedge_does_not_cap_concurrency(self):
+        def get_url(data):
+            time.sleep(0.2)
+            return 200, {'code': 0, 'data': {'video_id': data['video_id']}}
+
+        self.server.routes['/openapi/video/getUrl'] = get_url
+        hedge = HedgePolicy(endpoints=['getUrl'], min_samples=5, max_workers=2, budget_min=0)
+        for _ in range(5):
+            hedge.record('/openapi/video/getUrl', 0.5)
+        client = self.make_client(hedge_policy=hedge)
+        client.get_partner_key()
+        results = []
+        threads = [threading.Thread(target=lambda i=i: results.append(client.video.get_url(i).video_id))
+                   for i in range(8)]
+        started_at = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # calls beyond max_workers run in their own threads instead of queueing for the pool
+        self.assertLess(time.time() - started_at, 0.6)
+        self.assertEqual(8, len(results))
+        client.close()
+
+    def test_partner_key_l1_cache(self):
+        class CountingStorage(MemoryStorage):
+            gets = 0
+
+            def get(self, key, default=None):
+                CountingStorage.gets += 1
+                return super(CountingStorage, self).get(key, default)
+
+        keys = iter(['pkey1', 'pkey2'])
+        self.server.routes['/openapi/partner/createkey'] = lambda data: (
+            200, {'code': 0, 'data': {'partner_key': next(keys)}}
+        )
+        storage = CountingStorage()
+        client = BaiJiaYunClient('1', 'secret', storage=storage)
+        client.API_BASE_URL = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+        self.assertEqual('pkey1', client.get_partner_key())
+        gets = CountingStorage.gets
+        for _ in range(10):
+            client.get_sign({'room_id': 1})
+        self.assertEqual(gets, CountingStorage.gets)
+        self.assertGreater(storage.get('1:partner_key_expires_at'), time.time() + 7000)
+
+        other = BaiJiaYunClient('1', 'secret', storage=storage)
+        self.assertEqual('pkey1', other.get_partner_key())
+        self.assertEqual('pkey2', client.get_partner_key(force=True))
+        self.assertEqual('pkey2', client.partner_key)
+        self.assertEqual('pkey1', other.partner_key)
+        other.invalidate_partner_key()
+        self.assertEqual('pkey2', other.partner_key)
+        self.assertEqual(2, self.server.count('/openapi/partner/createkey'))
+        client.close()
+        other.close()
+
+    def test_partner_key_single_refresh(self):
+        def createkey(data):
+            time.sleep(0.1)
+            return 200, {'code': 0, 'data': {'partner_key': 'pkey'}}
+
+        self.server.routes['/openapi/partner/createkey'] = createkey
+        storage = MemoryStorage()
+        # two clients on one storage behave like two processes
+        clients = [self.make_client(), self.make_client()]
+        for client in clients:
+            client.cache.storage = storage
+        results = []
+        threads = [
+            threading.Thread(target=lambda c=c: results.append(c.get_partner_key()))
+            for c in clients * 5
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(['pkey'] * 10, results)
+        self.assertEqual(1, self.server.count('/openapi/partner/createkey'))
+        self.assertIsNone(storage.get('1:partner_key_lock'))
+        for client in clients:
+            client.close()
+
+    def test_partner_key_refresh_ahead(self):
+        self.server.routes['/openapi/partner/createkey'] = lambda data: (
+            200, {'code': 0, 'data': {'partner_key': 'new'}}
+        )
+        client = self.make_client()
+        client.cache.partner_key.set(value='old', ttl=300)
+        client.cache.partner_key_expires_at.set(value=int(time.time()) + 300, ttl=300)
+        self.assertEqual('old', client.get_partner_key())
+        for _ in range(100):
+            if client.partner_key == 'new':
+                break
+            time.sleep(0.01)
+        self.assertEqual('new', client.partner_key)
+        self.assertEqual(1, self.server.count('/openapi/partner/createkey'))
+        client.close()
+
+    def test_get_web_sign_many(self):
+        records = [(1, i, 'name%d' % i, 0) for i in range(20)] + [(2, 100, '学生', 1, 'http://a/b.png', 3)]
+        expected = [self.client.get_web_sign(*record) for record in records]
+        self.assertEqual(expected, list(self.client.get_web_sign_many(records)))
+        self.assertEqual(expected, list(self.client.get_web_sign_many(iter(records), processes=2, chunksize=6)))
+        query = dict(parse_qsl(list(self.client.get_web_sign_many(records[-1:], query=True))[0]))
+        self.assertEqual(
+            {'room_id': '2', 'user_number': '100', 'user_name': '学生', 'user_role': '1',
+             'user_avatar': 'http://a/b.png', 'group_id': '3', 'sign': expected[-1]},
+            query
+        )
+        self.assertEqual(1, self.server.count('/openapi/partner/createkey'))
+
+    def test_decoder(self):
+        self.server.routes['/openapi/room/info'] = lambda data: (
+            200, {'code': 0, 'data': {'room_id': data['room_id'], 'teacher': {'name': '老师'}}}
+        )
+        room = self.client.room.info(1)
+        self.assertIsInstance(room, ObjectDict)
+        self.assertEqual('老师', room.teacher.name)
+        room = self.client.post('/openapi/room/info', data={'room_id': 2}, decoder=dict_decoder())
+        self.assertIs(type(room), dict)
+        self.assertIs(type(room['teacher']), dict)
+        client = self.make_client(decoder=JsonDecoder(object_class=None))
+        room = client.room.info(3)
+        self.assertIs(type(room), dict)
+        self.assertEqual('老师', to_object_dict(room).teacher.name)
+        client.close()
+
+    def test_stream_rows(self):
+        rows = [{'user_number': i, 'user_name': '学生%d' % i} for i in range(2000)]
+
+        def live_report(data):
+            if data['room_id'] == '0':
+                return 200, {'code': 1, 'msg': 'room not found'}
+            return 200, {'code': 0, 'data': {'list': rows, 'total': len(rows)}}
+
+        self.server.routes['/openapi/room_data/exportLiveReport'] = live_report
+        with self.client.roomdata.export_live_report(1, stream=True) as stream:
+            self.assertEqual(rows, list(stream))
+            self.assertEqual(2000, stream.meta.data.total)
+            self.assertEqual('学生1', rows[1]['user_name'])
+        stream = self.client.stream_rows('POST', '/openapi/room_data/exportLiveReport', data={'room_id': 1},
+                                         chunk_size=100, decoder=dict_decoder())
+        first = next(stream)
+        self.assertIs(type(first), dict)
+        stream.close()
+        with self.assertRaises(ClientException) as cm:
+            list(self.client.roomdata.export_live_report(0, stream=True))
+        self.assertEqual(1, cm.exception.code)
+        self.assertEqual('room not found', cm.exception.message)
+
+    def test_records(self):
+        self.server.routes['/openapi/room/info'] = lambda data: (
+            200, {'code': 0, 'data': {'room_id': data['room_id'], 'title': 'title', 'extra_field': 1}}
+        )
+        self.server.routes['/openapi/room/list'] = lambda data: (
+            200, {'code': 0, 'data': {'list': [{'room_id': 1}, {'room_id': 2}]}}
+        )
+        self.server.routes['/openapi/room_data/exportLiveReport'] = lambda data: (
+            200, {'code': 0, 'data': {'list': [{'user_number': i, 'user_name': 'u%d' % i} for i in range(10)]}}
+        )
+        room = self.client.room.info(1, record=Room)
+        self.assertIs(Room, type(room))
+        self.assertEqual(('1', 'title', 1), (room.room_id, room.title, room.extra_field))
+        self.assertEqual([Room, Room], [type(r) for r in self.client.room.list(record=Room)])
+        self.assertIsInstance(self.client.room.info(1), ObjectDict)
+        rows = list(self.client.roomdata.export_live_report(1, stream=True, record=LiveReportRow))
+        self.assertEqual(list(range(10)), [row.user_number for row in rows])
+        self.assertIs(LiveReportRow, type(rows[0]))
+        page = self.client.roomdata.export_live_report(1, record=LiveReportRow)
+        self.assertIs(LiveReportRow, type(page['list'][0]))
+
+    def test_columnar(self):
+        self.server.routes['/openapi/live_account/getAllRoomCost'] = lambda data: (
+            200, {'code': 0, 'data': {'room_cost': [
+                {'room_id': i, 'cost': str(i), 'product_type': i % 2} for i in range(10)
+            ]}}
+        )
+        costs = self.client.liveaccount.get_all_room_cost('2018-02-01', columnar={'cost': int})
+        self.assertIsInstance(costs, Columns)
+        self.assertEqual(10, len(costs))
+        self.assertEqual(45, costs.sum('cost'))
+        self.assertEqual({0: 20, 1: 25}, costs.group_by('product_type', 'cost'))
+        self.assertEqual(10, len(self.client.liveaccount.get_all_room_cost('2018-02-01')))
+
+    def test_fields(self):
+        self.server.routes['/openapi/video/getVideoList'] = lambda data: (
+            200, {'code': 0, 'data': {'list': [
+                {'video_id': i, 'name': 'v%d' % i, 'play_url': 'url', 'size': i} for i in range(3)
+            ], 'total': 3}}
+        )
+        self.server.routes['/openapi/room/list'] = lambda data: (
+            200, {'code': 0, 'data': {'list': [{'room_id': 1, 'title': 't', 'admin_code': 'c'}]}}
+        )
+        page = self.client.video.get_video_list(fields=('video_id', 'name'))
+        self.assertEqual([{'video_id': i, 'name': 'v%d' % i} for i in range(3)], page.list)
+        self.assertEqual(3, page.total)
+        self.assertIsInstance(page.list[0], ObjectDict)
+        self.assertEqual([{'room_id': 1}], self.client.room.list(fields=['room_id']))
+        rooms = self.client.room.list(fields=['room_id'], record=Room)
+        self.assertEqual((1, None), (rooms[0].room_id, rooms[0].title))
+        self.assertEqual(['room_id'], rooms[0].keys())
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import math
+import unittest
+from array import array
+
+from baijiayun.core.columns import Columns
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class ColumnsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = [
+            {'room_id': 1, 'title': '语文', 'cost': 10, 'rate': 0.5, 'product_type': 1},
+            {'room_id': 2, 'title': '数学', 'cost': 0, 'rate': 1.5, 'product_type': 4},
+            {'room_id': 3, 'title': '语文', 'cost': 5, 'product_type': 1},
+        ]
+        self.columns = Columns.from_rows(self.rows)
+
+    def test_storage(self):
+        columns = self.columns
+        self.assertEqual(3, len(columns))
+        self.assertEqual(['room_id', 'title', 'cost', 'rate', 'product_type'], columns.fields)
+        self.assertIsInstance(columns['cost'], array)
+        self.assertEqual('d', columns['rate'].typecode)
+        self.assertTrue(math.isnan(columns['rate'][2]))
+        self.assertEqual(['语文', '数学', '语文'], columns['title'])
+        self.assertIs(columns['title'][0], columns['title'][2])
+        self.assertEqual([dict(row, rate=row.get('rate')) for row in self.rows], list(columns.iter_rows()))
+
+    def test_column_conversion(self):
+        columns = Columns.from_rows([{'a': 1, 'b': 1}, {'a': 1.5}, {'a': 2, 'b': 2 ** 70}, {'c': 'x'}])
+        self.assertEqual('d', columns['a'].typecode)
+        self.assertEqual([1, None, 2 ** 70, None], columns['b'])
+        self.assertEqual([None, None, None, 'x'], columns['c'])
+        self.assertEqual(2, columns.count('b'))
+
+    def test_types(self):
+        columns = Columns.from_rows([{'cost': '10'}, {'cost': 'bad'}, {'cost': '2'}], {'cost': int})
+        self.assertEqual([10, None, 2], columns['cost'])
+        self.assertEqual(12, columns.sum('cost'))
+
+    def test_aggregates(self):
+        columns = self.columns
+        self.assertEqual(15, columns.sum('cost'))
+        self.assertEqual(1.0, columns.mean('rate'))
+        self.assertEqual(0, columns.min('cost'))
+        self.assertEqual(10, columns.max('cost'))
+        self.assertEqual(2, columns.count('rate'))
+        self.assertEqual({'语文': 2, '数学': 1}, columns.value_counts('title'))
+        self.assertEqual({1: 15, 4: 0}, columns.group_by('product_type', 'cost'))
+        self.assertEqual({1: 2, 4: 1}, columns.group_by('product_type', agg='count'))
+        self.assertEqual({1: 0.5, 4: 1.5}, columns.group_by('product_type', 'rate', agg='mean'))
+        with self.assertRaises(ValueError):
+            columns.group_by('product_type', agg='median')
+
+    def test_filter(self):
+        paid = self.columns.filter(cost=lambda v: v > 0)
+        self.assertEqual([1, 3], list(paid['room_id']))
+        self.assertIsInstance(paid['room_id'], array)
+        both = self.columns.filter(self.columns.mask('title', lambda v: v == '语文'), rate=lambda v: v > 0)
+        self.assertEqual([1], list(both['room_id']))
+        self.assertEqual(3, len(self.columns.filter()))
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_to_numpy(self):
+        arrays = self.columns.to_numpy()
+        self.assertEqual(15, arrays['cost'].sum())
+        self.assertEqual(object, arrays['title'].dtype)
+        self.assertEqual(1, arrays['rate'][~numpy.isnan(arrays['rate'])].mean())
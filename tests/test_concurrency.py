@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import unittest
+
+from baijiayun.core.concurrency import AIMDLimiter
+from baijiayun.core.exceptions import ClientException
+
+
+class AIMDLimiterTestCase(unittest.TestCase):
+
+    def test_additive_increase(self):
+        limiter = AIMDLimiter(initial_limit=2, max_limit=4)
+        for _ in range(20):
+            limiter.release(limiter.acquire())
+        self.assertEqual(4, limiter.limit)
+        self.assertEqual(0, limiter.in_flight)
+
+    def test_multiplicative_decrease(self):
+        limiter = AIMDLimiter(initial_limit=8, overload_codes=(429, ))
+        started = [limiter.acquire() for _ in range(3)]
+        self.assertEqual(3, limiter.in_flight)
+        limiter.release(started[0], ClientException(None, 'timeout'))
+        self.assertEqual(4, limiter.limit)
+        # requests started before the decrease do not decrease again
+        limiter.release(started[1], ClientException(None, 'timeout'))
+        self.assertEqual(4, limiter.limit)
+        limiter.release(started[2], ClientException(1, 'business error'))
+        self.assertEqual(4, limiter.limit)
+        limiter.release(limiter.acquire(), ClientException(429, 'rate limit'))
+        self.assertEqual(2, limiter.limit)
+
+    def test_limit(self):
+        limiter = AIMDLimiter(initial_limit=1)
+        started = limiter.acquire()
+        self.assertIsNone(limiter.try_acquire())
+        self.assertIsNone(limiter.acquire(timeout=0.01))
+        limiter.release(started)
+        self.assertIsNotNone(limiter.try_acquire())
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import unittest
+
+from baijiayun.core.hedge import HedgePolicy
+
+
+class HedgePolicyTestCase(unittest.TestCase):
+
+    def test_applies(self):
+        policy = HedgePolicy(endpoints=['/openapi/video/getUrl', 'getPlayerToken'])
+        self.assertTrue(policy.applies('/openapi/video/getUrl'))
+        self.assertTrue(policy.applies('/openapi/playback/getPlayerToken'))
+        self.assertFalse(policy.applies('/openapi/video/getPlayerTokenBatch'))
+        self.assertFalse(HedgePolicy().applies('/openapi/room/update'))
+
+    def test_delay(self):
+        policy = HedgePolicy(percentile=0.9, min_samples=10, min_delay=0.001)
+        uri = '/openapi/video/getUrl'
+        for i in range(9):
+            policy.record(uri, (i + 1) / 100.0)
+        self.assertIsNone(policy.delay(uri))
+        policy.record(uri, 0.1)
+        self.assertAlmostEqual(0.1, policy.delay(uri))
+
+    def test_budget(self):
+        policy = HedgePolicy(budget_ratio=0.5, budget_min=1)
+        self.assertTrue(policy.try_hedge())
+        self.assertFalse(policy.try_hedge())
+        policy.record('/openapi/video/getUrl', 0.1)
+        policy.record('/openapi/video/getUrl', 0.1)
+        self.assertTrue(policy.try_hedge())
+        self.assertEqual(2, policy.stats()['hedged'])
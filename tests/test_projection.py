@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import json
+import unittest
+
+from baijiayun.core.decoders import ProjectionDecoder
+from baijiayun.core.projection import FieldProjector, project
+from baijiayun.core.stream import RowParser
+from baijiayun.core.utils import ObjectDict
+
+
+class ProjectionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = [
+            {'video_id': 1, 'name': '视频', 'play_info': {'url': 'u'}, 'tags': [{'id': 1}], 'size': 10},
+            {'video_id': 2, 'name': None, 'size': 20},
+        ]
+        self.content = json.dumps({'code': 0, 'data': {'list': self.rows, 'total': 2}}).encode('utf-8')
+
+    def test_field_projector(self):
+        projector = FieldProjector(['video_id', 'tags'])
+        row, end = projector.raw_decode(json.dumps(self.rows[0]))
+        self.assertEqual({'video_id': 1, 'tags': [{'id': 1}]}, row)
+        self.assertIsInstance(row, ObjectDict)
+        self.assertIsInstance(row.tags[0], ObjectDict)
+        self.assertEqual([1, 2], projector.raw_decode('[1, 2]')[0])
+        self.assertIs(dict, type(FieldProjector(['video_id'], None).raw_decode('{"video_id": 1}')[0]))
+
+    def test_project(self):
+        page = {'list': [ObjectDict(row) for row in self.rows], 'total': 2}
+        self.assertEqual([{'video_id': 1}, {'video_id': 2}], project(page, ['video_id'])['list'])
+        self.assertIsInstance(page['list'][0], ObjectDict)
+        self.assertEqual([{'size': 10}, {'size': 20}], project(self.rows, ['size']))
+        self.assertEqual({'name': '视频'}, project(self.rows[0], ['name']))
+
+    def test_row_parser(self):
+        parser = RowParser(fields=('video_id', 'name'))
+        rows = parser.feed(self.content[:50])
+        rows.extend(parser.feed(self.content[50:]))
+        rows.extend(parser.close())
+        self.assertEqual([{'video_id': 1, 'name': '视频'}, {'video_id': 2, 'name': None}], rows)
+        self.assertEqual(2, parser.meta['data']['total'])
+
+    def test_decoder(self):
+        result = ProjectionDecoder(['video_id', 'size']).decode(self.content)
+        self.assertEqual([{'video_id': 1, 'size': 10}, {'video_id': 2, 'size': 20}], result.data.list)
+        self.assertEqual(2, result.data.total)
+        self.assertEqual({'code': 1, 'msg': 'error'},
+                         ProjectionDecoder(['video_id']).decode(b'{"code": 1, "msg": "error"}'))
+        result = ProjectionDecoder(['room_id'], ('data', 'room_cost'), None).decode(
+            b'{"code": 0, "data": {"room_cost": [{"room_id": 1, "cost": 2}]}}'
+        )
+        self.assertEqual({'code': 0, 'data': {'room_cost': [{'room_id': 1}]}}, result)
+        self.assertIs(dict, type(result))
+        with self.assertRaises(ValueError):
+            ProjectionDecoder(['video_id']).decode(b'<html>')
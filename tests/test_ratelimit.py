@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import unittest
+
+from baijiayun.core.ratelimit import RateLimiter, TokenBucket, endpoint_group
+from baijiayun.storage.memorystorage import MemoryStorage
+
+
+class RateLimitTestCase(unittest.TestCase):
+
+    def test_endpoint_group(self):
+        self.assertEqual('room_data', endpoint_group('/openapi/room_data/exportLiveReport'))
+        self.assertEqual('video', endpoint_group('/openapi/video/getUrl?x=1'))
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        self.assertEqual(0, bucket.try_acquire())
+        self.assertEqual(0, bucket.try_acquire())
+        delay = bucket.try_acquire()
+        self.assertTrue(0 < delay <= 0.1)
+
+    def test_per_group(self):
+        limiter = RateLimiter(rate=1, per_group=True)
+        self.assertEqual(0, limiter.try_acquire('1', '/openapi/room/info'))
+        self.assertEqual(0, limiter.try_acquire('1', '/openapi/video/getUrl'))
+        self.assertEqual(0, limiter.try_acquire('2', '/openapi/room/info'))
+        self.assertTrue(limiter.try_acquire('1', '/openapi/room/info') > 0)
+
+    def test_shared_storage(self):
+        storage = MemoryStorage()
+        limiters = [RateLimiter(rate=0.3, storage=storage, window=10) for _ in range(2)]
+        delays = [limiters[i % 2].try_acquire('1', '/openapi/room/info') for i in range(4)]
+        self.assertEqual([0, 0, 0], delays[:3])
+        self.assertTrue(delays[3] > 0)
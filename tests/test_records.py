@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import pickle
+import unittest
+
+from baijiayun.core.records import PlayRecord, Record, Room, to_records
+
+
+class RecordTestCase(unittest.TestCase):
+
+    def test_fields(self):
+        data = {'video_id': 1, 'user_number': 2, 'user_name': '学生', 'area': '北京'}
+        record = PlayRecord(data)
+        self.assertEqual(1, record.video_id)
+        self.assertEqual('北京', record.area)
+        self.assertEqual({'area': '北京'}, record.extra)
+        self.assertIsNone(record.ip)
+        self.assertIsNone(record.unknown)
+        self.assertEqual('学生', record['user_name'])
+        self.assertEqual('北京', record['area'])
+        with self.assertRaises(KeyError):
+            record['ip']
+        self.assertIsNone(record.get('ip'))
+        self.assertNotIn('ip', record)
+        self.assertIn('area', record)
+        self.assertEqual(data, dict(record))
+        self.assertEqual(data, record.to_dict())
+        self.assertEqual(record, data)
+        self.assertFalse(hasattr(record, '__dict__'))
+
+    def test_set(self):
+        record = Room(room_id=1)
+        record.title = 'title'
+        record.custom = 1
+        self.assertEqual({'room_id': 1, 'title': 'title', 'custom': 1}, record.to_dict())
+        self.assertEqual({'custom': 1}, record.extra)
+
+    def test_generic(self):
+        record = Record({'a': 1})
+        self.assertEqual(1, record.a)
+        self.assertEqual({'a': 1}, record.extra)
+
+    def test_pickle(self):
+        record = PlayRecord({'video_id': 1, 'area': '北京'})
+        self.assertEqual(record, pickle.loads(pickle.dumps(record)))
+        self.assertIs(PlayRecord, type(pickle.loads(pickle.dumps(record))))
+
+    def test_to_records(self):
+        rows = [{'room_id': 1}, {'room_id': 2}]
+        self.assertEqual([Room, Room], [type(r) for r in to_records(rows, Room)])
+        page = to_records({'list': rows, 'total': 2}, Room)
+        self.assertEqual(2, page['total'])
+        self.assertEqual(2, page['list'][1].room_id)
+        self.assertIs(Room, type(to_records({'room_id': 1}, Room)))
+        self.assertEqual('x', to_records('x', Room))
@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from baijiayun.core.utils import to_binary
+from baijiayun.storage.kvstorage import KvStorage
+from baijiayun.storage.memorystorage import MemoryStorage
+from baijiayun.storage.redisstorage import RedisStorage
+from baijiayun.storage.sqlitestorage import SqliteStorage
+from baijiayun.storage.serializers import CompressedSerializer, MsgpackSerializer, PickleSerializer
+
+
+class MemoryStorageTestCase(unittest.TestCase):
+
+    def test_incr(self):
+        storage = MemoryStorage()
+        self.assertEqual(1, storage.incr('k', ttl=10))
+        self.assertEqual(3, storage.incr('k', 2, ttl=10))
+
+    def test_add(self):
+        storage = MemoryStorage()
+        self.assertTrue(storage.add('k', 1, ttl=10))
+        self.assertFalse(storage.add('k', 2, ttl=10))
+        self.assertEqual(1, storage.get('k'))
+
+    def test_delete_if(self):
+        storage = MemoryStorage()
+        storage.set('lock', 'a', ttl=10)
+        self.assertFalse(storage.delete_if('lock', 'b'))
+        self.assertTrue(storage.delete_if('lock', 'a'))
+        self.assertIsNone(storage.get('lock'))
+        self.assertFalse(storage.delete_if('lock', 'a'))
+        storage.delete('k')
+        self.assertTrue(storage.add('k', 3, ttl=10))
+
+    def test_ttl(self):
+        storage = MemoryStorage(sweep_interval=0)
+        storage.set('forever', 1)
+        storage.set('short', 1, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(storage.get('short'))
+        storage.set('other', 1, ttl=0.01)
+        time.sleep(0.02)
+        # expired keys are removed when the stripe is swept on write
+        storage.set('forever', 2)
+        storage.sweep()
+        self.assertEqual(2, storage.get('forever'))
+        stats = storage.stats()
+        self.assertEqual(1, stats['entries'])
+        self.assertEqual(2, stats['expirations'])
+
+    def test_lru(self):
+        storage = MemoryStorage(max_entries=3, stripes=1)
+        for key in 'abc':
+            storage.set(key, key)
+        storage.get('a')
+        storage.set('d', 'd')
+        self.assertIsNone(storage.get('b'))
+        self.assertEqual(['a', 'c', 'd'], [k for k in 'abcd' if storage.get(k)])
+        stats = storage.stats()
+        self.assertEqual(1, stats['evictions'])
+        self.assertEqual(3, stats['entries'])
+        self.assertEqual(4, stats['hits'])
+        self.assertEqual(2, stats['misses'])
+
+    def test_max_bytes(self):
+        storage = MemoryStorage(max_bytes=10000, stripes=1)
+        for i in range(100):
+            storage.set(i, 'x' * 1000)
+        self.assertLessEqual(storage.stats()['bytes'], 10000)
+        self.assertLess(storage.stats()['entries'], 10)
+        self.assertIsNotNone(storage.get(99))
+
+    def test_threads(self):
+        storage = MemoryStorage(max_entries=1000)
+
+        def work():
+            for i in range(1000):
+                storage.incr('counter')
+                storage.set(i, i)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(4000, storage.get('counter'))
+        self.assertLessEqual(storage.stats()['entries'], 1000 + 16)
+        self.assertTrue(MemoryStorage())
+
+
+class FakeKv(object):
+    """只实现 get/set/delete 的 kvdb，记录调用次数"""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = 0
+
+    def get(self, key):
+        self.calls += 1
+        return self.data.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.calls += 1
+        self.data[key] = value
+
+    def delete(self, key):
+        self.calls += 1
+        self.data.pop(key, None)
+
+
+class FakePipeline(object):
+
+    def __init__(self, kv):
+        self.kv = kv
+        self.ops = []
+
+    def set(self, key, value, ttl=None):
+        self.ops.append(lambda: self.kv.data.__setitem__(key, value))
+
+    def delete(self, key):
+        self.ops.append(lambda: self.kv.data.pop(key, None))
+
+    def execute(self):
+        self.kv.calls += 1
+        return [op() for op in self.ops]
+
+
+class FakeRedis(FakeKv):
+
+    def mget(self, keys):
+        self.calls += 1
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class KvStorageTestCase(unittest.TestCase):
+
+    def test_batch_fallback(self):
+        kv = FakeKv()
+        storage = KvStorage(kv)
+        storage.set_many({'a': 1, 'b': {'x': [1, 2]}}, ttl=10)
+        self.assertEqual({'a': 1, 'b': {'x': [1, 2]}}, storage.get_many(['a', 'b', 'c']))
+        storage.delete_many(['a'])
+        self.assertEqual({'b': {'x': [1, 2]}}, storage.get_many(['a', 'b']))
+        # legacy json values are still readable
+        self.assertEqual('{"x": [1, 2]}', kv.data['baijiayun:b'])
+
+    def test_batch_round_trips(self):
+        kv = FakeRedis()
+        storage = KvStorage(kv)
+        storage.set_many(dict(('k%d' % i, i) for i in range(100)), ttl=10)
+        self.assertEqual(100, len(storage.get_many('k%d' % i for i in range(100))))
+        storage.delete_many('k%d' % i for i in range(50))
+        self.assertEqual(50, len(storage.get_many('k%d' % i for i in range(100))))
+        self.assertEqual(4, kv.calls)
+
+    def test_serializers(self):
+        value = {'token': 'x' * 2000, 'n': 1}
+        serializers = [
+            PickleSerializer(), CompressedSerializer(threshold=100), CompressedSerializer(PickleSerializer())
+        ]
+        try:
+            serializers.append(MsgpackSerializer())
+        except ImportError:
+            pass
+        for serializer in serializers:
+            storage = KvStorage(FakeKv(), serializer=serializer)
+            storage.set('v', value)
+            self.assertEqual(value, storage.get('v'))
+        compressed = CompressedSerializer(threshold=100)
+        self.assertLess(len(compressed.dumps(value)), 200)
+        self.assertEqual({'a': 1}, compressed.loads('{"a": 1}'))
+
+
+def _incr_many(path, n):
+    storage = SqliteStorage(path)
+    for _ in range(n):
+        storage.incr('counter', ttl=60)
+        storage.add('lock:%d' % os.getpid(), 1, ttl=60)
+
+
+class SqliteStorageTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'cache.db')
+        self.storage = SqliteStorage(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_delete_if(self):
+        storage = self.storage
+        storage.set('lock', 'a', ttl=60)
+        self.assertFalse(storage.delete_if('lock', 'b'))
+        self.assertTrue(storage.delete_if('lock', 'a'))
+        self.assertIsNone(storage.get('lock'))
+
+    def test_get_set(self):
+        storage = self.storage
+        storage.set('a', {'x': 1}, ttl=60)
+        storage.set('forever', [1, 2])
+        self.assertEqual({'x': 1}, storage.get('a'))
+        self.assertEqual([1, 2], storage.get('forever'))
+        storage.delete('a')
+        self.assertIsNone(storage.get('a'))
+        storage.set_many({'b': 1, 'c': 2}, ttl=60)
+        self.assertEqual({'b': 1, 'c': 2, 'forever': [1, 2]}, storage.get_many(['b', 'c', 'd', 'forever']))
+        storage.delete_many(['b', 'c'])
+        self.assertEqual({}, storage.get_many(['b', 'c']))
+        pickled = SqliteStorage(self.path, serializer=PickleSerializer())
+        pickled.set('p', {'x': b'bytes'})
+        self.assertEqual({'x': b'bytes'}, pickled.get('p'))
+
+    def test_ttl_and_compact(self):
+        storage = self.storage
+        storage.set('short', 1, ttl=0.01)
+        self.assertTrue(storage.add('lock', 1, ttl=0.01))
+        self.assertFalse(storage.add('lock', 2, ttl=0.01))
+        time.sleep(0.02)
+        self.assertIsNone(storage.get('short'))
+        self.assertTrue(storage.add('lock', 3, ttl=60))
+        self.assertEqual(3, storage.get('lock'))
+        storage.compact()
+        count = storage._conn.execute('SELECT COUNT(*) FROM kv').fetchone()[0]
+        self.assertEqual(1, count)
+
+    def test_processes(self):
+        processes = [multiprocessing.Process(target=_incr_many, args=(self.path, 50)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(200, self.storage.get('counter'))
+        self.assertEqual(4, len(self.storage.get_many('lock:%d' % p.pid for p in processes)))
+
+
+class FakeRedisClient(object):
+    """进程内模拟 redis-py 客户端的常用命令，值以 bytes 保存，支持过期时间"""
+
+    def __init__(self):
+        self.data = {}
+        self.commands = 0
+        self.lock = threading.RLock()
+
+    def _alive(self, name):
+        entry = self.data.get(name)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self.data[name]
+            return None
+        return entry
+
+    def get(self, name):
+        with self.lock:
+            self.commands += 1
+            entry = self._alive(name)
+            return entry[0] if entry else None
+
+    def set(self, name, value, ex=None, px=None, nx=False):
+        with self.lock:
+            self.commands += 1
+            if nx and self._alive(name):
+                return None
+            expires_at = None
+            if ex is not None:
+                expires_at = time.time() + ex
+            elif px is not None:
+                expires_at = time.time() + px / 1000.0
+            self.data[name] = (to_binary(value), expires_at)
+            return True
+
+    def delete(self, *names):
+        with self.lock:
+            self.commands += 1
+            return sum(1 for name in names if self.data.pop(name, None) is not None)
+
+    def mget(self, names):
+        with self.lock:
+            self.commands += 1
+            return [entry[0] if entry else None for entry in map(self._alive, names)]
+
+    def incrby(self, name, amount=1):
+        with self.lock:
+            self.commands += 1
+            entry = self._alive(name)
+            value = int(entry[0]) + amount if entry else amount
+            self.data[name] = (to_binary(value), entry[1] if entry else None)
+            return value
+
+    def pttl(self, name):
+        with self.lock:
+            entry = self._alive(name)
+            if entry is None:
+                return -2
+            return -1 if entry[1] is None else int((entry[1] - time.time()) * 1000)
+
+    def eval(self, script, numkeys, *args):
+        # only the compare-and-delete unlock script is supported
+        with self.lock:
+            self.commands += 1
+            name, token = args[0], to_binary(args[1])
+            entry = self._alive(name)
+            if entry and entry[0] == token:
+                del self.data[name]
+                return 1
+            return 0
+
+    def pipeline(self, transaction=True):
+        return FakeRedisPipeline(self)
+
+
+class FakeRedisPipeline(object):
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return command
+
+    def execute(self):
+        redis = self.redis
+        with redis.lock:
+            commands = redis.commands
+            results = [getattr(redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+            # one round trip
+            redis.commands = commands + 1
+        self.calls = []
+        return results
+
+
+class RedisStorageTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedisClient()
+        self.storage = RedisStorage(self.redis)
+
+    def test_get_set(self):
+        storage = self.storage
+        storage.set('a', {'x': 1}, ttl=60)
+        self.assertEqual({'x': 1}, storage.get('a'))
+        self.assertGreater(self.redis.pttl('baijiayun:a'), 59000)
+        storage.set('short', 1, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(storage.get('short'))
+        storage.delete('a')
+        self.assertIsNone(storage.get('a'))
+
+    def test_batch(self):
+        storage = self.storage
+        commands = self.redis.commands
+        storage.set_many(dict(('k%d' % i, i) for i in range(100)), ttl=60)
+        self.assertEqual(100, len(storage.get_many('k%d' % i for i in range(100))))
+        storage.delete_many('k%d' % i for i in range(100))
+        self.assertEqual({}, storage.get_many(['k1']))
+        self.assertEqual(4, self.redis.commands - commands)
+
+    def test_incr_and_add(self):
+        storage = self.storage
+        self.assertEqual(1, storage.incr('c', ttl=60))
+        self.assertEqual(3, storage.incr('c', 2, ttl=60))
+        self.assertEqual(3, storage.get('c'))
+        self.assertGreater(self.redis.pttl('baijiayun:c'), 0)
+        self.assertTrue(storage.add('lock', 1, ttl=60))
+        self.assertFalse(storage.add('lock', 2, ttl=60))
+
+    def test_lock(self):
+        storage = self.storage
+        lock = storage.lock('refresh', ttl=0.2)
+        self.assertTrue(lock.acquire())
+        other = storage.lock('refresh', ttl=60, blocking_timeout=0.01)
+        self.assertFalse(other.acquire())
+        time.sleep(0.2)
+        # the expired lock is taken by another holder and not released by the old one
+        self.assertTrue(other.acquire(blocking=False))
+        self.assertFalse(lock.release())
+        self.assertTrue(other.release())
+        with storage.lock('refresh'):
+            self.assertFalse(storage.add('refresh', 1))
+
+    def test_partner_key_lock(self):
+        from baijiayun import BaiJiaYunClient
+
+        client = BaiJiaYunClient('1', 'secret', storage=self.storage)
+        token = client._acquire_partner_key_lock()
+        self.assertTrue(token)
+        self.assertIsNone(client._acquire_partner_key_lock())
+        client._release_partner_key_lock(token)
+        other = client._acquire_partner_key_lock()
+        self.assertTrue(other)
+        # a holder whose lock expired does not release the lock of the next holder
+        client._release_partner_key_lock(token)
+        self.assertIsNone(client._acquire_partner_key_lock())
+        client._release_partner_key_lock(other)
+        self.assertTrue(client._acquire_partner_key_lock())
+        client.close()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import json
+import unittest
+
+from baijiayun.core.stream import RowParser
+from baijiayun.core.utils import ObjectDict
+
+
+def _feed(parser, content, size):
+    rows = []
+    for i in range(0, len(content), size):
+        rows.extend(parser.feed(content[i:i + size]))
+    rows.extend(parser.close())
+    return rows
+
+
+class RowParserTestCase(unittest.TestCase):
+
+    rows = [{'user_number': i, 'user_name': '学生%d\n' % i, 'tags': [1, {'a': None}], 'duration': 1.5} for i in range(50)]
+
+    def test_chunks(self):
+        body = {'code': 0, 'msg': '', 'data': {'list': self.rows, 'total': 50}}
+        for ensure_ascii in (True, False):
+            content = json.dumps(body, ensure_ascii=ensure_ascii).encode('utf-8')
+            for size in (1, 7, 64, len(content)):
+                parser = RowParser()
+                self.assertEqual(self.rows, _feed(parser, content, size))
+                self.assertEqual({'code': 0, 'msg': '', 'data': {'total': 50}}, parser.meta)
+                self.assertEqual(50, parser.meta.data.total)
+
+    def test_object_class(self):
+        content = json.dumps({'code': 0, 'data': {'list': self.rows[:2]}}).encode('utf-8')
+        rows = _feed(RowParser(), content, 10)
+        self.assertIsInstance(rows[0], ObjectDict)
+        self.assertEqual('学生1\n', rows[1].user_name)
+        rows = _feed(RowParser(object_class=None), content, 10)
+        self.assertIs(type(rows[0]), dict)
+        self.assertIs(type(rows[0]['tags'][1]), dict)
+
+    def test_no_rows(self):
+        cases = [
+            ({'code': 1, 'msg': 'error', 'data': {'list': self.rows}}, 1),
+            ({'code': 0, 'data': None}, 0),
+            ({'code': 0, 'data': {'list': []}}, 0),
+            ({'code': 0, 'data': {'list': None}}, 0),
+        ]
+        for body, code in cases:
+            parser = RowParser()
+            self.assertEqual([], _feed(parser, json.dumps(body).encode('utf-8'), 5))
+            self.assertEqual(code, parser.code)
+
+    def test_custom_path(self):
+        content = json.dumps({'code': 0, 'data': {'room_user_stat': self.rows}}).encode('utf-8')
+        self.assertEqual(self.rows, _feed(RowParser(path=('data', 'room_user_stat')), content, 13))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            RowParser().feed(b'<html></html>')
+        parser = RowParser()
+        parser.feed(b'{"code": 0, "data": {"list": [{"a": 1}')
+        with self.assertRaises(ValueError):
+            parser.close()
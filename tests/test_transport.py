@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+import json
+import os
+import threading
+import unittest
+
+from six.moves import BaseHTTPServer, socketserver
+
+from baijiayun import BaiJiaYunClient
+from baijiayun.client.transport import HttpTransport
+from baijiayun.storage.memorystorage import MemoryStorage
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({'code': 0, 'data': {}}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class TransportTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = _Server(('127.0.0.1', 0), _Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+        cls.url = 'http://127.0.0.1:%d/' % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_pool_stats(self):
+        transport = HttpTransport(pool_maxsize=2)
+        for _ in range(5):
+            transport.request('GET', self.url + 'openapi/room/info').raise_for_status()
+        stats = transport.stats()[self.url]
+        self.assertEqual(5, stats['requests'])
+        self.assertEqual(1, stats['connections'])
+        self.assertAlmostEqual(0.8, stats['reuse_ratio'])
+        transport.close()
+
+    def test_separate_pool_per_base_url(self):
+        transport = HttpTransport()
+        other_url = self.url.replace('127.0.0.1', 'localhost')
+        transport.request('GET', self.url)
+        transport.request('GET', other_url)
+        self.assertEqual({self.url, other_url}, set(transport.stats().keys()))
+        self.assertIsNot(transport.mount(self.url), transport.mount(other_url))
+        transport.close()
+
+    def test_client_pool_config(self):
+        client = BaiJiaYunClient('1', 'secret', pool_maxsize=32, pool_block=True, max_connections=64)
+        other = BaiJiaYunClient('2', 'secret')
+        self.assertEqual(32, client.transport.pool_maxsize)
+        self.assertTrue(client.transport.pool_block)
+        self.assertEqual(64, client.transport.max_connections)
+        self.assertIsNot(client.transport, other.transport)
+        self.assertIsNot(client._http, other._http)
+        client.close()
+        other.close()
+
+    def test_client_shared_transport(self):
+        transport = HttpTransport()
+        with BaiJiaYunClient('1', 'secret', transport=transport) as client:
+            self.assertIs(transport, client.transport)
+            session = transport.session
+        self.assertIs(session, transport.session)
+        transport.close()
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'fork is not supported')
+    def test_fork(self):
+        transport = HttpTransport()
+        storage = MemoryStorage()
+        transport.request('GET', self.url)
+        storage.set('key', 'value', 60)
+        session = transport.session
+        pid = os.fork()
+        if pid == 0:
+            ok = transport.session is not session and not transport.stats() and storage.get('key') is None
+            ok = ok and transport.request('GET', self.url).status_code == 200
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(0, status)
+        self.assertIs(session, transport.session)
+        self.assertEqual('value', storage.get('key'))
+        transport.close()
@@ -2,7 +2,8 @@
 from __future__ import absolute_import, unicode_literals
 import unittest
 
-from baijiayun.core.utils import ObjectDict, Md5Signer
+from baijiayun.core.decoders import JsonDecoder, OrjsonDecoder, dict_decoder, to_object_dict
+from baijiayun.core.utils import ObjectDict, Md5Signer, PartnerKeySigner, to_text
 
 
 class UtilityTestCase(unittest.TestCase):
@@ -22,3 +23,34 @@ class UtilityTestCase(unittest.TestCase):
         signature = signer.signature
 
         self.assertEqual('35a2035a748fce02684761710f613168', signature)
+
+    def test_partner_key_signer(self):
+        def md5_sign(data, partner_key):
+            signer = Md5Signer(delimiter=b'&', key='partner_key=' + partner_key)
+            for k, v in data.items():
+                signer.add_data('%s=%s' % (k, to_text(v)))
+            return signer.signature
+
+        signer = PartnerKeySigner('pkey')
+        cases = [
+            {},
+            {'room_id': 1, 'user_number': 2, 'user_name': '学生', 'user_role': 0, 'user_avatar': ''},
+            {'a': 1, 'a+': 2, 'a_b': 3, 'ab': None, 'b': b'bytes', 'c': 0, 'd': 1.5, 'e': '&='},
+        ]
+        for data in cases:
+            self.assertEqual(md5_sign(data, 'pkey'), signer.sign(data))
+
+    def test_decoders(self):
+        content = '{"code": 0, "data": {"list": [{"name": "学生\n"}]}}'.encode('utf-8')
+        decoders = [JsonDecoder(), JsonDecoder(object_class=None), dict_decoder()]
+        try:
+            decoders.append(OrjsonDecoder(object_class=ObjectDict))
+        except ImportError:
+            pass
+        for decoder in decoders:
+            result = decoder.decode(content)
+            self.assertEqual({'code': 0, 'data': {'list': [{'name': '学生\n'}]}}, result)
+            row = result['data']['list'][0]
+            self.assertIs(type(row), decoder.object_class or dict)
+        self.assertEqual({'name': '学生'}, JsonDecoder().decode(b'{"name": "\xe5\xad\xa6\xe7\x94\x9f\xff"}'))
+        self.assertEqual('学生', to_object_dict({'list': [{'name': '学生'}]}).list[0].name)